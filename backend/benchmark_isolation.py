@@ -0,0 +1,122 @@
+"""
+Latencia del chatbot con el análisis de sentimiento saturado
+
+Arranca el servidor (un worker) y mide /api/chatbot/message con `--chat-clients`
+clientes en dos fases: solo chatbot, y chatbot mientras `--sentiment-clients`
+clientes envían /api/sentiment/analyze-batch sin pausa. Con la inferencia en el
+pool de sentimiento el p50/p99 del chatbot debe mantenerse; las peticiones de
+sentimiento que no caben en SENTIMENT_MAX_QUEUE reciben 429 al momento.
+
+Uso (desde backend/):
+    python benchmark_isolation.py --sentiment-clients 32 --seconds 10
+    SENTIMENT_MAX_QUEUE=4 python benchmark_isolation.py --texts-per-request 64
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import httpx
+
+from benchmark_workers import BACKEND_DIR, wait_ready
+
+REVIEW = "El producto llegó a tiempo, la calidad es buena pero la talla es un poco pequeña."
+
+
+def client_loop(base_url, request, deadline):
+    """(latencias en ms, códigos de estado) de un cliente hasta `deadline`"""
+    latencies, codes = [], Counter()
+    with httpx.Client(base_url=base_url, timeout=60) as c:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                codes[request(c).status_code] += 1
+            except httpx.HTTPError:
+                codes["error"] += 1
+            latencies.append(1000 * (time.perf_counter() - start))
+    return latencies, codes
+
+
+def run_clients(base_url, request, clients, deadline):
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: client_loop(base_url, request, deadline), range(clients)))
+    latencies = np.array([ms for lat, _ in results for ms in lat])
+    codes = sum((codes for _, codes in results), Counter())
+    return latencies, codes
+
+
+def summary(label, latencies, codes, seconds):
+    if not len(latencies):
+        return f"{label:<34} {'-':>10}"
+    return (f"{label:<34} {len(latencies) / seconds:>10.1f} {np.percentile(latencies, 50):>10.2f} "
+            f"{np.percentile(latencies, 99):>10.2f}   {dict(sorted(codes.items(), key=str))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aislamiento del chatbot frente al sentimiento saturado")
+    parser.add_argument("--chat-clients", type=int, default=4)
+    parser.add_argument("--sentiment-clients", type=int, default=32)
+    parser.add_argument("--texts-per-request", type=int, default=32,
+                        help="Reseñas por petición a /api/sentiment/analyze-batch")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    chat = lambda c: c.post("/api/chatbot/message", json={"message": "Busco zapatillas rojas talla 42"})
+    texts = [REVIEW] * args.texts_per_request
+    sentiment = lambda c: c.post("/api/sentiment/analyze-batch", json={"texts": texts})
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+         "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, "STARTUP_WAIT": "True"}
+    )
+    try:
+        if not wait_ready(base_url, args.ready_timeout):
+            print("⚠️ El servidor no respondió a /health/ready")
+            return
+        with httpx.Client(base_url=base_url, timeout=60) as c:
+            chat(c), sentiment(c)  # warm-up
+
+        alone = run_clients(base_url, chat, args.chat_clients, time.monotonic() + args.seconds)
+
+        deadline = time.monotonic() + args.seconds
+        flood = {}
+        flood_thread = threading.Thread(target=lambda: flood.update(
+            result=run_clients(base_url, sentiment, args.sentiment_clients, deadline)))
+        flood_thread.start()
+        time.sleep(0.5)  # que la cola de sentimiento se llene antes de medir
+        loaded = run_clients(base_url, chat, args.chat_clients, deadline)
+        flood_thread.join()
+        with httpx.Client(base_url=base_url, timeout=10) as c:
+            pool = c.get("/health/details").json()["sentiment_pool"]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    print("=" * 100)
+    print(f"AISLAMIENTO - chatbot con {args.chat_clients} clientes, sentimiento con {args.sentiment_clients} "
+          f"clientes x {args.texts_per_request} reseñas, {os.cpu_count()} núcleos")
+    print("=" * 100)
+    print(f"{'Fase':<34} {'Pet./s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}   Códigos")
+    print("-" * 100)
+    print(summary("chatbot solo", *alone, args.seconds))
+    print(summary("chatbot + sentimiento saturado", *loaded, args.seconds - 0.5))
+    print(summary("sentimiento (saturando)", *flood["result"], args.seconds))
+    print("-" * 100)
+    print(f"Pool de sentimiento: {pool}")
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Throughput del servidor con launcher.py de 1 a N workers
+
+Para cada nº de workers arranca el lanzador en un puerto local, espera a
+/health/ready y lanza `--clients` clientes HTTP concurrentes durante `--seconds`
+segundos contra un endpoint. Reporta peticiones/s, p50/p99 y la memoria de cada
+worker: RSS (incluye páginas compartidas) y PSS (reparte las compartidas entre los
+procesos que las usan), que muestra lo que ahorra la precarga en el padre.
+
+Uso (desde backend/):
+    python benchmark_workers.py --workers 1 2 4 --endpoint chatbot --clients 32
+    python benchmark_workers.py --workers 1 2 4 --endpoint visual --image ejemplo.jpg
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_request(endpoint, image_bytes=None):
+    """Devuelve una función (client) -> respuesta para el endpoint elegido"""
+    if endpoint == "chatbot":
+        return lambda c: c.post("/api/chatbot/message", json={"message": "Busco zapatillas rojas talla 42"})
+    if endpoint == "sentiment":
+        return lambda c: c.post("/api/sentiment/analyze", json={"text": "Muy buena calidad, llegó a tiempo"})
+    if endpoint == "visual":
+        return lambda c: c.post("/api/visual/search", files={"file": ("q.jpg", image_bytes, "image/jpeg")})
+    raise ValueError(f"Endpoint no válido: {endpoint}")
+
+
+def worker_memory(parent_pid):
+    """(RSS, PSS) en MB de cada proceso hijo del lanzador"""
+    try:
+        with open(f"/proc/{parent_pid}/task/{parent_pid}/children") as f:
+            pids = [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+    memory = []
+    for pid in pids:
+        values = {}
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    key, _, rest = line.partition(":")
+                    if key in ("Rss", "Pss"):
+                        values[key] = int(rest.split()[0]) / 1024
+        except OSError:
+            continue
+        memory.append((values.get("Rss", 0.0), values.get("Pss", 0.0)))
+    return memory
+
+
+def wait_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=2).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run_load(base_url, request, clients, seconds):
+    deadline = time.monotonic() + seconds
+
+    def client_loop(_):
+        latencies, errors = [], 0
+        with httpx.Client(base_url=base_url, timeout=30) as c:
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                r = request(c)
+                latencies.append(1000 * (time.perf_counter() - start))
+                errors += r.status_code != 200
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(client_loop, range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([ms for lat, _ in results for ms in lat])
+    return len(latencies) / elapsed, latencies, sum(e for _, e in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput de launcher.py según el nº de workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--endpoint", default="chatbot", choices=["chatbot", "sentiment", "visual"])
+    parser.add_argument("--image", help="Imagen de consulta para --endpoint visual")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    image_bytes = None
+    if args.endpoint == "visual":
+        if not args.image:
+            parser.error("--endpoint visual necesita --image")
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+    request = make_request(args.endpoint, image_bytes)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    rows = []
+    for n in args.workers:
+        proc = subprocess.Popen(
+            [sys.executable, "launcher.py", "--workers", str(n), "--host", "127.0.0.1",
+             "--port", str(args.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_ready(base_url, args.ready_timeout):
+                print(f"⚠️ {n} workers: el servidor no respondió a /health/ready")
+                continue
+            with httpx.Client(base_url=base_url, timeout=30) as c:
+                request(c)  # warm-up
+            qps, latencies, errors = run_load(base_url, request, args.clients, args.seconds)
+            memory = worker_memory(proc.pid)
+            rows.append((n, qps, latencies, errors, memory))
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+
+    print("=" * 92)
+    print(f"WORKERS - {args.endpoint}, {args.clients} clientes, {args.seconds:.0f}s por configuración, "
+          f"{os.cpu_count()} núcleos")
+    print("=" * 92)
+    print(f"{'Workers':>7} {'Peticiones/s':>13} {'x vs 1':>7} {'p50 (ms)':>10} {'p99 (ms)':>10} {'Errores':>8} "
+          f"{'RSS/worker (MB)':>16} {'PSS/worker (MB)':>16}")
+    print("-" * 92)
+    base_qps = rows[0][1] if rows else 0
+    for n, qps, latencies, errors, memory in rows:
+        rss = np.mean([m[0] for m in memory]) if memory else 0.0
+        pss = np.mean([m[1] for m in memory]) if memory else 0.0
+        print(f"{n:>7} {qps:>13.1f} {qps / max(base_qps, 1e-9):>7.2f} {np.percentile(latencies, 50):>10.2f} "
+              f"{np.percentile(latencies, 99):>10.2f} {errors:>8} {rss:>16.1f} {pss:>16.1f}")
+    print("=" * 92)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+ComprIAssist - Pool de inferencia con control de admisión
+
+Un ThreadPoolExecutor propio para un modelo (p. ej. pysentimiento) con un límite de
+tareas pendientes: en ejecución + en cola. El forward de PyTorch libera el GIL, así
+que el event loop sigue atendiendo chatbot y health mientras los hilos del pool
+calculan. Cuando el pool está lleno la petición se rechaza al momento (429) en vez
+de acumular latencia en una cola sin fondo; si una tarea espera más de `timeout`
+segundos se cancela (503).
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from monitoring import executor_queue_depth
+
+
+class PoolSaturated(Exception):
+    """El pool ya tiene `max_pending` tareas en ejecución o en cola"""
+
+
+class InferencePool:
+    def __init__(self, name, workers=1, max_queue=16, timeout=None):
+        self.name = name
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def submit(self, fn, *args, wait=0):
+        """
+        Envía fn(*args) al pool. Si está lleno espera hasta `wait` segundos a que haya
+        sitio (None = sin límite; 0 = no espera) y si no lo hay lanza PoolSaturated.
+        """
+        with self._space:
+            if not self._space.wait_for(lambda: self.pending < self.max_pending, timeout=wait):
+                self.rejected += 1
+                raise PoolSaturated(f"Pool '{self.name}' lleno ({self.pending} tareas pendientes)")
+            self.pending += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._space:
+            self.pending -= 1
+            if not future.cancelled():
+                self.completed += 1
+            self._space.notify()
+
+    def saturated(self):
+        return self.pending >= self.max_pending
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    async def run(self, fn, *args):
+        """
+        Ejecuta fn(*args) en el pool sin bloquear el event loop. Lanza PoolSaturated
+        si no hay sitio y asyncio.TimeoutError si no termina en `timeout` segundos
+        (la tarea se cancela si aún no había empezado).
+        """
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.record_timeout()
+            raise
+
+    def queue_depth(self):
+        return executor_queue_depth(self.executor)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": self.queue_depth(),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
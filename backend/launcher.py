@@ -0,0 +1,261 @@
+"""
+ComprIAssist - Lanzador de producción multi-worker (prefork)
+
+El proceso padre carga una sola vez lo que es Python puro y de solo lectura (reglas
+del chatbot, plantillas generativas), calienta los ficheros del catálogo visual en
+la caché de páginas y después hace fork de N workers uvicorn que comparten esas
+páginas por copy-on-write y el mismo socket de escucha. El padre no crea hilos
+antes del fork: cada worker carga después lo que los crea (FAISS con OpenMP,
+ResNet50 con TensorFlow/ONNX, pysentimiento) con un nº de hilos fijo: núcleos /
+workers, para que los workers no compitan entre sí.
+
+Señales al proceso padre:
+    SIGHUP          recarga los datos en el padre y reemplaza los workers sin cortar
+                    peticiones (los nuevos entran cuando están listos, los viejos
+                    terminan las peticiones en curso)
+    SIGTERM/SIGINT  parada ordenada de todos los workers
+
+Uso (desde backend/):
+    python launcher.py --workers 4 --port 8000
+    kill -HUP <pid del padre>
+"""
+
+import os
+import sys
+import time
+import select
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Variables de hilos que cada librería lee al importarse o al crear su runtime
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+    "VISUAL_FAISS_THREADS", "VISUAL_TF_INTRA_THREADS", "VISUAL_ONNX_THREADS",
+    "SENTIMENT_TORCH_THREADS",
+)
+
+
+def configure_threads(workers, threads=None):
+    """
+    Fija los hilos por worker (núcleos / workers si no se indica). Debe llamarse antes
+    de importar numpy/faiss/torch; respeta las variables ya definidas en el entorno.
+    """
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(threads))
+    os.environ.setdefault("VISUAL_TF_INTER_THREADS", "1")
+    return threads
+
+
+def configure_metrics_dir():
+    """Carpeta de métricas multiproceso de Prometheus (limpia: los pids antiguos no se agregan)"""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="compriassist_metrics_")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+class Launcher:
+    def __init__(self, host="0.0.0.0", port=8000, workers=2, log_level="info",
+                 graceful_timeout=30, ready_timeout=300):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.log_level = log_level
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+
+        self.server = None
+        self.sock = None
+        self.workers = {}       # pid -> generación
+        self.ready = set()      # pids que avisaron de que terminaron de cargar
+        self.generation = 0
+        self._stopping = False
+        self._reload_requested = False
+        self._ready_r, self._ready_w = os.pipe()
+
+    # ---------- Proceso padre ----------
+
+    def preload(self):
+        import server
+        self.server = server
+        start = time.perf_counter()
+        states, warmed_mb = server.preload_shared()
+        loaded = [name for name, state in states.items() if state["status"] == "ready"]
+        print(f"✅ Precargado en el padre ({time.perf_counter() - start:.1f}s): {', '.join(loaded) or '-'}"
+              f"{f' + catálogo visual en caché de páginas ({warmed_mb:.0f} MB)' if warmed_mb else ''}")
+
+    def bind(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker()
+            except BaseException as e:
+                print(f"❌ Worker {os.getpid()} terminó con error: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = self.generation
+        return pid
+
+    def spawn_generation(self):
+        self.generation += 1
+        return [self.spawn_worker() for _ in range(self.num_workers)]
+
+    def _drain_ready_pipe(self, timeout):
+        readable, _, _ = select.select([self._ready_r], [], [], timeout)
+        if readable:
+            for line in os.read(self._ready_r, 4096).decode().split():
+                self.ready.add(int(line))
+
+    def _reap(self):
+        """Recoge workers terminados y relanza los que murieron de forma inesperada"""
+        from metrics import mark_worker_dead
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.workers.pop(pid, None)
+            self.ready.discard(pid)
+            mark_worker_dead(pid)
+            if generation == self.generation and not self._stopping:
+                print(f"⚠️ Worker {pid} terminó inesperadamente ({status}), se relanza")
+                self.spawn_worker()
+
+    def _wait_ready(self, pids):
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline and not self._stopping:
+            if all(pid in self.ready or pid not in self.workers for pid in pids):
+                return True
+            self._drain_ready_pipe(0.5)
+            self._reap()
+        return False
+
+    def _signal_workers(self, pids, sig):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def reload(self):
+        """Recarga los datos en el padre y reemplaza los workers por una generación nueva"""
+        print("🔄 Recargando datos...")
+        try:
+            self.preload()
+        except Exception as e:
+            print(f"❌ Recarga fallida, se mantienen los workers actuales: {e}")
+            return
+        old = list(self.workers)
+        new = self.spawn_generation()
+        if not self._wait_ready(new):
+            print("⚠️ Los workers nuevos no avisaron a tiempo; se reemplazan igualmente")
+        # uvicorn termina las peticiones en curso antes de salir
+        self._signal_workers(old, signal.SIGTERM)
+        print(f"✅ Recarga completa: workers {new}")
+
+    def shutdown(self):
+        self._stopping = True
+        self._signal_workers(list(self.workers), signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        self._signal_workers(list(self.workers), signal.SIGKILL)
+        self._reap()
+
+    def run(self):
+        self.preload()
+        self.bind()
+
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, "_reload_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "_stopping", True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, "_stopping", True))
+
+        pids = self.spawn_generation()
+        print(f"🚀 {self.num_workers} workers en http://{self.host}:{self.port} (padre {os.getpid()})")
+        if self._wait_ready(pids):
+            print(f"✅ Workers listos: {sorted(self.ready)}")
+
+        while not self._stopping:
+            self._drain_ready_pipe(0.5)
+            self._reap()
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+
+        print("🛑 Deteniendo workers...")
+        self.shutdown()
+        self.sock.close()
+
+    # ---------- Worker ----------
+
+    def _run_worker(self):
+        import uvicorn
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        os.close(self._ready_r)
+
+        startup = self.server.startup
+
+        def notify_ready():
+            startup.wait()
+            os.write(self._ready_w, f"{os.getpid()}\n".encode())
+
+        threading.Thread(target=notify_ready, daemon=True).start()
+
+        config = uvicorn.Config(
+            self.server.app,
+            lifespan="on",
+            log_level=self.log_level,
+            timeout_graceful_shutdown=self.graceful_timeout,
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lanzador prefork de ComprIAssist")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Hilos por worker (0 = núcleos / workers)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    args = parser.parse_args()
+
+    threads = configure_threads(args.workers, args.threads or None)
+    # server.py lo lee al importarse: con varios workers rechaza las altas/bajas del catálogo
+    os.environ["COMPRIASSIST_WORKERS"] = str(args.workers)
+    metrics_dir = configure_metrics_dir()
+    # Un worker no acepta conexiones hasta que todos sus módulos terminaron de cargar
+    os.environ.setdefault("STARTUP_WAIT", "True")
+    print(f"   → {threads} hilos por worker | métricas en {metrics_dir}")
+
+    Launcher(host=args.host, port=args.port, workers=args.workers, log_level=args.log_level,
+             graceful_timeout=args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+ComprIAssist - Métricas Prometheus (/metrics)
+
+Histogramas por módulo y etapa del pipeline y contadores de caminos de respaldo.
+Los modelos no dependen de este módulo: exponen un atributo `stage_observer`
+(callable(stage, seconds)) que el servidor conecta con `stage_observer(módulo)`.
+
+Con varios workers (uvicorn --workers, launcher.py) define PROMETHEUS_MULTIPROC_DIR
+(carpeta vacía y escribible) ANTES de arrancar: cada proceso escribe sus valores
+en ficheros mmap y /metrics los agrega con MultiProcessCollector.
+prometheus_client es opcional: sin él /metrics responde vacío y todo es no-op.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from functools import partial
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+    )
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+# De 0.5 ms (regex, índice pequeño) a 10 s (forward en CPU de un batch grande, llamada a la API)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if PROMETHEUS_AVAILABLE:
+    STAGE_SECONDS = Histogram(
+        "compriassist_stage_seconds", "Duración de cada etapa del pipeline",
+        ["module", "stage"], buckets=BUCKETS
+    )
+    REQUEST_SECONDS = Histogram(
+        "compriassist_request_seconds", "Latencia de las peticiones HTTP por módulo",
+        ["module"], buckets=BUCKETS
+    )
+    FALLBACKS = Counter(
+        "compriassist_fallbacks_total", "Respuestas servidas por el camino de respaldo",
+        ["module", "reason"]
+    )
+    CACHE_LOOKUPS = Counter(
+        "compriassist_cache_lookups_total", "Consultas a las cachés de resultados (hit, disk_hit, miss)",
+        ["cache", "result"]
+    )
+    REJECTIONS = Counter(
+        "compriassist_rejections_total", "Peticiones rechazadas por control de admisión (429/503)",
+        ["module", "reason"]
+    )
+
+# labels() bloquea y construye la clave en cada llamada: se guarda el hijo ya resuelto
+_children = {}
+
+
+def _child(metric, *labels):
+    key = (metric, labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def observe_stage(module, stage, seconds):
+    if PROMETHEUS_AVAILABLE:
+        _child(STAGE_SECONDS, module, stage).observe(seconds)
+
+
+def stage_observer(module):
+    """callable(stage, seconds) para el atributo `stage_observer` de los modelos"""
+    return partial(observe_stage, module)
+
+
+@contextmanager
+def stage_timer(module, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(module, stage, time.perf_counter() - start)
+
+
+def observe_request(module, seconds):
+    if PROMETHEUS_AVAILABLE:
+        _child(REQUEST_SECONDS, module).observe(seconds)
+
+
+def count_fallback(module, reason):
+    if PROMETHEUS_AVAILABLE:
+        _child(FALLBACKS, module, reason).inc()
+
+
+def count_cache_lookup(cache, result):
+    if PROMETHEUS_AVAILABLE:
+        _child(CACHE_LOOKUPS, cache, result).inc()
+
+
+def cache_observer(cache):
+    """callable(result) para el atributo `observer` de las cachés"""
+    return partial(count_cache_lookup, cache)
+
+
+def count_rejection(module, reason):
+    if PROMETHEUS_AVAILABLE:
+        _child(REJECTIONS, module, reason).inc()
+
+
+def fallback_observer(module):
+    """callable(reason) para el atributo `fallback_observer` de los modelos"""
+    return partial(count_fallback, module)
+
+
+def render():
+    """Cuerpo de /metrics en formato de texto de Prometheus"""
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client no instalado\n"
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_dead(pid):
+    """Lo llama el proceso padre al terminar un worker (modo multiproceso)"""
+    if PROMETHEUS_AVAILABLE and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
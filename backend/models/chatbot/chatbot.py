@@ -4,6 +4,7 @@ Utiliza API de HuggingFace para generación de respuestas naturales
 """
 
 import os
+import time
 import requests
 from typing import Dict, List, Optional
 from .intents import IntentClassifier
@@ -30,6 +31,11 @@ class ChatbotAssistant:
         # Clasificador de intenciones
         self.intent_classifier = IntentClassifier()
         
+        # Métricas opcionales: callable(stage, seconds) para la llamada al LLM
+        # y callable(reason) cuando se responde con el texto predefinido
+        self.stage_observer = None
+        self.fallback_observer = None
+        
         # Contexto de la tienda
         self.store_context = """
         Eres un asistente virtual experto en comercio electrónico llamado ComprIAssist.
@@ -93,8 +99,10 @@ class ChatbotAssistant:
             Respuesta generada
         """
         if not self.hf_api_key:
+            self._count_fallback("no_api_key")
             return self._get_fallback_response(message)
         
+        start = time.perf_counter()
         try:
             headers = {"Authorization": f"Bearer {self.hf_api_key}"}
             
@@ -119,6 +127,8 @@ Asistente:"""
                 json=payload,
                 timeout=30
             )
+            if self.stage_observer is not None:
+                self.stage_observer("llm", time.perf_counter() - start)
             
             if response.status_code == 200:
                 result = response.json()
@@ -126,12 +136,18 @@ Asistente:"""
                     return result[0].get('generated_text', '').strip()
                 return "Lo siento, hubo un problema al generar la respuesta."
             else:
+                self._count_fallback("api_http_error")
                 return self._get_fallback_response(message)
                 
         except Exception as e:
             print(f"Error en API de HuggingFace: {e}")
+            self._count_fallback("api_error")
             return self._get_fallback_response(message)
     
+    def _count_fallback(self, reason: str):
+        if self.fallback_observer is not None:
+            self.fallback_observer(reason)
+    
     def _handle_product_search(self, message: str, entities: Dict) -> str:
         """Maneja búsquedas de productos con respuestas específicas"""
         
@@ -4,7 +4,8 @@ Detecta la intención del usuario usando patrones y reglas simples
 """
 
 import re
-from typing import Dict, List
+import time
+from typing import Dict
 
 class IntentClassifier:
     """
@@ -14,6 +15,9 @@ class IntentClassifier:
     def __init__(self):
         """Inicializa el clasificador con patrones para cada intención"""
         
+        # Callable(stage, seconds) opcional para métricas: "intent" y "entities"
+        self.stage_observer = None
+        
         # Patrones para cada intención
         self.intent_patterns = {
             "saludo": [
@@ -139,6 +143,7 @@ class IntentClassifier:
         Returns:
             Dict con intent, confidence y entities
         """
+        start = time.perf_counter()
         message_lower = message.lower().strip()
         
         # Buscar coincidencias con patrones
@@ -166,9 +171,15 @@ class IntentClassifier:
             main_intent = "general"
             confidence = 0.5
         
+        classified = time.perf_counter()
+        
         # Extraer entidades
         entities = self._extract_entities(message_lower)
         
+        if self.stage_observer is not None:
+            self.stage_observer("intent", classified - start)
+            self.stage_observer("entities", time.perf_counter() - classified)
+        
         return {
             "intent": main_intent,
             "confidence": confidence,
@@ -2,5 +2,7 @@
 
 from .sentiment_analyzer import SentimentModel
 from .fraud_detector import FraudDetector
+from .cache import ResultCache, normalize_text
+from .fake_review_model import FakeReviewModel
 
-__all__ = ["SentimentModel", "FraudDetector"]
+__all__ = ["SentimentModel", "FraudDetector", "FakeReviewModel", "ResultCache", "normalize_text"]
@@ -0,0 +1,92 @@
+"""
+Reseñas/segundo de SentimentModel: una llamada por reseña vs analyze_batch
+
+Compara el bucle de analyze() (como hacía /api/sentiment/analyze para cada
+reseña) con analyze_batch() para varios tamaños de lote, con y sin agrupar por
+longitud. Las reseñas sintéticas mezclan textos cortos y largos como las reales.
+Con --csv se usan reseñas reales (columna --column).
+
+Uso (desde backend/):
+    python -m models.sentiment.benchmark_batch --reviews 2000 --batch-sizes 8 32 64
+    python -m models.sentiment.benchmark_batch --csv data/reviews.csv --column review_text
+"""
+
+import sys
+import os
+import csv
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.sentiment.sentiment_analyzer import SentimentModel
+
+FRASES = [
+    "Excelente producto, llegó antes de lo esperado.",
+    "La calidad no es la que muestran las fotos.",
+    "Cumple, aunque la talla es un poco pequeña.",
+    "Muy mala experiencia con el envío, el paquete llegó abierto.",
+    "Lo recomiendo, buena relación calidad-precio.",
+    "El color es distinto al de la web pero igual me gustó.",
+    "No funciona desde el segundo día y soporte no responde.",
+]
+
+
+def synthetic_reviews(n, seed=0):
+    """Reseñas de 1 a 12 frases (la mayoría cortas, algunas muy largas)"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(FRASES) for _ in range(min(12, 1 + int(rng.expovariate(0.5)))))
+            for _ in range(n)]
+
+
+def load_csv(path, column, limit):
+    with open(path, encoding="utf-8", newline="") as f:
+        texts = [row[column] for row in csv.DictReader(f) if row.get(column)]
+    return texts[:limit]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput de SentimentModel por lotes")
+    parser.add_argument("--reviews", type=int, default=1000)
+    parser.add_argument("--csv", help="CSV con reseñas reales")
+    parser.add_argument("--column", default="review_text")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32, 64])
+    args = parser.parse_args()
+
+    texts = load_csv(args.csv, args.column, args.reviews) if args.csv else synthetic_reviews(args.reviews)
+    model = SentimentModel()
+    if model.model is None:
+        print("⚠️ pysentimiento no disponible: el modo respaldo no hace inferencia, no hay nada que medir")
+        return
+
+    model.analyze_batch(texts[:8])  # warm-up
+    rows = [("analyze() por reseña", timed(lambda: [model.analyze(t) for t in texts]))]
+    for size in args.batch_sizes:
+        rows.append((f"batch {size} sin agrupar", timed(
+            lambda: model.analyze_batch(texts, batch_size=size, bucket_by_length=False))))
+        rows.append((f"batch {size} por longitud", timed(
+            lambda: model.analyze_batch(texts, batch_size=size))))
+
+    lengths = sorted(len(t) for t in texts)
+    print("=" * 64)
+    print(f"SENTIMIENTO - {len(texts)} reseñas, longitud p50 {lengths[len(lengths) // 2]} "
+          f"/ máx {lengths[-1]} caracteres")
+    print("=" * 64)
+    print(f"{'Modo':<28} {'Reseñas/s':>12} {'ms/reseña':>10} {'x vs bucle':>11}")
+    print("-" * 64)
+    base = rows[0][1]
+    for label, elapsed in rows:
+        print(f"{label:<28} {len(texts) / elapsed:>12.1f} {1000 * elapsed / len(texts):>10.2f} "
+              f"{base / elapsed:>11.2f}")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
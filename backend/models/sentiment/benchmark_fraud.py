@@ -0,0 +1,94 @@
+"""
+Coste por reseña de FraudDetector según el nº de patrones
+
+Compara el detector anterior (un re.search sin compilar y un text.lower() por
+patrón) con el compilado (PhraseMatcher de una pasada + regex precompiladas) para
+listas de 3 a decenas de miles de frases de spam sintéticas. Reporta µs por
+reseña y el tiempo de compilación.
+
+Uso (desde backend/):
+    python -m models.sentiment.benchmark_fraud --patterns 3 100 1000 10000 50000
+"""
+
+import sys
+import os
+import re
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.sentiment.fraud_detector import FraudDetector, DEFAULT_RULES
+from models.sentiment.benchmark_batch import synthetic_reviews
+
+PALABRAS = ["oferta", "envío", "gratis", "descuento", "click", "premio", "cupón", "ganador",
+            "exclusivo", "limitado", "urgente", "dinero", "bono", "promo", "rápido", "garantizado"]
+
+
+def synthetic_phrases(n, seed=0):
+    """Frases de spam de 2 a 4 palabras con sufijo numérico (todas distintas)"""
+    rng = random.Random(seed)
+    return [f"{' '.join(rng.choice(PALABRAS) for _ in range(rng.randint(2, 4)))} {i}" for i in range(n)]
+
+
+class NaiveDetector:
+    """El detector anterior: re.search sin compilar y text.lower() por cada patrón"""
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def analyze(self, text):
+        score = 0
+        for pattern in self.patterns:
+            if re.search(pattern, text.lower()):
+                score += 1
+        return {"is_fake": score > 0, "fake_probability": min(0.1 + score * 0.25, 0.98)}
+
+
+def per_review_us(detector, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            detector.analyze(text)
+    return 1e6 * (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste por reseña del detector de fraude")
+    parser.add_argument("--patterns", type=int, nargs="+", default=[3, 100, 1000, 10000, 50000])
+    parser.add_argument("--reviews", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--naive-max", type=int, default=10000,
+                        help="Nº de patrones a partir del cual no se mide el detector anterior (muy lento)")
+    args = parser.parse_args()
+
+    texts = synthetic_reviews(args.reviews)
+    default_patterns = [e[3:] if e.startswith("re:") else re.escape(e)
+                        for entries in DEFAULT_RULES.values() for e in entries]
+
+    print("=" * 72)
+    print(f"FRAUDE - {len(texts)} reseñas sintéticas, µs por reseña")
+    print("=" * 72)
+    print(f"{'Patrones':>9} {'Anterior (µs)':>15} {'Compilado (µs)':>16} {'x':>8} {'Compilar (ms)':>15}")
+    print("-" * 72)
+    for n in args.patterns:
+        extra = synthetic_phrases(max(0, n - len(default_patterns)))
+        rules = {**DEFAULT_RULES, "spam": extra}
+
+        start = time.perf_counter()
+        compiled = FraudDetector(rules=rules)
+        compile_ms = 1000 * (time.perf_counter() - start)
+        compiled_us = per_review_us(compiled, texts, args.repeat)
+
+        if n <= args.naive_max:
+            naive = NaiveDetector(default_patterns + [re.escape(p) for p in extra])
+            naive_us = per_review_us(naive, texts, 1)
+            print(f"{n:>9} {naive_us:>15.1f} {compiled_us:>16.1f} {naive_us / compiled_us:>8.1f} {compile_ms:>15.1f}")
+        else:
+            print(f"{n:>9} {'-':>15} {compiled_us:>16.1f} {'-':>8} {compile_ms:>15.1f}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
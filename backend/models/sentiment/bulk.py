@@ -0,0 +1,313 @@
+"""
+Puntuación masiva de reseñas en streaming (JSONL/CSV -> JSONL)
+
+Las reseñas se leen con un generador, se agrupan en lotes para
+SentimentModel.analyze_batch y el detector de fraude corre en paralelo con el
+modelo (en el hilo actual o en `--fraud-workers` procesos). Solo hay un lote en
+memoria a la vez, así que el consumo no depende del tamaño del fichero. Con
+--resume se continúa desde el último checkpoint (filas procesadas + bytes escritos).
+
+Cada línea de salida: {"row", "id"?, "sentiment", "confidence", "probabilities",
+"is_fake", "fake_probability"} o {"row", "error"} si la fila no es válida.
+
+Uso (desde backend/):
+    python -m models.sentiment.bulk reseñas.jsonl -o puntuadas.jsonl
+    python -m models.sentiment.bulk reseñas.csv -o puntuadas.jsonl --text-field review_text --resume
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+import argparse
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import resource  # Solo Unix: server.py importa este módulo también en Windows
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.sentiment.sentiment_analyzer import SentimentModel
+from models.sentiment.fraud_detector import FraudDetector
+from models.sentiment.fake_review_model import FakeReviewModel
+
+
+def detect_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def iter_records(lines, fmt="jsonl", text_field="text", id_field="id", start=0):
+    """
+    Registros {"row", "id", "text"} (o {"row", "error"}) de un iterable de líneas.
+    Las `start` primeras filas se saltan sin parsearlas (reanudación).
+    """
+    if fmt == "csv":
+        rows = csv.DictReader(lines)
+        for row, record in enumerate(islice(rows, start, None), start):
+            text = record.get(text_field)
+            if not text:
+                yield {"row": row, "error": f"Falta el campo '{text_field}'"}
+                continue
+            yield {"row": row, "id": record.get(id_field), "text": text}
+        return
+
+    row = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        if row <= start:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"row": row - 1, "error": f"JSON no válido: {e}"}
+            continue
+        text = record.get(text_field) if isinstance(record, dict) else None
+        if not isinstance(text, str) or not text:
+            yield {"row": row - 1, "error": f"Falta el campo '{text_field}'"}
+            continue
+        yield {"row": row - 1, "id": record.get(id_field), "text": text}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---------- Detector de fraude en procesos ----------
+
+_worker_detector = None
+
+
+def _init_fraud_worker(rules, model_path=None):
+    global _worker_detector
+    _worker_detector = FraudDetector(rules=rules)
+    if model_path:
+        # Cada proceso tiene su propio índice de reseñas recientes (casi duplicados)
+        _worker_detector = FakeReviewModel.load(model_path, detector=_worker_detector)
+
+
+def _fraud_batch(texts, review_ids):
+    return _worker_detector.analyze_batch(texts, review_ids)
+
+
+def review_key(record, source=None):
+    """Identidad de la reseña para el índice de casi duplicados: su id, o la fila dentro de `source`"""
+    if record.get("id") is not None:
+        return record["id"]
+    if source is not None:
+        return (source, record["row"])
+    return None
+
+
+def score_stream(records, sentiment_model, fraud_detector, batch_size=256, executor=None,
+                 fraud_pool=None, fraud_workers=1, include_text=False, submit=None, timeout=None,
+                 source=None):
+    """
+    Genera los resultados lote a lote, en el orden de entrada. El lote de sentimiento
+    se envía a `executor` (el forward libera el GIL) mientras el fraude del mismo lote
+    se calcula aquí o en `fraud_pool` (ProcessPoolExecutor de `fraud_workers` procesos).
+    `submit(fn, *args)`, si se indica, sustituye a executor.submit (p. ej. un
+    InferencePool con control de admisión); `timeout` acota la espera de cada lote.
+    `source` (p. ej. la ruta del fichero) identifica las filas sin id: al reanudar,
+    una fila ya analizada no se compara consigo misma.
+    """
+    own_executor = executor is None and submit is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-sentiment")
+    submit = submit or executor.submit
+    try:
+        for chunk in chunked(records, batch_size):
+            valid = [r for r in chunk if "error" not in r]
+            texts = [r["text"] for r in valid]
+            review_ids = [review_key(r, source) for r in valid]
+            sentiment_future = submit(sentiment_model.analyze_batch, texts)
+            if fraud_pool is not None and texts:
+                step = -(-len(texts) // fraud_workers)
+                starts = range(0, len(texts), step)
+                frauds = [f for part in fraud_pool.map(_fraud_batch, [texts[i:i + step] for i in starts],
+                                                       [review_ids[i:i + step] for i in starts])
+                          for f in part]
+            else:
+                frauds = fraud_detector.analyze_batch(texts, review_ids)
+            try:
+                sentiments = sentiment_future.result(timeout)
+            except FutureTimeout:
+                # Si aún no empezó, no ocupa el pool
+                sentiment_future.cancel()
+                raise
+            results = iter(zip(sentiments, frauds))
+
+            for record in chunk:
+                if "error" in record:
+                    yield record
+                    continue
+                s, f = next(results)
+                out = {"row": record["row"]}
+                if record.get("id") is not None:
+                    out["id"] = record["id"]
+                if include_text:
+                    out["text"] = record["text"]
+                out.update({
+                    "sentiment": s["sentiment"],
+                    "confidence": s["confidence"],
+                    "probabilities": s["probabilities"],
+                    "is_fake": f["is_fake"],
+                    "fake_probability": f["fake_probability"]
+                })
+                yield out
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+
+
+# ---------- Checkpoint ----------
+
+def checkpoint_path(output):
+    return output + ".checkpoint"
+
+
+def read_checkpoint(output, input_path):
+    try:
+        with open(checkpoint_path(output), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("input") != os.path.abspath(input_path):
+        raise SystemExit(f"❌ El checkpoint de {output} es de otro fichero: {state.get('input')}")
+    return state
+
+
+def write_checkpoint(output, input_path, rows, out_file, completed=False):
+    """Vuelca la salida a disco y guarda filas procesadas + bytes escritos (atómico)"""
+    out_file.flush()
+    os.fsync(out_file.fileno())
+    state = {"input": os.path.abspath(input_path), "rows": rows,
+             "output_bytes": out_file.tell(), "completed": completed}
+    tmp = checkpoint_path(output) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint_path(output))
+
+
+def peak_memory_mb():
+    """
+    Pico de RSS de este proceso y de sus hijos ya terminados (ru_maxrss en KB en Linux).
+    Sin el módulo resource (Windows) devuelve (None, None).
+    """
+    if resource is None:
+        return None, None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+def run(input_path, output, fmt=None, text_field="text", id_field="id", batch_size=256,
+        fraud_workers=0, checkpoint_every=10000, resume=False, include_text=False,
+        fraud_model=None, sentiment_model=None, fraud_detector=None):
+    """Puntúa `input_path` en `output` (JSONL) y devuelve el resumen de la ejecución"""
+    fmt = fmt or detect_format(input_path)
+    state = read_checkpoint(output, input_path) if resume else None
+    if state and state.get("completed"):
+        print(f"✅ {input_path} ya estaba completo ({state['rows']} filas)")
+        return {"rows": 0, "errors": 0, "seconds": 0.0, "resumed_from": state["rows"]}
+    start_row = state["rows"] if state else 0
+
+    sentiment_model = sentiment_model or SentimentModel()
+    if fraud_detector is None:
+        fraud_detector = FraudDetector()
+        if fraud_model:
+            fraud_detector = FakeReviewModel.load(fraud_model, detector=fraud_detector)
+    if fraud_model and fraud_workers > 1:
+        # Cada proceso tendría su propio índice de casi duplicados: un clon que cae en
+        # otro worker no se detectaría. Con un solo worker todas las reseñas lo comparten
+        print(f"⚠️ Con --fraud-model se usa 1 worker de fraude (no {fraud_workers}): "
+              "el índice de casi duplicados es por proceso")
+        fraud_workers = 1
+    fraud_pool = None
+    if fraud_workers > 0:
+        rules = getattr(fraud_detector, "detector", fraud_detector).rules
+        fraud_pool = ProcessPoolExecutor(max_workers=fraud_workers, initializer=_init_fraud_worker,
+                                         initargs=(rules, fraud_model))
+
+    rows = errors = 0
+    next_checkpoint = checkpoint_every
+    started = time.perf_counter()
+    out_file = open(output, "r+b" if state else "wb")
+    try:
+        if state:
+            # Lo escrito después del último checkpoint se descarta y se vuelve a calcular
+            out_file.truncate(state["output_bytes"])
+            out_file.seek(state["output_bytes"])
+            print(f"🔄 Reanudando desde la fila {start_row}")
+        with open(input_path, encoding="utf-8", newline="") as in_file:
+            records = iter_records(in_file, fmt, text_field, id_field, start=start_row)
+            for result in score_stream(records, sentiment_model, fraud_detector, batch_size=batch_size,
+                                       fraud_pool=fraud_pool, fraud_workers=max(fraud_workers, 1),
+                                       include_text=include_text, source=os.path.abspath(input_path)):
+                out_file.write((json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8"))
+                rows += 1
+                errors += "error" in result
+                # Solo en fronteras de lote: todas las filas anteriores ya están escritas
+                if checkpoint_every and rows >= next_checkpoint and rows % batch_size == 0:
+                    write_checkpoint(output, input_path, start_row + rows, out_file)
+                    next_checkpoint = rows + checkpoint_every
+        write_checkpoint(output, input_path, start_row + rows, out_file, completed=True)
+    finally:
+        out_file.close()
+        if fraud_pool is not None:
+            fraud_pool.shutdown()
+
+    return {"rows": rows, "errors": errors, "seconds": time.perf_counter() - started,
+            "resumed_from": start_row}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Puntuación masiva de reseñas (JSONL/CSV -> JSONL)")
+    parser.add_argument("input", help="Fichero .jsonl o .csv")
+    parser.add_argument("-o", "--output", required=True, help="Fichero JSONL de salida")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Por defecto según la extensión")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--fraud-workers", type=int, default=0,
+                        help="Procesos para el detector de fraude (0 = en paralelo con el modelo, en este proceso)")
+    parser.add_argument("--fraud-model", help="Modelo de reseñas falsas (.npz de fake_review_model train); "
+                                              "limita --fraud-workers a 1")
+    parser.add_argument("--checkpoint-every", type=int, default=10000,
+                        help="Filas entre checkpoints (se guarda al terminar el lote siguiente)")
+    parser.add_argument("--resume", action="store_true", help="Continuar desde el último checkpoint")
+    parser.add_argument("--include-text", action="store_true", help="Copiar el texto en la salida")
+    args = parser.parse_args()
+
+    summary = run(args.input, args.output, fmt=args.format, text_field=args.text_field,
+                  id_field=args.id_field, batch_size=args.batch_size, fraud_workers=args.fraud_workers,
+                  checkpoint_every=args.checkpoint_every, resume=args.resume,
+                  include_text=args.include_text, fraud_model=args.fraud_model)
+    own, children = peak_memory_mb()
+    print("=" * 64)
+    print(f"PUNTUACIÓN MASIVA - {args.input} -> {args.output}")
+    print("=" * 64)
+    print(f"Filas procesadas:     {summary['rows']} (desde la fila {summary['resumed_from']})")
+    print(f"Filas con error:      {summary['errors']}")
+    print(f"Tiempo:               {summary['seconds']:.1f} s")
+    print(f"Reseñas/segundo:      {summary['rows'] / max(summary['seconds'], 1e-9):.1f}")
+    if own is None:
+        print("Pico de memoria:      n/d (sin el módulo resource)")
+    else:
+        print(f"Pico de memoria:      {own:.1f} MB" + (f" (+ {children:.1f} MB por worker de fraude)"
+                                                          if args.fraud_workers else ""))
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
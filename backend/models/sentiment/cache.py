@@ -0,0 +1,129 @@
+# backend/models/sentiment/cache.py
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """NFC + minúsculas + espacios colapsados: 'Muy  BUENO\\n' y 'muy bueno' son la misma reseña"""
+    return " ".join(unicodedata.normalize("NFC", text).lower().split())
+
+
+class ResultCache:
+    """
+    Caché LRU con TTL de resultados por texto normalizado, opcionalmente respaldada
+    en un fichero sqlite compartido entre workers. La clave incluye `version` (modelo
+    y versión del analizador, o hash de los patrones): si el analizador cambia, las
+    entradas antiguas dejan de coincidir y caducan solas.
+
+    `observer`, si se asigna, recibe 'hit', 'disk_hit' o 'miss' en cada consulta.
+    """
+
+    def __init__(self, version, max_entries=10000, ttl=86400, disk_path=None, name="sentiment"):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.observer = None
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> (caduca_en, resultado)
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+        self.disk_path = disk_path
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, timeout=5, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(cache TEXT, key TEXT, value TEXT, expires_at REAL, PRIMARY KEY (cache, key))"
+            )
+            self._db.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def key(self, text):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.version}\0".encode("utf-8"))
+        # surrogatepass: un surrogate suelto (válido en JSON) no debe romper la consulta
+        h.update(normalize_text(text).encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """Resultado cacheado (una copia) o None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._notify("hit")
+                    return json.loads(value)
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM results WHERE cache = ? AND key = ? AND expires_at >= ?",
+                    (self.name, key, now)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self._counters["disk_hits"] += 1
+                    self._notify("disk_hit")
+                    return json.loads(row[0])
+
+            self._counters["misses"] += 1
+            self._notify("miss")
+            return None
+
+    def put(self, key, result):
+        self.put_many([(key, result)])
+
+    def put_many(self, items):
+        expires_at = time.time() + self.ttl
+        rows = [(self.name, key, json.dumps(result), expires_at) for key, result in items]
+        with self._lock:
+            for _, key, value, _ in rows:
+                self._remember(key, value, expires_at)
+            if self._db is not None and rows:
+                self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+
+    def _remember(self, key, value, expires_at):
+        # Se guarda el JSON: cada get devuelve un dict nuevo que el llamador puede modificar
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _notify(self, event):
+        if self.observer is not None:
+            self.observer(event)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results WHERE cache = ?", (self.name,))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            c = dict(self._counters)
+            total = c["hits"] + c["disk_hits"] + c["misses"]
+            return {
+                **c,
+                "hit_ratio": round((c["hits"] + c["disk_hits"]) / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "version": self.version,
+                "disk_path": self.disk_path,
+            }
@@ -0,0 +1,520 @@
+"""
+Modelo estadístico de reseñas falsas (sustituye la puntuación solo con reglas)
+
+Características calculadas por lotes con numpy:
+  - n-gramas de caracteres (3) del texto normalizado, con hashing a 2^12 columnas
+  - nº de reglas de FraudDetector que se cumplen
+  - densidad de exclamaciones, proporción de mayúsculas
+  - repetición de palabras y de caracteres (rachas de 3 o más)
+  - z-score de la longitud (y su cuadrado: tan sospechosa es una reseña muy corta como una enorme)
+  - similitud con reseñas recientes casi idénticas: MinHash de 5-gramas + LSH por bandas
+Encima, una regresión logística entrenada desde un CSV etiquetado. La salida de
+analyze() es la de FraudDetector: {"is_fake", "fake_probability"}.
+
+Uso (desde backend/):
+    python -m models.sentiment.fake_review_model train reseñas.csv --text-column review_text \\
+        --label-column is_fake -o data/fake_review_model.npz
+    python -m models.sentiment.fake_review_model benchmark --model data/fake_review_model.npz
+"""
+
+import sys
+import os
+import csv
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.sentiment.cache import normalize_text
+from models.sentiment.fraud_detector import FraudDetector
+
+HASH_BITS = 12
+NGRAM = 3
+SHINGLE = 5
+NUM_PERM = 64
+BANDS = 16
+# Reseñas por bloque al calcular MinHash (la matriz intermedia es NUM_PERM x nº de shingles)
+MINHASH_CHUNK = 256
+
+DENSE_FEATURES = [
+    "reglas", "exclamaciones", "mayusculas", "repeticion_palabras",
+    "repeticion_caracteres", "longitud_z", "longitud_z2", "duplicado",
+]
+
+POSITIVE_LABELS = {"1", "true", "yes", "si", "sí", "fake", "falsa", "spam"}
+
+
+# ---------- Texto -> códigos por lotes ----------
+
+def _encode_batch(texts):
+    """
+    Concatena los textos separados por \\0 en un array de códigos Unicode.
+    Devuelve (códigos, fila de cada código, longitudes).
+    """
+    texts = [t.replace("\0", " ") for t in texts]
+    lengths = np.array([len(t) for t in texts], dtype=np.int64)
+    # surrogatepass: JSON admite surrogates sueltos ("\ud800") y no deben tumbar el lote
+    codes = np.frombuffer("\0".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.uint64)
+    rows = np.repeat(np.arange(len(texts)), lengths + 1)[:len(codes)]
+    return codes, rows, lengths
+
+
+def _ngram_hashes(codes, rows, n):
+    """Hash (uint64) de cada n-grama que no cruza de un texto a otro, y su fila"""
+    if len(codes) < n:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    h = np.zeros(len(codes) - n + 1, dtype=np.uint64)
+    for k in range(n):
+        # Aritmética módulo 2^64: el desbordamiento de uint64 es intencionado
+        h = h * np.uint64(1000003) + codes[k:len(codes) - n + 1 + k]
+    valid = (rows[:len(h)] == rows[n - 1:]) & (codes[n - 1:] != 0)
+    return h[valid], rows[:len(h)][valid]
+
+
+def _uppercase_ratio(texts):
+    """Mayúsculas / letras con mayúscula y minúscula, comparando el texto con su upper() y lower()"""
+    raw = "\0".join(texts)
+    upper, lower = raw.upper(), raw.lower()
+    if not (len(raw) == len(upper) == len(lower)):
+        # Algún carácter cambia de longitud al pasar a mayúsculas (ß, İ...): texto a texto
+        return np.array([_uppercase_ratio([t])[0] for t in texts]) if len(texts) > 1 else \
+            np.array([sum(c.isupper() for c in raw) / max(sum(c.isalpha() for c in raw), 1)])
+    codes = [np.frombuffer(t.encode("utf-32-le", "surrogatepass"), dtype=np.uint32) for t in (raw, upper, lower)]
+    rows = np.repeat(np.arange(len(texts)), [len(t) + 1 for t in texts])[:len(raw)]
+    cased = codes[1] != codes[2]
+    upper_count = np.bincount(rows[cased & (codes[0] == codes[1])], minlength=len(texts))
+    return upper_count / np.maximum(np.bincount(rows[cased], minlength=len(texts)), 1)
+
+
+def _mix(h):
+    """Dispersa los bits del hash (multiplicación de Fibonacci)"""
+    return h * np.uint64(0x9E3779B97F4A7C15)
+
+
+class MinHashLSH:
+    """
+    Índice LSH de las firmas MinHash de las últimas `capacity` reseñas. Cada firma se
+    parte en `bands` bandas: dos reseñas son candidatas si coinciden en alguna banda, y
+    su similitud (Jaccard estimado) es la fracción de valores iguales de la firma.
+    Cada cubo guarda solo sus `bucket_size` reseñas más recientes: con una oleada de
+    reseñas clonadas el coste por consulta no crece con el tamaño del índice.
+
+    Una reseña puede llevar una clave de identidad (su id, o fila + fichero): volver a
+    analizarla solo la compara con las reseñas anteriores a su primer análisis y no la
+    añade otra vez, así que el resultado no cambia entre llamadas. Sin clave cada
+    análisis es una reseña nueva: las copias exactas de otra cuentan como duplicados.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, capacity=50000, bucket_size=32, seed=7):
+        # Permutaciones multiply-shift: ((a * x + b) mod 2^64) >> 32, con `a` impar
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 1 << 62, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.capacity = capacity
+        self.bucket_size = bucket_size
+        self._lock = threading.Lock()
+        self._ring = np.zeros((capacity, num_perm), dtype=np.uint32)  # firma de la secuencia s en s % capacity
+        self._buckets = {}     # (banda, valores) -> deque de nº de secuencia
+        self._ring_keys = [None] * capacity
+        self._ring_review = [None] * capacity  # clave de la reseña de cada hueco
+        self._seq_by_review = {}                # clave de la reseña -> nº de secuencia vigente
+        self._seq = 0
+
+    def signatures(self, codes, rows, num_texts):
+        """Firmas (num_texts x num_perm) de los 5-gramas de cada texto; -1 si es demasiado corto"""
+        sigs = np.full((num_texts, len(self.a)), -1, dtype=np.int64)
+        hashes, hash_rows = _ngram_hashes(codes, rows, SHINGLE)
+        if not len(hashes):
+            return sigs
+        x = _mix(hashes)
+        present = np.unique(hash_rows)
+        starts = np.searchsorted(hash_rows, present)
+        for i in range(0, len(present), MINHASH_CHUNK):
+            lo = starts[i]
+            hi = starts[i + MINHASH_CHUNK] if i + MINHASH_CHUNK < len(present) else len(x)
+            permuted = (self.a[:, None] * x[None, lo:hi] + self.b[:, None]) >> np.uint64(32)
+            block = np.minimum.reduceat(permuted, starts[i:i + MINHASH_CHUNK] - lo, axis=1)
+            sigs[present[i:i + MINHASH_CHUNK]] = block.T
+        return sigs
+
+    def _band_keys(self, sig):
+        r = self.rows_per_band
+        return [(band, sig[band * r:(band + 1) * r].tobytes()) for band in range(self.bands)]
+
+    def query_and_add(self, sig, review_key=None):
+        """
+        Similitud máxima con las reseñas recientes; después añade esta al índice. Si la
+        reseña (`review_key`) ya estaba, solo cuentan las anteriores y no se añade.
+        """
+        if sig[0] < 0:
+            return 0.0
+        keys = self._band_keys(sig)
+        with self._lock:
+            oldest = self._seq - self.capacity
+            own = self._seq_by_review.get(review_key) if review_key is not None else None
+            newest = own if own is not None else self._seq
+            candidates = {seq for key in keys for seq in self._buckets.get(key, ()) if oldest <= seq < newest}
+            best = 0.0
+            if candidates:
+                slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates)) % self.capacity
+                best = float((self._ring[slots] == sig).mean(axis=1).max())
+
+            if own is not None:
+                return best
+
+            seq = self._seq
+            self._seq += 1
+            slot = seq % self.capacity
+            # Se libera la reseña que ocupaba el hueco: sus cubos sin reseñas vigentes se borran
+            for key in self._ring_keys[slot] or ():
+                bucket = self._buckets.get(key)
+                if bucket is not None and bucket[-1] <= oldest:
+                    del self._buckets[key]
+            evicted = self._ring_review[slot]
+            if evicted is not None and self._seq_by_review.get(evicted) == seq - self.capacity:
+                del self._seq_by_review[evicted]
+            self._ring[slot] = sig
+            self._ring_keys[slot] = keys
+            self._ring_review[slot] = review_key
+            if review_key is not None:
+                self._seq_by_review[review_key] = seq
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = deque(maxlen=self.bucket_size)
+                bucket.append(seq)
+        return best
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._ring_keys = [None] * self.capacity
+            self._ring_review = [None] * self.capacity
+            self._seq_by_review.clear()
+            self._seq = 0
+
+
+class FakeReviewModel:
+    """
+    Regresión logística sobre n-gramas con hashing + características densas. Se usa
+    igual que FraudDetector (analyze / analyze_batch / cache / version); la similitud
+    con reseñas recientes hace que el modelo tenga estado: cada reseña analizada se
+    añade al índice LSH. Sin pesos entrenados (fit o load) analyze() devuelve el
+    veredicto de las reglas: con pesos a cero toda reseña tendría p = 0.5.
+    """
+
+    def __init__(self, detector=None, hash_bits=HASH_BITS, threshold=0.5, lsh_capacity=50000):
+        self.detector = detector or FraudDetector()
+        self.hash_bits = hash_bits
+        self.threshold = threshold
+        self.lsh = MinHashLSH(capacity=lsh_capacity)
+
+        self.hashed_weights = np.zeros(1 << hash_bits, dtype=np.float64)
+        self.dense_weights = np.zeros(len(DENSE_FEATURES), dtype=np.float64)
+        self.bias = 0.0
+        self.dense_mean = np.zeros(len(DENSE_FEATURES))
+        self.dense_std = np.ones(len(DENSE_FEATURES))
+        self.length_mean = 0.0
+        self.length_std = 1.0
+        self.trained = False
+
+        self.version = self._weights_version()
+        self.cache = None
+
+    # ---------- Características ----------
+
+    def _hashed_features(self, codes, rows, num_texts):
+        """(fila, columna, valor) de los n-gramas con hashing, normalizados L2 por fila"""
+        hashes, hash_rows = _ngram_hashes(codes, rows, NGRAM)
+        columns = (_mix(hashes) >> np.uint64(64 - self.hash_bits)).astype(np.int64)
+        keys, counts = np.unique(hash_rows * (1 << self.hash_bits) + columns, return_counts=True)
+        feat_rows, feat_cols = keys >> self.hash_bits, keys & ((1 << self.hash_bits) - 1)
+        counts = counts.astype(np.float64)
+        norms = np.sqrt(np.bincount(feat_rows, counts ** 2, minlength=num_texts))
+        return feat_rows, feat_cols, counts / norms[feat_rows]
+
+    def _dense_features(self, texts, normalized, codes, rows, lengths, remember=True, review_ids=None):
+        n = len(texts)
+        safe_len = np.maximum(lengths, 1)
+        dense = np.zeros((n, len(DENSE_FEATURES)))
+        dense[:, 0] = [len(self.detector.matched_rules(t)) for t in texts]
+        dense[:, 1] = [t.count("!") for t in texts]
+        dense[:, 1] /= np.maximum([len(t) for t in texts], 1)
+        dense[:, 2] = _uppercase_ratio(texts)
+        words = [t.split() for t in normalized]
+        dense[:, 3] = [1 - len(set(w)) / len(w) if w else 0.0 for w in words]
+        # Rachas: el carácter es igual a los dos anteriores del mismo texto
+        run = (codes[2:] == codes[1:-1]) & (codes[1:-1] == codes[:-2]) & (rows[2:] == rows[:-2]) if len(codes) > 2 \
+            else np.zeros(0, dtype=bool)
+        dense[:, 4] = np.bincount(rows[2:][run], minlength=n)[:n] / safe_len if len(run) else 0.0
+        z = (np.log1p(lengths) - self.length_mean) / self.length_std
+        dense[:, 5] = z
+        dense[:, 6] = z ** 2
+        sigs = self.lsh.signatures(codes, rows, n)
+        review_ids = review_ids if review_ids is not None else [None] * n
+        dense[:, 7] = [self.lsh.query_and_add(sig, review_id) for sig, review_id in zip(sigs, review_ids)] \
+            if remember else 0.0
+        return dense
+
+    def features(self, texts, remember=True, review_ids=None):
+        """
+        (características con hashing (fila, columna, valor), densas sin estandarizar).
+        `review_ids` identifica cada reseña en el índice de casi duplicados (None = nueva).
+        """
+        normalized = [normalize_text(t) for t in texts]
+        codes, rows, lengths = _encode_batch(normalized)
+        hashed = self._hashed_features(codes, rows, len(texts))
+        dense = self._dense_features(texts, normalized, codes, rows, lengths, remember=remember,
+                                     review_ids=review_ids)
+        return hashed, dense
+
+    def _logits(self, hashed, dense, num_texts):
+        feat_rows, feat_cols, values = hashed
+        logits = np.bincount(feat_rows, values * self.hashed_weights[feat_cols], minlength=num_texts)
+        logits += ((dense - self.dense_mean) / self.dense_std) @ self.dense_weights
+        return logits + self.bias
+
+    # ---------- Inferencia ----------
+
+    def predict_proba(self, texts, review_ids=None):
+        texts = list(texts)
+        if not texts:
+            return np.zeros(0)
+        hashed, dense = self.features(texts, review_ids=review_ids)
+        return 1.0 / (1.0 + np.exp(-self._logits(hashed, dense, len(texts))))
+
+    def analyze_batch(self, texts, review_ids=None):
+        """
+        `review_ids` (id de cada reseña, o None) hace idempotente volver a analizar la
+        misma reseña; sin id, una copia exacta de otra reseña cuenta como duplicado.
+        """
+        if not self.trained:
+            return self.detector.analyze_batch(texts)
+        texts = list(texts)
+        results = [None] * len(texts)
+        keys = [self.cache.key(t) for t in texts] if self.cache is not None else None
+        pending = []
+        for i in range(len(texts)):
+            if keys is not None:
+                results[i] = self.cache.get(keys[i])
+            if results[i] is None:
+                pending.append(i)
+        if pending:
+            probs = self.predict_proba([texts[i] for i in pending],
+                                       [review_ids[i] for i in pending] if review_ids is not None else None)
+            computed = [
+                {"is_fake": bool(p >= self.threshold), "fake_probability": round(float(p), 4)}
+                for p in probs
+            ]
+            for i, result in zip(pending, computed):
+                results[i] = result
+            if self.cache is not None:
+                self.cache.put_many([(keys[i], result) for i, result in zip(pending, computed)])
+        return results
+
+    def analyze(self, text: str, review_id=None) -> dict:
+        return self.analyze_batch([text], None if review_id is None else [review_id])[0]
+
+    # ---------- Entrenamiento ----------
+
+    def fit(self, texts, labels, epochs=300, lr=0.1, l2=1e-4):
+        """
+        Regresión logística con Adam sobre todo el conjunto (descenso por gradiente
+        completo: las características con hashing se quedan en formato disperso).
+        Las reseñas se añaden al índice LSH en orden, como llegarían en producción.
+        """
+        texts = list(texts)
+        y = np.asarray(labels, dtype=np.float64)
+        lengths = np.log1p([len(normalize_text(t)) for t in texts])
+        self.length_mean, self.length_std = float(lengths.mean()), float(lengths.std() or 1.0)
+        self.lsh.clear()
+        hashed, dense = self.features(texts)
+        self.lsh.clear()
+        self.dense_mean = dense.mean(axis=0)
+        self.dense_std = dense.std(axis=0)
+        self.dense_std[self.dense_std == 0] = 1.0
+        standardized = (dense - self.dense_mean) / self.dense_std
+
+        # Pesos por clase: las dos clases pesan lo mismo aunque estén desbalanceadas
+        pos = max(y.sum(), 1.0)
+        neg = max(len(y) - y.sum(), 1.0)
+        sample_w = np.where(y == 1, len(y) / (2 * pos), len(y) / (2 * neg)) / len(y)
+
+        feat_rows, feat_cols, values = hashed
+        params = [np.zeros_like(self.hashed_weights), np.zeros_like(self.dense_weights), np.zeros(1)]
+        m = [np.zeros_like(p) for p in params]
+        v = [np.zeros_like(p) for p in params]
+        for step in range(1, epochs + 1):
+            w_h, w_d, b = params
+            logits = np.bincount(feat_rows, values * w_h[feat_cols], minlength=len(y)) + standardized @ w_d + b[0]
+            g = (1.0 / (1.0 + np.exp(-logits)) - y) * sample_w
+            grads = [
+                np.bincount(feat_cols, values * g[feat_rows], minlength=len(w_h)) + l2 * w_h,
+                standardized.T @ g + l2 * w_d,
+                np.array([g.sum()]),
+            ]
+            for i, grad in enumerate(grads):
+                m[i] = 0.9 * m[i] + 0.1 * grad
+                v[i] = 0.999 * v[i] + 0.001 * grad ** 2
+                params[i] = params[i] - lr * (m[i] / (1 - 0.9 ** step)) / (np.sqrt(v[i] / (1 - 0.999 ** step)) + 1e-8)
+
+        self.hashed_weights, self.dense_weights, self.bias = params[0], params[1], float(params[2][0])
+        self.trained = True
+        self.version = self._weights_version()
+        return self
+
+    # ---------- Persistencia ----------
+
+    def _weights_version(self):
+        h = hashlib.blake2b(digest_size=8)
+        for array in (self.hashed_weights, self.dense_weights, np.array([self.bias, self.threshold])):
+            h.update(np.ascontiguousarray(array).tobytes())
+        h.update(self.detector.version.encode("utf-8"))
+        return ("fakemodel-" if self.trained else "fakemodel-untrained-") + h.hexdigest()
+
+    def save(self, path):
+        np.savez(
+            path,
+            hashed_weights=self.hashed_weights,
+            dense_weights=self.dense_weights,
+            bias=self.bias,
+            dense_mean=self.dense_mean,
+            dense_std=self.dense_std,
+            length=np.array([self.length_mean, self.length_std]),
+            threshold=self.threshold,
+            hash_bits=self.hash_bits,
+            trained=self.trained,
+        )
+
+    @classmethod
+    def load(cls, path, detector=None, lsh_capacity=50000):
+        data = np.load(path)
+        model = cls(detector=detector, hash_bits=int(data["hash_bits"]), threshold=float(data["threshold"]),
+                    lsh_capacity=lsh_capacity)
+        model.hashed_weights = data["hashed_weights"]
+        model.dense_weights = data["dense_weights"]
+        model.bias = float(data["bias"])
+        model.dense_mean = data["dense_mean"]
+        model.dense_std = data["dense_std"]
+        model.length_mean, model.length_std = (float(x) for x in data["length"])
+        model.trained = bool(data["trained"]) if "trained" in data.files else True
+        model.version = model._weights_version()
+        return model
+
+
+# ---------- Evaluación ----------
+
+def evaluate(probs, labels, threshold=0.5):
+    """Accuracy, precisión, recall, F1 y ROC-AUC"""
+    y = np.asarray(labels, dtype=bool)
+    pred = np.asarray(probs) >= threshold
+    tp, fp, fn = int((pred & y).sum()), int((pred & ~y).sum()), int((~pred & y).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    # AUC = probabilidad de que una falsa puntúe más que una real (rangos de Mann-Whitney)
+    ranks = np.argsort(np.argsort(probs)) + 1
+    n_pos, n_neg = int(y.sum()), int((~y).sum())
+    auc = (ranks[y].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg) if n_pos and n_neg else 0.0
+    return {
+        "accuracy": round(float((pred == y).mean()), 4),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "roc_auc": round(float(auc), 4),
+    }
+
+
+def load_labelled_csv(path, text_column, label_column):
+    texts, labels = [], []
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get(text_column):
+                texts.append(row[text_column])
+                labels.append(str(row.get(label_column, "")).strip().lower() in POSITIVE_LABELS)
+    return texts, labels
+
+
+def train(args):
+    texts, labels = load_labelled_csv(args.csv, args.text_column, args.label_column)
+    order = list(range(len(texts)))
+    random.Random(args.seed).shuffle(order)
+    split = int(len(order) * (1 - args.validation))
+    train_idx, valid_idx = order[:split], order[split:]
+
+    start = time.perf_counter()
+    model = FakeReviewModel(detector=FraudDetector(patterns_path=args.patterns))
+    model.fit([texts[i] for i in train_idx], [labels[i] for i in train_idx], epochs=args.epochs, lr=args.lr)
+    train_seconds = time.perf_counter() - start
+    model.save(args.output)
+
+    print("=" * 64)
+    print(f"MODELO DE RESEÑAS FALSAS - {len(train_idx)} entrenamiento / {len(valid_idx)} validación")
+    print("=" * 64)
+    print(f"Entrenamiento: {train_seconds:.1f}s -> {args.output}")
+    if valid_idx:
+        probs = model.predict_proba([texts[i] for i in valid_idx])
+        for name, value in evaluate(probs, [labels[i] for i in valid_idx], model.threshold).items():
+            print(f"{name:<12} {value:.4f}")
+    print("Pesos de las características densas:")
+    for name, weight in zip(DENSE_FEATURES, model.dense_weights):
+        print(f"   {name:<24} {weight:+.3f}")
+    print("=" * 64)
+
+
+def benchmark(args):
+    from models.sentiment.benchmark_batch import synthetic_reviews
+
+    model = FakeReviewModel.load(args.model) if args.model else FakeReviewModel()
+    # Sin modelo se mide con pesos a cero (mismo coste) en lugar de caer en las reglas
+    model.trained = True
+    texts = synthetic_reviews(args.reviews)
+    print("=" * 56)
+    print(f"MODELO DE RESEÑAS FALSAS - {len(texts)} reseñas sintéticas")
+    print("=" * 56)
+    print(f"{'Lote':>8} {'µs/reseña':>12} {'Reseñas/s':>14}")
+    print("-" * 56)
+    for size in args.batch_sizes:
+        model.lsh.clear()
+        start = time.perf_counter()
+        for i in range(0, len(texts), size):
+            model.analyze_batch(texts[i:i + size])
+        elapsed = time.perf_counter() - start
+        print(f"{size:>8} {1e6 * elapsed / len(texts):>12.1f} {len(texts) / elapsed:>14.1f}")
+    print("=" * 56)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modelo estadístico de reseñas falsas")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="Entrenar desde un CSV etiquetado")
+    p_train.add_argument("csv")
+    p_train.add_argument("--text-column", default="text")
+    p_train.add_argument("--label-column", default="label",
+                         help="1/true/fake/spam = falsa; cualquier otro valor = real")
+    p_train.add_argument("-o", "--output", default="data/fake_review_model.npz")
+    p_train.add_argument("--patterns", help="Fichero de patrones extra del detector (FRAUD_PATTERNS_PATH)")
+    p_train.add_argument("--validation", type=float, default=0.1)
+    p_train.add_argument("--epochs", type=int, default=300)
+    p_train.add_argument("--lr", type=float, default=0.1)
+    p_train.add_argument("--seed", type=int, default=0)
+
+    p_bench = sub.add_parser("benchmark", help="µs por reseña según el tamaño de lote")
+    p_bench.add_argument("--model", help="Modelo .npz (sin él, pesos a cero: mismo coste)")
+    p_bench.add_argument("--reviews", type=int, default=5000)
+    p_bench.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256, 1024])
+
+    args = parser.parse_args()
+    train(args) if args.command == "train" else benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,152 @@
 # backend/models/sentiment/fraud_detector.py
 
 import re
+import json
+import hashlib
+
+from .cache import normalize_text
+
+# Reglas por defecto: cada regla suma 1 al score si alguna de sus entradas aparece.
+# Las entradas son frases literales; las que empiezan por "re:" son expresiones regulares.
+DEFAULT_RULES = {
+    "promocion": ["gratis", "regalo", "oferta especial"],
+    "superlativos_repetidos": ["re:(5 estrellas|increíble|perfecto|maravilloso){2,}"],
+    "urgencia": ["compra ya", "últimas unidades"],
+}
+
+REGEX_PREFIX = "re:"
+
+
+def load_rules(path):
+    """
+    Lee un fichero de patrones mantenido fuera del código: una frase por línea,
+    '# ...' comentarios, '[nombre]' empieza una regla nueva y 're:...' es una regex.
+    Las frases antes de la primera sección van a la regla 'spam'.
+    """
+    rules = {}
+    current = "spam"
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                current = line[1:-1].strip()
+                continue
+            rules.setdefault(current, []).append(line)
+    return rules
+
+
+def _trie_regex(node):
+    """Regex de un trie de frases: las alternativas comparten prefijo, la más larga primero"""
+    alternatives = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not alternatives:
+        return ""
+    body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    return "(?:" + body + ")?" if "" in node else body
+
+
+class PhraseMatcher:
+    """
+    Todas las frases de todas las reglas compiladas en una sola regex (factorizada
+    como trie) que recorre el texto una vez. Con miles de frases el coste por
+    posición depende del prefijo común, no del nº de frases como una alternancia
+    plana o un re.search por patrón.
+    """
+
+    def __init__(self, rules):
+        self._rules_by_phrase = {}
+        for name, phrases in rules.items():
+            for phrase in phrases:
+                self._rules_by_phrase.setdefault(phrase.lower(), set()).add(name)
+
+        trie = {}
+        for phrase in self._rules_by_phrase:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        # Lookahead: se prueba en cada posición sin consumir, así no se pierden frases solapadas
+        self._regex = re.compile("(?=(" + _trie_regex(trie) + "))") if trie else None
+
+        # En cada posición se captura la frase más larga: también cuentan las que son prefijo suyo
+        for phrase, names in self._rules_by_phrase.items():
+            for i in range(1, len(phrase)):
+                names |= self._rules_by_phrase.get(phrase[:i], set())
+
+    def __len__(self):
+        return len(self._rules_by_phrase)
+
+    def match(self, lowered):
+        """Nombres de las reglas con alguna frase en `lowered` (texto ya en minúsculas)"""
+        matched = set()
+        if self._regex is not None:
+            for m in self._regex.finditer(lowered):
+                matched |= self._rules_by_phrase[m.group(1)]
+        return matched
+
 
 class FraudDetector:
     """
     Detector simple de reseñas falsas basado en patrones sospechosos.
     No es ML, pero sirve para proyecto académico.
+
+    Los patrones se compilan una vez: las frases literales de todas las reglas en un
+    PhraseMatcher de una sola pasada y las regex de cada regla en un patrón propio.
     """
 
-    def analyze(self, text: str) -> dict:
-        suspicious_patterns = [
-            r"(gratis|regalo|oferta especial)",
-            r"(5 estrellas|increíble|perfecto|maravilloso){2,}",
-            r"(compra ya|últimas unidades)"
-        ]
+    def __init__(self, rules=None, patterns_path=None):
+        self.rules = {name: list(entries) for name, entries in (rules or DEFAULT_RULES).items()}
+        if patterns_path:
+            for name, entries in load_rules(patterns_path).items():
+                self.rules.setdefault(name, []).extend(entries)
+
+        phrases, regexes = {}, []
+        for name, entries in self.rules.items():
+            for entry in entries:
+                if entry.startswith(REGEX_PREFIX):
+                    regexes.append((name, re.compile(entry[len(REGEX_PREFIX):], re.IGNORECASE)))
+                else:
+                    phrases.setdefault(name, []).append(entry)
+        self.matcher = PhraseMatcher(phrases)
+        self.regexes = regexes
+
+        # Los resultados cacheados dependen de los patrones: su hash forma parte de la clave
+        serialized = json.dumps(self.rules, sort_keys=True, ensure_ascii=False)
+        self.version = "rules-" + hashlib.blake2b(serialized.encode("utf-8"), digest_size=8).hexdigest()
+        self.cache = None
 
-        score = 0
+    def matched_rules(self, text):
+        """
+        Reglas que se cumplen en `text`. Se busca sobre el texto normalizado, el mismo
+        que forma la clave de la caché: dos textos con la misma clave dan el mismo veredicto.
+        """
+        lowered = normalize_text(text)
+        matched = self.matcher.match(lowered)
+        for name, regex in self.regexes:
+            if name not in matched and regex.search(lowered):
+                matched.add(name)
+        return matched
 
-        for pattern in suspicious_patterns:
-            if re.search(pattern, text.lower()):
-                score += 1
+    def analyze(self, text: str) -> dict:
+        if self.cache is not None:
+            key = self.cache.key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        score = len(self.matched_rules(text))
 
         fake_prob = min(0.1 + score * 0.25, 0.98)
 
-        return {
+        result = {
             "is_fake": score > 0,
             "fake_probability": fake_prob
         }
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    def analyze_batch(self, texts, review_ids=None):
+        # `review_ids` por compatibilidad con FakeReviewModel: las reglas no tienen estado
+        return [self.analyze(text) for text in texts]
@@ -1,5 +1,8 @@
 # backend/models/sentiment/sentiment_analyzer.py
+import os
+
 try:
+    import pysentimiento
     from pysentimiento import create_analyzer
     print("✅ pysentimiento importado correctamente")
     PYSENTIMIENTO_AVAILABLE = True
@@ -7,9 +10,24 @@ except ImportError as e:
     print(f"❌ Error importando pysentimiento: {e}")
     PYSENTIMIENTO_AVAILABLE = False
 
+# Respuesta cuando no hay modelo (pysentimiento no instalado o falló al cargar)
+FALLBACK_RESULT = {
+    "sentiment": "neutral",
+    "confidence": 0.5,
+    "probabilities": {
+        "positive": 0.33,
+        "neutral": 0.34,
+        "negative": 0.33
+    }
+}
+
 class SentimentModel:
-    def __init__(self):
+    def __init__(self, batch_size=None, num_threads=None):
+        # Textos por forward en analyze_batch (SENTIMENT_BATCH_SIZE)
+        self.batch_size = batch_size or int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
         if PYSENTIMIENTO_AVAILABLE:
+            if num_threads:
+                _set_torch_threads(num_threads)
             try:
                 print("🔧 Intentando crear el analizador...")
                 self.model = create_analyzer(task="sentiment", lang="es")
@@ -20,6 +38,15 @@ class SentimentModel:
         else:
             print("❌ pysentimiento no disponible - usando modo respaldo")
             self.model = None
+        # Versión del analizador (clave de la caché) y caché opcional (ResultCache, la asigna el servidor)
+        self.version = self._model_version()
+        self.cache = None
+
+    def _model_version(self):
+        if not self.model:
+            return "fallback"
+        name = getattr(getattr(self.model, "model", None), "name_or_path", type(self.model).__name__)
+        return f"pysentimiento-{getattr(pysentimiento, '__version__', '?')}:{name}"
 
     def analyze(self, text: str):
         """
@@ -27,26 +54,94 @@ class SentimentModel:
         """
         if not self.model:
             print(f"🔧 Usando modo respaldo para texto: '{text}'")
-            return {
-                "sentiment": "neutral",
-                "confidence": 0.5,
-                "probabilities": {
-                    "positive": 0.33,
-                    "neutral": 0.34,
-                    "negative": 0.33
-                }
-            }
-
-        
-        result = self.model.predict(text)
-        
-        
-        return {
-            "sentiment": result.output,
-            "confidence": max(result.probas.values()),
-            "probabilities": {
-                "positive": result.probas.get("POS", 0.0),
-                "neutral": result.probas.get("NEU", 0.0),
-                "negative": result.probas.get("NEG", 0.0)
-            }
-        }
\ No newline at end of file
+            return _fallback_result()
+
+        if self.cache is not None:
+            key = self.cache.key(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        result = _to_result(self.model.predict(text))
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    def analyze_batch(self, texts, batch_size=None, bucket_by_length=True):
+        """
+        Analiza una lista de textos con la predicción por lotes de pysentimiento.
+
+        Los textos se ordenan por longitud y se agrupan en lotes de `batch_size`:
+        cada lote se rellena (padding) solo hasta su texto más largo, en vez de que
+        una reseña larga obligue a rellenar todas las cortas. Los resultados se
+        devuelven en el orden original. `bucket_by_length=False` mantiene el orden
+        de entrada en los lotes (solo para comparar en benchmark_batch.py).
+        """
+        texts = list(texts)
+        if not self.model:
+            if texts:
+                print(f"🔧 Usando modo respaldo para {len(texts)} textos")
+            return [_fallback_result() for _ in texts]
+        if self.cache is None:
+            return self._predict_batch(texts, batch_size, bucket_by_length)
+
+        # Con caché solo pasan por el modelo los textos (normalizados) no vistos, una vez cada uno
+        results = [None] * len(texts)
+        pending = {}  # clave -> posiciones
+        for pos, text in enumerate(texts):
+            key = self.cache.key(text)
+            if key in pending:
+                pending[key].append(pos)
+                continue
+            results[pos] = self.cache.get(key)
+            if results[pos] is None:
+                pending[key] = [pos]
+        if pending:
+            keys = list(pending)
+            computed = self._predict_batch([texts[pending[k][0]] for k in keys], batch_size, bucket_by_length)
+            self.cache.put_many(zip(keys, computed))
+            for key, result in zip(keys, computed):
+                for i, pos in enumerate(pending[key]):
+                    results[pos] = result if i == 0 else {**result, "probabilities": dict(result["probabilities"])}
+        return results
+
+    def _predict_batch(self, texts, batch_size, bucket_by_length):
+        batch_size = batch_size or self.batch_size
+        order = list(range(len(texts)))
+        if bucket_by_length:
+            order.sort(key=lambda i: len(texts[i]))
+        results = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            positions = order[start:start + batch_size]
+            # Sin batch_size, pysentimiento vuelve a partir la lista en lotes de 32
+            outputs = self.model.predict([texts[i] for i in positions], batch_size=batch_size)
+            for pos, output in zip(positions, outputs):
+                results[pos] = _to_result(output)
+        return results
+
+
+def _set_torch_threads(num_threads):
+    """Hilos intra-op de PyTorch (global del proceso): evita que cada forward use todos los núcleos"""
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+        print(f"   → PyTorch con {num_threads} hilos intra-op")
+    except ImportError:
+        pass
+
+
+def _fallback_result():
+    return {**FALLBACK_RESULT, "probabilities": dict(FALLBACK_RESULT["probabilities"])}
+
+
+def _to_result(result):
+    """AnalyzerOutput de pysentimiento -> dict de la API"""
+    return {
+        "sentiment": result.output,
+        "confidence": max(result.probas.values()),
+        "probabilities": {
+            "positive": result.probas.get("POS", 0.0),
+            "neutral": result.probas.get("NEU", 0.0),
+            "negative": result.probas.get("NEG", 0.0)
+        }
+    }
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Micro-batching dinámico sobre asyncio.
+
+    Acumula las peticiones pendientes durante como máximo `max_wait_ms`
+    (o hasta `max_batch_size`), ejecuta `batch_fn(items)` una sola vez en el
+    executor y resuelve el future de cada llamador con su resultado.
+    `batch_fn` recibe una lista y debe devolver una secuencia alineada con ella.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait_ms=10.0, executor=None, name="batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.executor = executor
+        self.name = name
+
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+        # Métricas
+        self._batch_sizes = {}
+        self._wait_times = deque(maxlen=1000)
+        self._total_items = 0
+        self._total_batches = 0
+        self._in_flight = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item):
+        """Encola un elemento y espera su resultado individual"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        first = await self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Lo que ya está en cola entra sin esperar
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            # Descartar llamadores que ya cancelaron
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._wait_times.append(started - enqueued)
+            size = len(batch)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._total_batches += 1
+            self._total_items += size
+            self._in_flight = size
+
+            items = [entry[0] for entry in batch]
+            try:
+                results = await self._loop.run_in_executor(self.executor, self.batch_fn, items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._in_flight = 0
+
+    def stats(self):
+        """Profundidad de cola, histograma de tamaños de batch y tiempos de espera"""
+        waits_ms = np.array(self._wait_times, dtype=np.float64) * 1000.0
+        if len(waits_ms):
+            wait = {
+                "avg_ms": round(float(waits_ms.mean()), 3),
+                "p50_ms": round(float(np.percentile(waits_ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(waits_ms, 95)), 3),
+                "max_ms": round(float(waits_ms.max()), 3),
+            }
+        else:
+            wait = {"avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "total_items": self._total_items,
+            "total_batches": self._total_batches,
+            "avg_batch_size": round(self._total_items / self._total_batches, 3) if self._total_batches else 0.0,
+            "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            "wait_time": wait,
+        }
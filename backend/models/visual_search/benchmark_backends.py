@@ -0,0 +1,98 @@
+"""
+Paridad y rendimiento de los backends de embeddings frente a la referencia Keras
+
+Compara la similitud coseno de cada backend con ResNet50 de Keras (float32)
+y mide latencia (batch 1) y throughput (batch N). Termina con código 1 si
+algún backend queda por debajo de --min-cosine.
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_backends --images ruta/a/fotos --onnx data/resnet50_int8.onnx
+"""
+
+import sys
+import os
+import glob
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.loader import create_extractor
+
+
+def load_images(images_dir, n):
+    paths = []
+    if images_dir:
+        for ext in ("jpg", "jpeg", "png", "webp"):
+            paths += glob.glob(os.path.join(images_dir, f"*.{ext}"))
+    paths = sorted(paths)[:n]
+    if paths:
+        return [Image.open(p).convert("RGB") for p in paths]
+    # Sin carpeta de imágenes: ruido estructurado reproducible
+    rng = np.random.default_rng(0)
+    return [Image.fromarray(rng.integers(0, 255, (256, 256, 3), dtype=np.uint8)) for _ in range(n)]
+
+
+def measure(extractor, images, batch_size, repeats=3):
+    extractor.images_to_embeddings(images[:1])  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for img in images[:16]:
+            extractor.images_to_embeddings([img])
+    latency_ms = 1000 * (time.perf_counter() - start) / (repeats * len(images[:16]))
+
+    start = time.perf_counter()
+    embs = []
+    for i in range(0, len(images), batch_size):
+        embs.append(extractor.images_to_embeddings(images[i:i + batch_size]))
+    throughput = len(images) / (time.perf_counter() - start)
+    return np.vstack(embs), latency_ms, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridad y rendimiento de backends de embeddings")
+    parser.add_argument("--images", help="Carpeta con imágenes de producto")
+    parser.add_argument("--n", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--onnx", nargs="+", default=[], help="Modelos ONNX a comparar (fp32 y/o int8)")
+    parser.add_argument("--threads", type=int, default=None, help="intra_op_num_threads de ONNX Runtime")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.n)
+
+    backends = [("keras", create_extractor("keras"))]
+    for path in args.onnx:
+        backends.append((os.path.basename(path), create_extractor("onnx", path, intra_op_threads=args.threads)))
+
+    print("=" * 78)
+    print(f"BACKENDS DE EMBEDDINGS - {len(images)} imágenes, batch {args.batch_size}")
+    print("=" * 78)
+    print(f"{'Backend':<26} {'Coseno medio':>12} {'Coseno mín':>11} {'ms/img (b=1)':>13} {'img/s':>9}")
+    print("-" * 78)
+
+    reference = None
+    failed = False
+    for name, extractor in backends:
+        embs, latency_ms, throughput = measure(extractor, images, args.batch_size)
+        if reference is None:
+            reference = embs
+        # Embeddings ya normalizados: coseno = producto escalar fila a fila
+        cos = np.sum(reference * embs, axis=1)
+        failed |= bool(cos.min() < args.min_cosine)
+        print(f"{name:<26} {cos.mean():>12.5f} {cos.min():>11.5f} {latency_ms:>13.2f} {throughput:>9.1f}")
+
+    print("=" * 78)
+    if failed:
+        print(f"❌ Algún backend queda por debajo de coseno {args.min_cosine}")
+        return 1
+    print(f"✅ Todos los backends superan coseno {args.min_cosine} frente a Keras")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Pico de RSS y latencia por petición: decodificación a resolución completa vs decode_image (draft JPEG)
+
+Cada modo se ejecuta en un proceso nuevo y el pico se mide como incremento de
+VmHWM sobre el RSS tras los imports (en Linux el pico se reinicia con clear_refs).
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_decode                   # JPEG sintético de 12MP
+    python -m models.visual_search.benchmark_decode --image foto.jpg
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+from io import BytesIO
+
+try:
+    import resource  # Solo Unix
+except ImportError:
+    resource = None
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.loader import decode_image, preprocess_input
+
+
+def synthetic_photo(path, width=4000, height=3000):
+    """JPEG de 12MP con gradientes y ruido (se comprime como una foto, no como un color plano)"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    arr = np.empty((height, width, 3), dtype=np.uint8)
+    arr[..., 0] = x
+    arr[..., 1] = y
+    arr[..., 2] = rng.integers(0, 64, (height, width), dtype=np.uint8) + 96
+    Image.fromarray(arr).save(path, quality=90)
+
+
+def full_resolution(content):
+    """Camino anterior: decodifica a resolución completa, convierte y copia a float32"""
+    img = Image.open(BytesIO(content)).convert("RGB")
+    arr = np.asarray(img.resize((224, 224)), dtype=np.float32)
+    return preprocess_input(arr[None, ...].copy())
+
+
+def streaming(content, buffer):
+    """Camino nuevo: draft a ~224 y escritura directa en el buffer preasignado"""
+    buffer[0] = np.asarray(decode_image(content))
+    return preprocess_input(buffer)
+
+
+def _proc_status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise OSError(field)
+
+
+def _max_rss_mb():
+    # Linux: KB; macOS: bytes. Sin /proc ni resource (Windows) no hay medida
+    if resource is None:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform != "darwin" else rss / 1e6
+
+
+def reset_peak_rss():
+    """
+    Reinicia el pico de RSS del proceso (Linux: VmHWM vía clear_refs). Así el pico
+    medido corresponde solo a la petición y no a los imports.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return _proc_status_mb("VmRSS")
+    except OSError:
+        return _max_rss_mb()
+
+
+def peak_rss_mb():
+    try:
+        return _proc_status_mb("VmHWM")
+    except OSError:
+        return _max_rss_mb()
+
+
+def run_mode(mode, image_path, repeats, queue):
+    with open(image_path, "rb") as f:
+        content = f.read()
+    buffer = np.empty((1, 224, 224, 3), dtype=np.float32)
+    buffer.fill(0)
+    baseline = reset_peak_rss()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        if mode == "full":
+            full_resolution(content)
+        else:
+            streaming(content, buffer)
+    elapsed_ms = 1000 * (time.perf_counter() - start) / repeats
+    queue.put((max(peak_rss_mb() - baseline, 0.0), elapsed_ms))
+
+
+def measure(mode, image_path, repeats):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=run_mode, args=(mode, image_path, repeats, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de RSS por petición al decodificar imágenes")
+    parser.add_argument("--image", help="Imagen de prueba (por defecto, JPEG sintético de 12MP)")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = args.image
+        if not image_path:
+            image_path = os.path.join(tmp, "foto_12mp.jpg")
+            synthetic_photo(image_path)
+
+        with Image.open(image_path) as img:
+            size = img.size
+        full_mb, full_ms = measure("full", image_path, args.repeats)
+        stream_mb, stream_ms = measure("streaming", image_path, args.repeats)
+
+    print("=" * 64)
+    print(f"DECODIFICACIÓN: {size[0]}x{size[1]} ({os.path.basename(image_path)})")
+    print("=" * 64)
+    print(f"{'Modo':<22} {'Pico RSS (MB)':>14} {'ms/imagen':>12}")
+    print("-" * 64)
+    print(f"{'Resolución completa':<22} {full_mb:>14.1f} {full_ms:>12.1f}")
+    print(f"{'draft + buffer':<22} {stream_mb:>14.1f} {stream_ms:>12.1f}")
+    print("-" * 64)
+    print(f"Reducción de pico: x{full_mb / max(stream_mb, 0.1):.1f}  |  Aceleración: x{full_ms / max(stream_ms, 1e-6):.1f}")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
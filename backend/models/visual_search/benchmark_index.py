@@ -0,0 +1,136 @@
+"""
+Reporte recall vs latencia de los índices aproximados frente al índice Flat (exacto)
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_index --embeddings data/embeddings_resnet50.npy
+    python -m models.visual_search.benchmark_index --synthetic 100000 --dim 2048
+    python -m models.visual_search.benchmark_index --types Flat IVFPQ --rerank 2 4 8   # + re-ranking exacto
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.utils import load_embeddings_npy
+from models.visual_search.index_factory import INDEX_TYPES, build_index, search_parameters, unwrap_index
+from models.visual_search.engine import rescore
+
+# Barrido de parámetros de búsqueda por tipo de índice ({} = los del índice, como en el servidor)
+SWEEPS = {
+    "Flat": [{}],
+    "IVFFlat": [{}] + [{"nprobe": p} for p in (1, 4, 16, 64)],
+    "IVFPQ": [{}] + [{"nprobe": p} for p in (1, 4, 16, 64)],
+    "HNSWFlat": [{}] + [{"ef_search": ef} for ef in (64, 128, 256)],
+}
+
+
+def default_label(index):
+    """Parámetros por defecto del índice (los que usa el servidor sin VISUAL_NPROBE/EF_SEARCH)"""
+    base = unwrap_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return f"def. nprobe={base.nprobe}"
+    if isinstance(base, faiss.IndexHNSW):
+        return f"def. ef={base.hnsw.efSearch}"
+    return "-"
+
+
+def recall_at_k(ground_truth, found):
+    """Fracción de los k vecinos exactos que aparecen en el resultado aproximado"""
+    hits = sum(len(set(gt) & set(f)) for gt, f in zip(ground_truth, found))
+    return hits / ground_truth.size
+
+
+def timed_search(index, queries, k, params=None, batch_size=1, rerank=None, emb=None):
+    # batch_size=1 simula el caso real del endpoint (una consulta por petición)
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    rerank_s = 0.0
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        q = queries[i:i + batch_size]
+        if rerank:
+            _, candidates = index.search(q, k * rerank, params=params)
+            t = time.perf_counter()
+            _, labels[i:i + batch_size] = rescore(q, candidates, lambda rows: emb[rows], k)
+            rerank_s += time.perf_counter() - t
+        else:
+            _, labels[i:i + batch_size] = index.search(q, k, params=params)
+    elapsed = time.perf_counter() - start
+    return labels, elapsed, rerank_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latencia de índices FAISS")
+    parser.add_argument("--embeddings", help="Ruta al .npy de embeddings")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Nº de vectores sintéticos si no hay .npy")
+    parser.add_argument("--dim", type=int, default=2048)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--rerank", type=int, nargs="*", default=[4],
+                        help="Factores de re-ranking exacto (top_k * r candidatos) para IVFPQ")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        emb = load_embeddings_npy(args.embeddings)
+    else:
+        rng = np.random.default_rng(0)
+        emb = rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+        faiss.normalize_L2(emb)
+
+    rng = np.random.default_rng(1)
+    q_idx = rng.choice(len(emb), min(args.queries, len(emb)), replace=False)
+    # Consultas = productos del catálogo con algo de ruido (como fotos del usuario)
+    queries = emb[q_idx] + 0.05 * rng.standard_normal((len(q_idx), emb.shape[1])).astype(np.float32)
+    faiss.normalize_L2(queries)
+
+    print("=" * 78)
+    print(f"RECALL@{args.k} vs LATENCIA - {len(emb):,} vectores x {emb.shape[1]} dims, {len(queries)} consultas")
+    print("=" * 78)
+
+    flat = build_index("Flat", emb)
+    ground_truth, _, _ = timed_search(flat, queries, args.k)
+
+    print(f"{'Índice':<10} {'Parámetros':<16} {'Build (s)':>10} {'Tamaño (MB)':>12} "
+          f"{'Recall':>8} {'ms/consulta':>12}")
+    print("-" * 78)
+    rerank_rows = []
+
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = flat if index_type == "Flat" else build_index(index_type, emb)
+        build_s = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        for sweep in SWEEPS[index_type]:
+            params = search_parameters(index, **sweep)
+            labels, elapsed, _ = timed_search(index, queries, args.k, params=params)
+            label = ", ".join(f"{k}={v}" for k, v in sweep.items()) or default_label(index)
+            print(f"{index_type:<10} {label:<16} {build_s:>10.2f} {size_mb:>12.1f} "
+                  f"{recall_at_k(ground_truth, labels):>8.3f} {1000 * elapsed / len(queries):>12.3f}")
+
+            if index_type == "IVFPQ":
+                for r in args.rerank:
+                    labels, elapsed, rerank_s = timed_search(index, queries, args.k, params=params,
+                                                             rerank=r, emb=emb)
+                    rerank_rows.append((f"{label}, r={r}", recall_at_k(ground_truth, labels),
+                                        1000 * (elapsed - rerank_s) / len(queries),
+                                        1000 * rerank_s / len(queries)))
+
+    if rerank_rows:
+        print("-" * 78)
+        print("IVFPQ + re-ranking exacto (float32)")
+        print(f"{'Parámetros':<27} {'Recall':>8} {'Índice (ms)':>12} {'Re-rank (ms)':>13}")
+        for label, recall, index_ms, rerank_ms in rerank_rows:
+            print(f"{label:<27} {recall:>8.3f} {index_ms:>12.3f} {rerank_ms:>13.3f}")
+
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
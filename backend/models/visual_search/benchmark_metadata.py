@@ -0,0 +1,110 @@
+"""
+Comparación de memoria y latencia: metadatos como lista de dicts (JSON) vs store columnar
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_metadata --metadata data/metadata_resnet50_cloudinary.json
+    python -m models.visual_search.benchmark_metadata --synthetic 200000
+"""
+
+import sys
+import os
+import gc
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.utils import load_metadata_json
+from models.visual_search.metadata_store import MetadataStore, build_metadata_store
+
+
+def synthetic_metadata(n):
+    categorias = ["Tshirts", "Shirts", "Casual Shoes", "Watches", "Sports Shoes", "Kurtas", "Handbags"]
+    return [
+        {
+            "id": 10000 + i,
+            "productDisplayName": f"Producto de ejemplo número {i} color azul",
+            "image_path": f"https://res.cloudinary.com/demo/image/upload/v1/fashion/{10000 + i}.jpg",
+            "articleType": categorias[i % len(categorias)],
+            "price": float(100 + i % 900),
+        }
+        for i in range(n)
+    ]
+
+
+def measure(load_fn):
+    """Memoria retenida (MB) por el objeto cargado y tiempo de carga"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = load_fn()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current / 1e6, elapsed
+
+
+def lookup_latency_us(get_row, n, samples=20000):
+    idxs = np.random.default_rng(0).integers(0, n, samples)
+    start = time.perf_counter()
+    for i in idxs:
+        get_row(int(i))
+    return 1e6 * (time.perf_counter() - start) / samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria de metadatos: JSON vs store columnar")
+    parser.add_argument("--metadata", help="Ruta al JSON de metadatos")
+    parser.add_argument("--synthetic", type=int, default=100000, help="Nº de productos sintéticos si no hay JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = args.metadata
+        if not json_path:
+            json_path = os.path.join(tmp, "metadata.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(synthetic_metadata(args.synthetic), f)
+
+        store_path = os.path.join(tmp, "metadata.cols")
+        build_metadata_store(json_path, store_path)
+
+        meta, json_mb, json_s = measure(lambda: load_metadata_json(json_path))
+        n = len(meta)
+
+        def json_row(i):
+            item = meta[i]
+            return (item.get("id"), item.get("productDisplayName") or item.get("name"),
+                    item.get("image_path") or item.get("image_url") or item.get("link"),
+                    item.get("articleType"), item.get("price"))
+
+        json_us = lookup_latency_us(json_row, n)
+        del meta
+
+        store, store_mb, store_s = measure(lambda: MetadataStore.load(store_path))
+        store_us = lookup_latency_us(store.row, n)
+        del store
+
+        mmap_store, mmap_mb, mmap_s = measure(lambda: MetadataStore.load(store_path, mmap=True))
+        mmap_us = lookup_latency_us(mmap_store.row, n)
+
+        print("=" * 70)
+        print(f"METADATOS: {n:,} productos")
+        print("=" * 70)
+        print(f"{'Formato':<22} {'Heap (MB)':>10} {'Carga (s)':>10} {'Lookup (µs)':>12}")
+        print("-" * 70)
+        print(f"{'JSON (lista de dicts)':<22} {json_mb:>10.1f} {json_s:>10.3f} {json_us:>12.2f}")
+        print(f"{'Columnar':<22} {store_mb:>10.1f} {store_s:>10.3f} {store_us:>12.2f}")
+        print(f"{'Columnar (mmap)':<22} {mmap_mb:>10.1f} {mmap_s:>10.3f} {mmap_us:>12.2f}")
+        print("-" * 70)
+        print(f"Reducción de heap: x{json_mb / max(store_mb, 1e-6):.1f}")
+        print("=" * 70)
+        del mmap_store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+p50/p99 de la búsqueda FAISS con clientes concurrentes (asyncio, como en el servidor)
+
+Compara tres formas de servir la búsqueda desde un handler async:
+  - event loop:  search() directamente en el handler (bloquea el loop)
+  - executor:    una llamada a search() por consulta en un ThreadPoolExecutor
+  - agrupada:    MicroBatcher + coalesced_search (una index.search por ventana)
+Además mide el retraso del event loop (latencia de un "ping" que corre en paralelo).
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_search_concurrency --synthetic 100000 --dim 2048 --clients 32
+"""
+
+import sys
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.engine import VisualSearchEngine, coalesced_search
+from models.visual_search.batcher import MicroBatcher
+from models.visual_search.index_factory import set_faiss_threads
+from models.visual_search.benchmark_shards import synthetic_catalog
+
+
+async def run_mode(search_fn, queries, clients, top_k):
+    latencies = []
+    lags = []
+    done = asyncio.Event()
+
+    async def ping():
+        # Otras peticiones del servidor: cuánto tarda el loop en atender una tarea trivial
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(1000 * (time.perf_counter() - start - 0.001))
+
+    async def client(chunk):
+        for q in chunk:
+            start = time.perf_counter()
+            await search_fn(q, top_k)
+            latencies.append(1000 * (time.perf_counter() - start))
+
+    pinger = asyncio.create_task(ping())
+    start = time.perf_counter()
+    await asyncio.gather(*(client(chunk) for chunk in np.array_split(queries, clients)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await pinger
+    return len(queries) / elapsed, np.array(latencies), np.array(lags or [0.0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de búsqueda FAISS bajo concurrencia")
+    parser.add_argument("--embeddings", help="Ruta al .npy de embeddings")
+    parser.add_argument("--metadata", help="Ruta al JSON de metadatos (alineado con --embeddings)")
+    parser.add_argument("--synthetic", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=2048)
+    parser.add_argument("--index-type", default="Flat")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=640)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--faiss-threads", type=int, default=0, help="0 = valor por defecto de FAISS")
+    parser.add_argument("--workers", type=int, default=2, help="Hilos del executor de búsqueda")
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    faiss_threads = set_faiss_threads(args.faiss_threads)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.embeddings:
+            emb_path, meta_path = args.embeddings, args.metadata
+            index_path = os.path.join(tmp, "bench.faiss")
+        else:
+            emb_path, meta_path = synthetic_catalog(tmp, args.synthetic, args.dim)
+            index_path = None
+        engine = VisualSearchEngine(emb_path, meta_path, index_path=index_path, index_type=args.index_type)
+
+        rng = np.random.default_rng(1)
+        queries = np.asarray(engine.embeddings[rng.choice(len(engine.embeddings), args.queries)])
+        queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+
+        async def on_loop(q, k):
+            return engine.search(q, top_k=k)
+
+        async def in_executor(q, k):
+            return await asyncio.get_running_loop().run_in_executor(pool, partial(engine.search, q, top_k=k))
+
+        batcher = MicroBatcher(partial(coalesced_search, engine), max_batch_size=args.max_batch,
+                               max_wait_ms=args.window_ms, executor=pool, name="faiss-search")
+
+        async def coalesced(q, k):
+            return await batcher.submit((q, k, None, None, None))
+
+        modes = [("event loop", on_loop), ("executor", in_executor), ("agrupada", coalesced)]
+        rows = []
+        for label, fn in modes:
+            engine.search(queries[0], top_k=args.k)  # warm-up
+            rows.append((label, *asyncio.run(run_mode(fn, queries, args.clients, args.k))))
+        batch_stats = batcher.stats()
+        pool.shutdown()
+
+    print("=" * 84)
+    print(f"BÚSQUEDA CONCURRENTE - {args.index_type}, {len(queries)} consultas, {args.clients} clientes, "
+          f"hilos FAISS {faiss_threads}")
+    print("=" * 84)
+    print(f"{'Modo':<12} {'Consultas/s':>12} {'p50 (ms)':>10} {'p99 (ms)':>10} "
+          f"{'Lag loop p50':>13} {'Lag loop p99':>13}")
+    print("-" * 84)
+    for label, qps, latencies, lags in rows:
+        print(f"{label:<12} {qps:>12.1f} {np.percentile(latencies, 50):>10.2f} {np.percentile(latencies, 99):>10.2f} "
+              f"{np.percentile(lags, 50):>13.2f} {np.percentile(lags, 99):>13.2f}")
+    print("-" * 84)
+    print(f"Agrupada: {batch_stats['avg_batch_size']:.1f} consultas por index.search de media")
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
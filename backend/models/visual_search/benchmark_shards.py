@@ -0,0 +1,107 @@
+"""
+Throughput y latencia de la búsqueda visual según el nº de shards (harness multi-proceso local)
+
+Para cada nº de shards reparte el mismo catálogo, levanta un proceso por shard
+y lanza `--clients` clientes concurrentes que hacen búsquedas de una consulta
+(como el endpoint). La fila "en proceso" es el VisualSearchEngine sin shards.
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_shards --synthetic 200000 --dim 512 --shards 1 2 4
+    python -m models.visual_search.benchmark_shards --embeddings data/embeddings_resnet50.npy \\
+        --metadata data/metadata_resnet50_cloudinary.json --shards 2 4 8
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.engine import VisualSearchEngine
+from models.visual_search.sharded import ShardedSearchEngine, shard_catalog
+
+
+def synthetic_catalog(tmp_dir, n, dim):
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((n, dim)).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    emb_path = os.path.join(tmp_dir, "embeddings.npy")
+    meta_path = os.path.join(tmp_dir, "metadata.json")
+    np.save(emb_path, emb)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump([{"id": i, "productDisplayName": f"Producto {i}", "articleType": "Tshirts",
+                    "price": float(i % 500)} for i in range(n)], f)
+    return emb_path, meta_path
+
+
+def run_clients(engine, queries, clients, top_k):
+    """Cada cliente lanza sus consultas una a una; devuelve (consultas/s, latencias en ms)"""
+    def one(q):
+        start = time.perf_counter()
+        engine.search(q, top_k=top_k)
+        return 1000 * (time.perf_counter() - start)
+
+    engine.search(queries[0], top_k=top_k)  # warm-up
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = np.array(list(pool.map(one, queries)))
+    return len(queries) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado de la búsqueda visual con el nº de shards")
+    parser.add_argument("--embeddings", help="Ruta al .npy de embeddings")
+    parser.add_argument("--metadata", help="Ruta al JSON de metadatos (alineado con --embeddings)")
+    parser.add_argument("--synthetic", type=int, default=100000, help="Nº de vectores sintéticos si no hay .npy")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--index-type", default="Flat")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.embeddings:
+            emb_path, meta_path = args.embeddings, args.metadata
+        else:
+            emb_path, meta_path = synthetic_catalog(tmp, args.synthetic, args.dim)
+
+        baseline = VisualSearchEngine(emb_path, meta_path, index_path=os.path.join(tmp, "full.faiss"),
+                                      index_type=args.index_type)
+        rng = np.random.default_rng(1)
+        queries = np.asarray(baseline.embeddings[rng.choice(len(baseline.embeddings), args.queries)])
+        queries = queries + 0.05 * rng.standard_normal(queries.shape).astype(np.float32)
+
+        rows = [("en proceso", *run_clients(baseline, queries, args.clients, args.k))]
+        del baseline
+
+        for num_shards in args.shards:
+            shards_dir = os.path.join(tmp, f"shards_{num_shards}")
+            shard_catalog(emb_path, meta_path, shards_dir, num_shards, index_type=args.index_type)
+            start = time.perf_counter()
+            engine = ShardedSearchEngine(shards_dir)
+            load_s = time.perf_counter() - start
+            qps, latencies = run_clients(engine, queries, args.clients, args.k)
+            engine.close()
+            rows.append((f"{num_shards} shards (carga {load_s:.1f}s)", qps, latencies))
+
+    print("=" * 72)
+    print(f"SHARDS - {args.index_type}, {len(queries)} consultas, {args.clients} clientes, top-{args.k}")
+    print("=" * 72)
+    print(f"{'Configuración':<28} {'Consultas/s':>12} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 72)
+    for label, qps, latencies in rows:
+        print(f"{label:<28} {qps:>12.1f} {np.percentile(latencies, 50):>10.2f} "
+              f"{np.percentile(latencies, 99):>10.2f}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Memoria y recall@k de la matriz de embeddings en float32, float16 e int8 (ScalarQuantizer)
+
+Para cada formato guarda la matriz con `save_embeddings`, la vuelve a cargar como
+lo hace el motor y compara la búsqueda exacta (producto escalar sobre la matriz
+almacenada) con la de float32. También mide el acceso aleatorio por filas que usa
+el re-ranking exacto.
+
+Uso (desde backend/):
+    python -m models.visual_search.benchmark_storage --embeddings data/embeddings_resnet50.npy
+    python -m models.visual_search.benchmark_storage --synthetic 50000 --dim 2048
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.utils import load_embeddings_npy, save_embeddings, STORAGE_TYPES
+from models.visual_search.benchmark_index import recall_at_k
+
+
+def exact_top_k(matrix, queries, k, chunk=8192):
+    """Top-k exacto por bloques de filas (la matriz puede ser float16 o int8 decodificado)"""
+    n = len(matrix)
+    best_s = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_i = np.full((len(queries), k), -1, dtype=np.int64)
+    for start in range(0, n, chunk):
+        block = np.asarray(matrix[start:start + chunk], dtype=np.float32)
+        scores = queries @ block.T
+        s = np.concatenate([best_s, scores], axis=1)
+        i = np.concatenate([best_i, np.arange(start, start + len(block))[None, :].repeat(len(queries), 0)], axis=1)
+        top = np.argpartition(-s, k - 1, axis=1)[:, :k]
+        best_s = np.take_along_axis(s, top, axis=1)
+        best_i = np.take_along_axis(i, top, axis=1)
+    order = np.argsort(-best_s, axis=1)
+    return np.take_along_axis(best_i, order, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria y recall de los formatos de almacenamiento de embeddings")
+    parser.add_argument("--embeddings", help="Ruta al .npy de embeddings")
+    parser.add_argument("--synthetic", type=int, default=20000, help="Nº de vectores sintéticos si no hay .npy")
+    parser.add_argument("--dim", type=int, default=2048)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        emb = np.ascontiguousarray(load_embeddings_npy(args.embeddings), dtype=np.float32)
+    else:
+        # Vectores con estructura (clusters) y no negativos, como los de ResNet50 tras ReLU + avg pooling
+        rng = np.random.default_rng(0)
+        centers = np.abs(rng.standard_normal((64, args.dim))).astype(np.float32)
+        emb = centers[rng.integers(0, 64, args.synthetic)] + \
+            0.5 * np.abs(rng.standard_normal((args.synthetic, args.dim))).astype(np.float32)
+        emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+
+    rng = np.random.default_rng(1)
+    q_idx = rng.choice(len(emb), min(args.queries, len(emb)), replace=False)
+    queries = emb[q_idx] + 0.05 * rng.standard_normal((len(q_idx), emb.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    ground_truth = exact_top_k(emb, queries, args.k)
+    rows = rng.integers(0, len(emb), (len(queries), args.k * 4))
+
+    print("=" * 80)
+    print(f"ALMACENAMIENTO - {len(emb):,} vectores x {emb.shape[1]} dims, {len(queries)} consultas, k={args.k}")
+    print("=" * 80)
+    print(f"{'Formato':<10} {'Disco (MB)':>11} {'Bytes/prod':>11} {'Recall@k':>10} {'Error máx':>10} "
+          f"{'Filas re-rank (µs)':>19}")
+    print("-" * 80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for storage in STORAGE_TYPES:
+            path = os.path.join(tmp, f"emb_{storage}.npy")
+            nbytes = save_embeddings(path, emb, storage=storage)
+            matrix = load_embeddings_npy(path, mmap=True)
+
+            found = exact_top_k(matrix, queries, args.k)
+            error = float(np.abs(np.asarray(matrix[q_idx[:50]], dtype=np.float32) - emb[q_idx[:50]]).max())
+
+            start = time.perf_counter()
+            for r in rows:
+                np.asarray(matrix[np.sort(r)], dtype=np.float32)
+            fetch_us = 1e6 * (time.perf_counter() - start) / len(rows)
+
+            print(f"{storage:<10} {nbytes / 1e6:>11.1f} {nbytes / len(emb):>11.0f} "
+                  f"{recall_at_k(ground_truth, found):>10.4f} {error:>10.5f} {fetch_us:>19.1f}")
+            del matrix
+
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
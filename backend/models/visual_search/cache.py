@@ -0,0 +1,129 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def image_hash(pil_image):
+    """Hash de los píxeles decodificados (no del fichero: ignora EXIF, recompresión sin pérdida, etc.)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{pil_image.mode}:{pil_image.size[0]}x{pil_image.size[1]}:".encode("ascii"))
+    h.update(pil_image.tobytes())
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Caché LRU de embeddings (y opcionalmente en disco) por hash de imagen, más
+    una caché de ids top-k por (hash, parámetros de búsqueda) ligada a la versión
+    del índice: cuando el índice cambia, los resultados cacheados se descartan solos.
+    """
+
+    def __init__(self, max_embeddings=4096, max_results=4096, disk_dir=None, namespace="resnet50"):
+        self.max_embeddings = max_embeddings
+        self.max_results = max_results
+        self.disk_dir = os.path.join(disk_dir, namespace) if disk_dir else None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._embeddings = OrderedDict()
+        self._results = OrderedDict()
+        self._results_version = None
+        self._counters = {
+            "embedding_hits": 0, "embedding_disk_hits": 0, "embedding_misses": 0,
+            "results_hits": 0, "results_misses": 0, "results_invalidations": 0,
+        }
+
+    # ---------- Embeddings ----------
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".npy")
+
+    def get_embedding(self, key):
+        with self._lock:
+            emb = self._embeddings.get(key)
+            if emb is not None:
+                self._embeddings.move_to_end(key)
+                self._counters["embedding_hits"] += 1
+                return emb
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                try:
+                    emb = np.load(path)
+                except (OSError, ValueError):
+                    emb = None
+                if emb is not None:
+                    with self._lock:
+                        self._counters["embedding_disk_hits"] += 1
+                    self._remember_embedding(key, emb)
+                    return emb
+
+        with self._lock:
+            self._counters["embedding_misses"] += 1
+        return None
+
+    def put_embedding(self, key, emb):
+        emb = np.asarray(emb, dtype=np.float32)
+        self._remember_embedding(key, emb)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + f".{os.getpid()}.tmp.npy"
+            np.save(tmp_path, emb)
+            os.replace(tmp_path, path)
+
+    def _remember_embedding(self, key, emb):
+        with self._lock:
+            self._embeddings[key] = emb
+            self._embeddings.move_to_end(key)
+            while len(self._embeddings) > self.max_embeddings:
+                self._embeddings.popitem(last=False)
+
+    # ---------- Resultados top-k ----------
+
+    def _check_version(self, index_version):
+        if self._results_version != index_version:
+            if self._results:
+                self._counters["results_invalidations"] += 1
+            self._results.clear()
+            self._results_version = index_version
+
+    def get_results(self, key, index_version, params_key=None):
+        with self._lock:
+            self._check_version(index_version)
+            results = self._results.get((key, params_key))
+            if results is None:
+                self._counters["results_misses"] += 1
+                return None
+            self._results.move_to_end((key, params_key))
+            self._counters["results_hits"] += 1
+            return results
+
+    def put_results(self, key, index_version, results, params_key=None):
+        with self._lock:
+            self._check_version(index_version)
+            self._results[(key, params_key)] = results
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    # ---------- Métricas ----------
+
+    def stats(self):
+        with self._lock:
+            c = dict(self._counters)
+            emb_total = c["embedding_hits"] + c["embedding_disk_hits"] + c["embedding_misses"]
+            res_total = c["results_hits"] + c["results_misses"]
+            return {
+                **c,
+                "embedding_hit_ratio": round((c["embedding_hits"] + c["embedding_disk_hits"]) / emb_total, 4) if emb_total else 0.0,
+                "results_hit_ratio": round(c["results_hits"] / res_total, 4) if res_total else 0.0,
+                "embeddings_cached": len(self._embeddings),
+                "results_cached": len(self._results),
+                "index_version": self._results_version,
+                "disk_dir": self.disk_dir,
+            }
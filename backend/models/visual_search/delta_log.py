@@ -0,0 +1,59 @@
+import os
+import json
+import base64
+import numpy as np
+
+
+def encode_vector(vec):
+    return base64.b64encode(np.asarray(vec, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data):
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+class DeltaLog:
+    """
+    Log append-only (JSONL) de cambios del catálogo aplicados sobre el índice base.
+
+    Cada línea es {"op": "upsert", "product": {...}, "embedding": "<base64>"}
+    o {"op": "remove", "product_id": ...}. Reaplicar el log es idempotente,
+    así que un corte entre la compactación y el truncado del log no duplica productos.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, entries):
+        if not entries:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir (corte durante append): se descarta
+                    print(f"⚠️ Línea {line_no} del delta log corrupta, se ignora el resto")
+                    break
+        return entries
+
+    def rewrite(self, entries):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
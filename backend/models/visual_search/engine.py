@@ -1,62 +1,627 @@
 import os
+import json
+import time
+import threading
+from collections import deque
 import numpy as np
 import faiss
-from .utils import load_embeddings_npy, load_metadata_json
+from .utils import load_embeddings_npy, read_embeddings_meta, save_embeddings, RWLock
+from .metadata_store import (
+    load_or_build_metadata_store, publish_metadata_store,
+    MetadataStore, FIELD_ALIASES, _resolve
+)
+from .delta_log import DeltaLog, encode_vector, decode_vector
+from .index_factory import (
+    DEFAULT_INDEX_TYPE, build_index, search_parameters, read_index,
+    read_index_marker, write_index_marker, pca_path_for, read_pca, apply_pca
+)
+
+# Filas por bloque en la búsqueda exacta con filtros: acota la copia float32 a
+# EXACT_CHUNK_ROWS x d por consulta (8 MB a 1024 dims) sea cual sea el nº de filas permitidas
+EXACT_CHUNK_ROWS = 2048
+
 
 class VisualSearchEngine:
-    def __init__(self, embeddings_path, metadata_path, index_path=None):
+    def __init__(self, embeddings_path, metadata_path, index_path=None,
+                 index_type=None, index_params=None, nprobe=None, ef_search=None,
+                 mmap=False, compact_threshold=10000, filter_exact_max=20000, rerank=None):
         self.emb_path = embeddings_path
         self.meta_path = metadata_path
         self.index_path = index_path or os.path.splitext(self.emb_path)[0] + ".faiss"
+        self.index_params = index_params or {}
+        self.mmap = mmap
+        # Con filtros que dejan pocas filas se busca de forma exacta sobre ellas
+        self.filter_exact_max = filter_exact_max
+
+        # Parámetros de búsqueda por defecto (se pueden sobreescribir en cada consulta)
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        # Re-ranking: se piden top_k * rerank candidatos al índice comprimido y se
+        # re-puntúan de forma exacta con self.embeddings (None/1 = sin re-ranking)
+        self.rerank = rerank
+        self._stage_times = {stage: deque(maxlen=1000) for stage in ("index", "rerank", "exact", "metadata")}
+        # callable(stage, seconds) opcional para métricas (mismas etapas que stage_timings)
+        self.stage_observer = None
 
-        self.embeddings = load_embeddings_npy(self.emb_path)
-        self.metadata = load_metadata_json(self.meta_path)
+        self.embeddings = load_embeddings_npy(self.emb_path, mmap=mmap)
+        # float32, float16 o int8 (ScalarQuantizer): se conserva al compactar
+        self.storage = read_embeddings_meta(self.emb_path).get("storage", "float32")
+        self.metadata = load_or_build_metadata_store(self.meta_path, mmap=mmap)
         self.d = self.embeddings.shape[1]
 
+        # Reducción PCA (reduce_pca.py): con una transformación junto al índice el catálogo
+        # está en la dimensión reducida y los embeddings de entrada se proyectan al buscar
+        self.pca = read_pca(pca_path_for(self.index_path))
+        self.input_dim = self.pca.d_in if self.pca is not None else self.d
+        if self.pca is not None and self.pca.d_out != self.d:
+            raise ValueError(
+                f"La PCA de {pca_path_for(self.index_path)} reduce a {self.pca.d_out} dims pero "
+                f"{self.emb_path} tiene {self.d}: regenera ambos con reduce_pca.py")
+
         # Cargar o crear index FAISS
+        self.index = None
+        marker = read_index_marker(self.index_path)
+        stored_type = marker["index_type"] if marker else DEFAULT_INDEX_TYPE
+        self.index_type = index_type or stored_type
+
         if os.path.exists(self.index_path):
-            try:
-                self.index = faiss.read_index(self.index_path)
-                print("Index FAISS cargado correctamente.")
-            except Exception as e:
-                print("Error leyendo index, recreando...", e)
-                self.index = None
-        else:
-            self.index = None
+            if self.index_type != stored_type:
+                print(f"Index FAISS es '{stored_type}' pero se pidió '{self.index_type}', recreando...")
+            else:
+                try:
+                    self.index = read_index(self.index_path, mmap=mmap)
+                    print(f"Index FAISS ({self.index_type}) cargado correctamente{' (mmap)' if mmap else ''}.")
+                except Exception as e:
+                    print("Error leyendo index, recreando...", e)
 
         if self.index is None:
-            self.index = faiss.IndexFlatIP(self.d)
-            self.index.add(self.embeddings)
+            self.index = self._build_index(self.embeddings)
             try:
                 faiss.write_index(self.index, self.index_path)
+                write_index_marker(self.index_path, self.index_type, **self.index_params)
             except Exception as e:
                 print("No se pudo guardar el index:", e)
 
-    def search(self, query_embedding, top_k=5):
-        # ... (código anterior de normalización se mantiene igual) ...
-        q = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
-        faiss.normalize_L2(q)
+        # Actualizaciones incrementales: el índice base + un delta log que se reaplica al arrancar
+        self._lock = RWLock()
+        self._compact_lock = threading.Lock()
+        # Las búsquedas solo toman el lock de lectura: la caché de filtros tiene el suyo
+        self._filter_cache_lock = threading.Lock()
+        self._compaction_thread = None
+        self.compact_threshold = compact_threshold
+        self.version = 0
+        self._base_signature = self._index_signature()
+        self._reset_overlay()
+
+        self.delta_log = DeltaLog(os.path.splitext(self.index_path)[0] + ".delta.jsonl")
+        pending = self.delta_log.read()
+        if pending:
+            self._apply_entries(pending)
+            self._delta = pending
+            print(f"Delta log reaplicado: {len(pending)} cambios sobre el índice base.")
+
+    def _build_index(self, embeddings):
+        # Ids FAISS = nº de fila del catálogo (IndexIDMap2 permite añadir filas nuevas con id propio)
+        return build_index(self.index_type, embeddings, ids=np.arange(len(embeddings)), **self.index_params)
+
+    def _reset_overlay(self):
+        self._base_rows = len(self.metadata)
+        self._next_row = self._base_rows
+        self._extra_meta = {}       # fila -> producto añadido después de la carga
+        self._extra_vectors = {}    # fila -> embedding del producto añadido
+        self._deleted = set()       # filas dadas de baja (tombstones hasta compactar)
+        self._row_by_pid = None     # product_id -> fila, se construye al primer cambio
+        self._delta = []            # cambios desde la última compactación
+        self._selector = None
+        self._selector_version = None
+        self._filter_cache = {}     # (versión, filtros) -> (filas permitidas, IDSelector)
+
+    # ---------- Búsqueda ----------
+
+    def search(self, query_embedding, top_k=5, nprobe=None, ef_search=None, filters=None, rerank=None):
+        return self.search_batch([query_embedding], top_k=top_k, nprobe=nprobe,
+                                 ef_search=ef_search, filters=filters, rerank=rerank)[0]
+
+    def search_batch(self, query_embeddings, top_k=5, nprobe=None, ef_search=None, filters=None, rerank=None):
+        """
+        `filters` (opcional, común a todas las consultas):
+        {"category": str | [str, ...], "min_price": float, "max_price": float}
+        """
+        # Matriz (N, d): una sola llamada a index.search para todas las consultas
+        q = self._project(query_embeddings)
+        rerank = rerank or self.rerank
+
+        with self._lock.read():
+            if filters:
+                allowed, sel = self._filter_selector(filters)
+                if len(allowed) <= self.filter_exact_max:
+                    # Filtro muy selectivo: producto escalar exacto sobre las filas permitidas
+                    start = time.perf_counter()
+                    sims, idxs = self._exact_search(q, allowed, top_k)
+                    self._record("exact", time.perf_counter() - start)
+                    return self._join_metadata(sims, idxs)
+            else:
+                sel = self._deleted_selector()
+
+            params = search_parameters(
+                self.index,
+                nprobe=nprobe or self.nprobe,
+                ef_search=ef_search or self.ef_search,
+                sel=sel
+            )
+            k = top_k * rerank if rerank and rerank > 1 else top_k
+            start = time.perf_counter()
+            sims, idxs = self.index.search(q, k, params=params)
+            self._record("index", time.perf_counter() - start)
+
+            if k > top_k:
+                start = time.perf_counter()
+                sims, idxs = rescore(q, idxs, self._vectors, top_k)
+                self._record("rerank", time.perf_counter() - start)
+
+            if filters:
+                # En IVF/HNSW el selector solo filtra las listas visitadas o el recorrido del
+                # grafo: si faltan resultados y hay más filas permitidas, búsqueda exacta
+                short = np.flatnonzero((idxs[:, :top_k] >= 0).sum(axis=1) < min(top_k, len(allowed)))
+                if len(short):
+                    start = time.perf_counter()
+                    exact_sims, exact_idxs = self._exact_search(q[short], allowed, top_k)
+                    sims, idxs = sims.copy(), idxs.copy()
+                    sims[short], idxs[short] = exact_sims, exact_idxs
+                    self._record("exact", time.perf_counter() - start)
+            return self._join_metadata(sims, idxs)
+
+    def _record(self, stage, seconds):
+        self._stage_times[stage].append(seconds)
+        if self.stage_observer is not None:
+            self.stage_observer(stage, seconds)
+
+    def _join_metadata(self, sims, idxs):
+        start = time.perf_counter()
+        results = [self._build_results(s, i) for s, i in zip(sims, idxs)]
+        self._record("metadata", time.perf_counter() - start)
+        return results
 
-        sims, idxs = self.index.search(q, top_k)
-        sims = sims[0]
-        idxs = idxs[0]
+    def _project(self, vectors):
+        """Embeddings de entrada -> matriz (N, d) normalizada en el espacio del índice (PCA si la hay)"""
+        x = np.array(vectors, dtype=np.float32)
+        if self.pca is not None and x.shape[-1] == self.pca.d_in:
+            return apply_pca(self.pca, x)
+        x = x.reshape(-1, self.d)
+        faiss.normalize_L2(x)
+        return x
 
+    def stage_timings(self):
+        """Tiempo por etapa de las últimas búsquedas (ms): índice, re-ranking exacto, búsqueda exacta filtrada y metadatos"""
+        stats = {}
+        for stage, times in self._stage_times.items():
+            ms = np.array(times, dtype=np.float64) * 1000.0
+            stats[stage] = {
+                "count": len(ms),
+                "avg_ms": round(float(ms.mean()), 3) if len(ms) else 0.0,
+                "p50_ms": round(float(np.percentile(ms, 50)), 3) if len(ms) else 0.0,
+                "p95_ms": round(float(np.percentile(ms, 95)), 3) if len(ms) else 0.0,
+            }
+        return {"rerank": self.rerank, "stages": stats}
+
+    def _deleted_selector(self):
+        # Las bajas se excluyen dentro de la búsqueda, así top_k sigue devolviendo k resultados
+        if not self._deleted:
+            return None
+        if self._selector_version != self.version:
+            batch = faiss.IDSelectorBatch(np.fromiter(self._deleted, dtype=np.int64))
+            self._selector = (faiss.IDSelectorNot(batch), batch)
+            self._selector_version = self.version
+        return self._selector[0]
+
+    # ---------- Filtros (categoría / rango de precio) ----------
+
+    def _filter_key(self, filters):
+        category = filters.get("category")
+        if isinstance(category, str):
+            category = [category]
+        return (
+            self.version,
+            tuple(sorted(category)) if category else None,
+            filters.get("min_price"),
+            filters.get("max_price"),
+        )
+
+    def _filter_selector(self, filters):
+        """
+        Filas que cumplen el filtro (sin bajas) y un IDSelectorBitmap sobre ellas,
+        para que FAISS filtre dentro de la búsqueda en lugar de sobre-pedir resultados.
+        """
+        key = self._filter_key(filters)
+        with self._filter_cache_lock:
+            cached = self._filter_cache.get(key)
+        if cached is not None:
+            return cached
+
+        _, categories, min_price, max_price = key
+        store = self.metadata
+
+        # Filas base: máscaras vectorizadas sobre las columnas del store
+        mask = np.ones(self._base_rows, dtype=bool)
+        if categories is not None:
+            codes = [store.categories.index(c) for c in categories if c in store.categories]
+            mask &= np.isin(store.arrays["category"], codes)
+        prices = store.arrays["price"]
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        if self._deleted:
+            base_deleted = [r for r in self._deleted if r < self._base_rows]
+            mask[base_deleted] = False
+        allowed = np.flatnonzero(mask)
+
+        # Filas añadidas después de la carga
+        extra = [
+            row for row, item in self._extra_meta.items()
+            if (categories is None or item["category"] in categories)
+            and (min_price is None or (item["price"] is not None and item["price"] >= min_price))
+            and (max_price is None or (item["price"] is not None and item["price"] <= max_price))
+        ]
+        if extra:
+            allowed = np.concatenate([allowed, np.array(sorted(extra), dtype=np.int64)])
+        allowed = allowed.astype(np.int64)
+
+        bitmap_mask = np.zeros(self._next_row, dtype=bool)
+        bitmap_mask[allowed] = True
+        bitmap = np.packbits(bitmap_mask, bitorder="little")
+        sel = faiss.IDSelectorBitmap(self._next_row, faiss.swig_ptr(bitmap))
+        sel.referenced_bitmap = bitmap  # el selector no copia el bitmap
+
+        with self._filter_cache_lock:
+            if key not in self._filter_cache and len(self._filter_cache) >= 64:
+                self._filter_cache.pop(next(iter(self._filter_cache)))
+            self._filter_cache[key] = (allowed, sel)
+        return allowed, sel
+
+    def _vectors(self, rows):
+        """Embeddings (float32) de las filas pedidas, base o añadidas"""
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), self.d), dtype=np.float32)
+        is_base = rows < self._base_rows
+        out[is_base] = self.embeddings[rows[is_base]]
+        for i in np.flatnonzero(~is_base):
+            out[i] = self._extra_vectors[int(rows[i])]
+        return out
+
+    def _exact_search(self, q, rows, top_k):
+        sims = np.full((len(q), top_k), -np.inf, dtype=np.float32)
+        idxs = np.full((len(q), top_k), -1, dtype=np.int64)
+        # Por bloques: el top-k acumulado se funde con el de cada bloque
+        for start in range(0, len(rows), EXACT_CHUNK_ROWS):
+            chunk = rows[start:start + EXACT_CHUNK_ROWS]
+            scores = np.concatenate([sims, q @ self._vectors(chunk).T], axis=1)
+            candidates = np.concatenate([idxs, np.broadcast_to(chunk, (len(q), len(chunk)))], axis=1)
+            top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+            sims = np.take_along_axis(scores, top, axis=1)
+            idxs = np.take_along_axis(candidates, top, axis=1)
+        order = np.argsort(-sims, axis=1, kind="stable")
+        return np.take_along_axis(sims, order, axis=1), np.take_along_axis(idxs, order, axis=1)
+
+    def _row(self, idx):
+        if idx < self._base_rows:
+            if idx in self._deleted:
+                return None
+            return self.metadata.row(idx)
+        return self._extra_meta.get(idx)
+
+    def _build_results(self, sims, idxs):
         results = []
         for score, idx in zip(sims, idxs):
-            if idx < 0 or idx >= len(self.metadata):
+            if idx < 0:
                 continue
-            item = self.metadata[idx]
-            
-            # --- AQUÍ ESTÁ LA CORRECCIÓN ---
-            # Leemos 'image_path' del JSON, pero lo enviamos como 'image_url' al frontend
-            img_link = item.get("image_path") or item.get("image_url") or item.get("link")
-            
+            # Los alias del JSON ('image_path' -> 'image_url', etc.) ya vienen
+            # resueltos desde el store columnar
+            item = self._row(int(idx))
+            if item is None:
+                continue
+
             results.append({
-                "product_id": item.get("id"),
-                "name": item.get("productDisplayName") or item.get("name"),
-                "image_url": img_link,  
+                "product_id": item["id"],
+                "name": item["name"],
+                "image_url": item["image_url"],
                 "similarity": float(score),
-                "category": item.get("articleType"),
-                "price": item.get("price") 
+                "category": item["category"],
+                "price": item["price"]
             })
-        return results
\ No newline at end of file
+        return results
+
+    # ---------- Actualizaciones del catálogo ----------
+
+    def add_products(self, products, embeddings):
+        """Añade productos nuevos. Falla si algún product_id ya existe."""
+        with self._lock.read():
+            self._ensure_pid_index()
+            existing = [p.get("id") for p in products if self._normalize_pid(p.get("id")) in self._row_by_pid]
+        if existing:
+            raise ValueError(f"Productos ya existentes: {existing[:10]}")
+        return self.upsert(products, embeddings)
+
+    def upsert(self, products, embeddings):
+        """Añade o reemplaza productos (por product_id). Devuelve las filas asignadas."""
+        vectors = self._project(embeddings)
+        if len(vectors) != len(products):
+            raise ValueError("Se necesita un embedding por producto")
+        products = [self._clean_product(p) for p in products]
+
+        # Si un mismo id viene repetido en el lote, gana la última aparición
+        last = {p["id"]: i for i, p in enumerate(products)}
+        keep = sorted(last.values())
+        products = [products[i] for i in keep]
+        vectors = vectors[keep]
+
+        entries = [
+            {"op": "upsert", "product": p, "embedding": encode_vector(v)}
+            for p, v in zip(products, vectors)
+        ]
+        with self._lock.write():
+            self.delta_log.append(entries)
+            rows = self._apply_upserts(products, vectors)
+            self._delta.extend(entries)
+        self._maybe_compact()
+        return rows
+
+    def remove_products(self, product_ids):
+        """Da de baja productos por product_id. Devuelve cuántos existían."""
+        entries = [{"op": "remove", "product_id": pid} for pid in product_ids]
+        with self._lock.write():
+            self.delta_log.append(entries)
+            removed = self._apply_removes(product_ids)
+            self._delta.extend(entries)
+        self._maybe_compact()
+        return removed
+
+    def _clean_product(self, product):
+        if product.get("id") is None:
+            raise ValueError("Cada producto necesita un 'id'")
+        # Acepta tanto los nombres ya resueltos (name, image_url...) como los del JSON original
+        clean = {col: _resolve(product, (col,) + aliases) for col, aliases in FIELD_ALIASES.items()}
+        clean["id"] = self._normalize_pid(clean["id"])
+        if clean["price"] is not None:
+            clean["price"] = float(clean["price"])
+        return clean
+
+    def _normalize_pid(self, pid):
+        # Los ids del catálogo base pueden ser enteros; "123" y 123 son el mismo producto
+        if self.metadata.ids_as_int and isinstance(pid, str) and pid.isdigit():
+            return int(pid)
+        return pid
+
+    def _ensure_pid_index(self):
+        if self._row_by_pid is not None:
+            return
+        store = self.metadata
+        if store.ids_as_int:
+            pids = store.arrays["id"].tolist()
+        else:
+            pids = [store.product_id(i) for i in range(len(store))]
+        self._row_by_pid = {pid: row for row, pid in enumerate(pids) if row not in self._deleted}
+        for row, item in self._extra_meta.items():
+            self._row_by_pid[item["id"]] = row
+
+    def _writable_index(self):
+        # Un índice mapeado (mmap) es de solo lectura: se copia a memoria al primer cambio
+        if self.mmap and not getattr(self, "_index_cloned", False):
+            self.index = faiss.clone_index(self.index)
+            self._index_cloned = True
+        return self.index
+
+    def _apply_upserts(self, products, vectors):
+        self._ensure_pid_index()
+        self._apply_removes([p["id"] for p in products], bump_version=False)
+
+        rows = np.arange(self._next_row, self._next_row + len(products), dtype=np.int64)
+        index = self._writable_index()
+        if isinstance(index, faiss.IndexIDMap):
+            index.add_with_ids(vectors, rows)
+        else:
+            # Índices antiguos sin IDMap: los ids son posiciones, las filas nuevas van al final
+            assert index.ntotal == self._next_row, "Index sin IDMap desalineado con el catálogo"
+            index.add(vectors)
+
+        for row, product, vec in zip(rows.tolist(), products, vectors):
+            self._extra_meta[row] = product
+            self._extra_vectors[row] = vec
+            self._row_by_pid[product["id"]] = row
+        self._next_row += len(products)
+        self.version += 1
+        return rows.tolist()
+
+    def _apply_removes(self, product_ids, bump_version=True):
+        self._ensure_pid_index()
+        removed = 0
+        for pid in product_ids:
+            row = self._row_by_pid.pop(self._normalize_pid(pid), None)
+            if row is None:
+                continue
+            self._deleted.add(row)
+            self._extra_meta.pop(row, None)
+            self._extra_vectors.pop(row, None)
+            removed += 1
+        if removed and bump_version:
+            self.version += 1
+        return removed
+
+    def _apply_entries(self, entries):
+        for entry in entries:
+            if entry["op"] == "upsert":
+                vec = decode_vector(entry["embedding"]).reshape(1, -1)
+                self._apply_upserts([entry["product"]], vec)
+            elif entry["op"] == "remove":
+                self._apply_removes([entry["product_id"]])
+
+    def _index_signature(self):
+        # Identifica el .faiss base en disco (sirve para cachés que sobreviven al reinicio)
+        try:
+            st = os.stat(self.index_path)
+            return f"{st.st_size:x}-{int(st.st_mtime_ns):x}"
+        except OSError:
+            return f"mem-{id(self.index):x}"
+
+    @property
+    def index_version(self):
+        """Cambia con cualquier modificación del índice (alta, baja, compactación o nuevo .faiss)"""
+        return f"{self._base_signature}:{self.version}"
+
+    def catalog_stats(self):
+        with self._lock.read():
+            return {
+                "version": self.version,
+                "index_version": self.index_version,
+                "index_type": self.index_type,
+                "dim": self.d,
+                "input_dim": self.input_dim,
+                "embeddings_storage": self.storage,
+                "embeddings_mb": round(self.embeddings.nbytes / 1e6, 2),
+                "base_products": self._base_rows,
+                "added_products": len(self._extra_meta),
+                "removed_rows": len(self._deleted),
+                "total_products": self._base_rows + len(self._extra_meta) - len(
+                    [r for r in self._deleted if r < self._base_rows]),
+                "pending_delta": len(self._delta),
+                "compacting": self.is_compacting(),
+            }
+
+    # ---------- Compactación ----------
+
+    def is_compacting(self):
+        return self._compaction_thread is not None and self._compaction_thread.is_alive()
+
+    def _maybe_compact(self):
+        if self.compact_threshold and len(self._delta) >= self.compact_threshold:
+            self.compact_async()
+
+    def compact_async(self):
+        """Lanza la compactación en segundo plano (si no hay otra en curso)"""
+        if self.is_compacting():
+            return False
+        self._compaction_thread = threading.Thread(target=self.compact, name="visual-compaction", daemon=True)
+        self._compaction_thread.start()
+        return True
+
+    def compact(self):
+        """
+        Reescribe .npy, metadatos JSON, store columnar y .faiss con el catálogo
+        actual (sin bajas) y vacía el delta log. Las búsquedas siguen
+        respondiendo con el estado anterior hasta el intercambio final.
+        """
+        with self._compact_lock:
+            # 1. Foto del catálogo vivo
+            with self._lock.read():
+                delta_mark = len(self._delta)
+                base_alive = np.array(
+                    [r for r in range(self._base_rows) if r not in self._deleted], dtype=np.int64)
+                extra_rows = sorted(self._extra_meta)
+                vectors = np.asarray(self.embeddings[base_alive], dtype=np.float32)
+                if extra_rows:
+                    vectors = np.vstack([vectors, np.stack([self._extra_vectors[r] for r in extra_rows])])
+                records = [self.metadata.row(int(r)) for r in base_alive]
+                records += [self._extra_meta[r] for r in extra_rows]
+
+            # 2. Ficheros nuevos (fuera del lock: es la parte lenta)
+            vectors = np.ascontiguousarray(vectors)
+            new_index = self._build_index(vectors)
+            store_path = self._write_catalog_files(vectors, records, new_index)
+            new_embeddings = load_embeddings_npy(self.emb_path, mmap=self.mmap)
+            new_store = (MetadataStore.load(store_path, mmap=True)
+                         if self.mmap else MetadataStore.from_records(records))
+
+            # 3. Intercambio atómico + cambios que llegaron durante la compactación
+            with self._lock.write():
+                pending = self._delta[delta_mark:]
+                self.embeddings = new_embeddings
+                self.metadata = new_store
+                self.index = new_index
+                self._index_cloned = True
+                self._base_signature = self._index_signature()
+                self._reset_overlay()
+                self._apply_entries(pending)
+                self._delta = pending
+                self.delta_log.rewrite(pending)
+                self.version += 1
+
+            print(f"✅ Catálogo compactado: {len(records)} productos ({len(pending)} cambios pendientes)")
+            return len(records)
+
+    def _write_catalog_files(self, vectors, records, index):
+        save_embeddings(self.emb_path, vectors, storage=self.storage)
+
+        # JSON con los nombres de campo originales, para que el resto de herramientas lo sigan leyendo
+        meta_tmp = self.meta_path + ".tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump([
+                {"id": r["id"], "productDisplayName": r["name"], "image_path": r["image_url"],
+                 "articleType": r["category"], "price": r["price"]}
+                for r in records
+            ], f, ensure_ascii=False)
+        os.replace(meta_tmp, self.meta_path)
+
+        store_path = publish_metadata_store(self.meta_path)
+
+        index_tmp = self.index_path + ".tmp"
+        faiss.write_index(index, index_tmp)
+        os.replace(index_tmp, self.index_path)
+        write_index_marker(self.index_path, self.index_type, **self.index_params)
+        return store_path
+
+
+def rescore(q, candidates, get_vectors, top_k):
+    """
+    Re-puntúa de forma exacta los candidatos (N, k') de un índice comprimido y
+    devuelve el top_k real (sims, idxs) con el mismo formato que index.search.
+    `get_vectors(filas)` devuelve los embeddings float32 de esas filas.
+    """
+    n, k_cand = candidates.shape
+    valid = candidates >= 0
+    vectors = get_vectors(candidates[valid])
+
+    # Producto escalar fila a fila, vectorizado sobre todos los candidatos del lote
+    scores = np.full((n, k_cand), -np.inf, dtype=np.float32)
+    scores[valid] = np.einsum("ij,ij->i", np.repeat(q, valid.sum(axis=1), axis=0), vectors)
+
+    k = min(top_k, k_cand)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+    sims = np.take_along_axis(scores, order, axis=1)
+    idxs = np.where(np.isfinite(sims), np.take_along_axis(candidates, order, axis=1), -1)
+    return sims, idxs
+
+
+def _params_key(nprobe, ef_search, filters):
+    if not filters:
+        return (nprobe, ef_search, None)
+    category = filters.get("category")
+    if isinstance(category, str):
+        category = [category]
+    return (nprobe, ef_search, tuple(sorted(category)) if category else None,
+            filters.get("min_price"), filters.get("max_price"))
+
+
+def coalesced_search(engine, requests):
+    """
+    Resuelve varias consultas independientes con el mínimo de llamadas a
+    `engine.search_batch`: una por combinación de (nprobe, ef_search, filtros),
+    con el top_k mayor del grupo. Pensado como `batch_fn` de un MicroBatcher.
+
+    Cada petición: (query_embedding, top_k, nprobe, ef_search, filters).
+    """
+    groups = {}
+    for pos, (_, _, nprobe, ef_search, filters) in enumerate(requests):
+        groups.setdefault(_params_key(nprobe, ef_search, filters), []).append(pos)
+
+    results = [None] * len(requests)
+    for positions in groups.values():
+        _, _, nprobe, ef_search, filters = requests[positions[0]]
+        top_k = max(requests[pos][1] for pos in positions)
+        batch = engine.search_batch(
+            [requests[pos][0] for pos in positions],
+            top_k=top_k, nprobe=nprobe, ef_search=ef_search, filters=filters
+        )
+        for pos, found in zip(positions, batch):
+            results[pos] = found[:requests[pos][1]]
+    return results
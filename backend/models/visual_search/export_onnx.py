@@ -0,0 +1,66 @@
+"""
+Exporta ResNet50 (Keras, pooling avg) a ONNX y genera la versión cuantizada int8
+
+Requiere: tensorflow, tf2onnx, onnx, onnxruntime
+
+Uso (desde backend/):
+    python -m models.visual_search.export_onnx --out-dir data
+    -> data/resnet50_fp32.onnx y data/resnet50_int8.onnx
+"""
+
+import sys
+import os
+import argparse
+
+
+def export_fp32(output_path, opset=13):
+    import tensorflow as tf
+    import tf2onnx
+    from keras.applications import ResNet50
+
+    model = ResNet50(weights="imagenet", include_top=False, pooling="avg")
+    # Batch dinámico: el mismo grafo sirve para batch 1 y para el micro-batcher
+    spec = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=opset, output_path=output_path)
+    return output_path
+
+
+def quantize_int8(fp32_path, int8_path, per_channel=False):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    # Cuantización dinámica: pesos en int8, activaciones cuantizadas en tiempo de ejecución
+    quantize_dynamic(
+        fp32_path,
+        int8_path,
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+    )
+    return int8_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta ResNet50 a ONNX (fp32 + int8)")
+    parser.add_argument("--out-dir", default=os.path.join(os.path.dirname(__file__), "../../data"))
+    parser.add_argument("--opset", type=int, default=13)
+    parser.add_argument("--per-channel", action="store_true", help="Cuantización por canal (más precisa)")
+    parser.add_argument("--skip-int8", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    fp32_path = os.path.join(args.out_dir, "resnet50_fp32.onnx")
+    int8_path = os.path.join(args.out_dir, "resnet50_int8.onnx")
+
+    print("🔄 Exportando ResNet50 a ONNX (float32)...")
+    export_fp32(fp32_path, opset=args.opset)
+    print(f"✅ {fp32_path} ({os.path.getsize(fp32_path) / 1e6:.1f} MB)")
+
+    if not args.skip_int8:
+        print("🔄 Cuantizando a int8 (dinámica)...")
+        quantize_int8(fp32_path, int8_path, per_channel=args.per_channel)
+        print(f"✅ {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+
+    print("\n👉 Verifica la paridad con: python -m models.visual_search.benchmark_backends")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
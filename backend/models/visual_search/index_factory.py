@@ -0,0 +1,216 @@
+import os
+import json
+import math
+import numpy as np
+import faiss
+
+# Tipos de índice soportados (todos con producto interno = coseno sobre vectores L2-normalizados)
+INDEX_TYPES = ("Flat", "IVFFlat", "IVFPQ", "HNSWFlat")
+
+DEFAULT_INDEX_TYPE = "Flat"
+
+
+def default_nlist(n):
+    # Regla habitual: ~4*sqrt(n) listas, con al menos 39 puntos de entrenamiento por lista
+    nlist = int(4 * math.sqrt(max(n, 1)))
+    return max(1, min(nlist, n // 39 if n >= 39 else 1))
+
+
+def default_nprobe(nlist):
+    # ~sqrt(nlist) listas visitadas: FAISS deja nprobe=1, con recall muy bajo
+    return max(1, min(nlist, int(math.ceil(math.sqrt(nlist)))))
+
+
+def apply_default_search_params(index):
+    """
+    nprobe por defecto en los IVF que siguen con el de FAISS (1), también en índices
+    guardados antes de que build_index lo fijara. Devuelve el índice.
+    """
+    base = unwrap_index(index)
+    if isinstance(base, faiss.IndexIVF) and base.nprobe <= 1 < base.nlist:
+        base.nprobe = default_nprobe(base.nlist)
+    return index
+
+
+def default_pq_m(d):
+    # Nº de sub-cuantizadores: el mayor divisor de d que no supere 64
+    for m in range(min(64, d), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def default_pq_nbits(n):
+    # 8 bits (256 centroides por sub-cuantizador) necesita ~39*256 puntos de entrenamiento
+    if n >= 39 * 256:
+        return 8
+    return max(4, int(math.log2(max(n, 1) / 39)))
+
+
+def build_index(index_type, embeddings, nlist=None, pq_m=None, pq_nbits=None,
+                hnsw_m=32, ef_construction=200, max_train_points=None, seed=1234, ids=None):
+    """
+    Construye, entrena (si aplica) y llena un índice FAISS del tipo pedido.
+    `embeddings` debe venir ya normalizado (float32, C-contiguo).
+    Si se pasan `ids`, el índice se envuelve en un IndexIDMap2 con esos ids.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice '{index_type}' no válido. Opciones: {list(INDEX_TYPES)}")
+
+    x = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, d = x.shape
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "Flat":
+        index = faiss.IndexFlatIP(d)
+    elif index_type == "HNSWFlat":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+    else:
+        nlist = nlist or default_nlist(n)
+        quantizer = faiss.IndexFlatIP(d)
+        if index_type == "IVFFlat":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, metric)
+        else:
+            pq_m = pq_m or default_pq_m(d)
+            pq_nbits = pq_nbits or default_pq_nbits(n)
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, pq_nbits, metric)
+
+    if not index.is_trained:
+        train = x
+        max_train_points = max_train_points or 256 * getattr(index, "nlist", 1)
+        if n > max_train_points:
+            rng = np.random.default_rng(seed)
+            train = x[rng.choice(n, max_train_points, replace=False)]
+        index.train(train)
+
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(x, np.asarray(ids, dtype=np.int64))
+    else:
+        index.add(x)
+    return apply_default_search_params(index)
+
+
+def unwrap_index(index):
+    """Índice base detrás de envoltorios como IndexIDMap2 o IndexPreTransform"""
+    base = faiss.downcast_index(index)
+    while hasattr(base, "index") and isinstance(getattr(base, "index"), faiss.Index):
+        base = faiss.downcast_index(base.index)
+    return base
+
+
+def set_faiss_threads(num_threads):
+    """
+    Hilos de OpenMP de FAISS (por proceso). Por defecto usa todos los núcleos,
+    que compiten con los hilos de TensorFlow / ONNX Runtime del extractor.
+    """
+    if num_threads:
+        faiss.omp_set_num_threads(int(num_threads))
+    return faiss.omp_get_max_threads()
+
+
+def search_parameters(index, nprobe=None, ef_search=None, sel=None):
+    """
+    Parámetros de búsqueda por consulta (no modifican el índice compartido).
+    `sel` es un IDSelector que restringe los ids candidatos dentro de la búsqueda.
+    Devuelve None si no hay nada que ajustar.
+    """
+    base = unwrap_index(index)
+
+    if isinstance(base, faiss.IndexIVF) and (nprobe or sel is not None):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = int(nprobe or base.nprobe)
+    elif isinstance(base, faiss.IndexHNSW) and (ef_search or sel is not None):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = int(ef_search or base.hnsw.efSearch)
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if sel is not None:
+        params.sel = sel
+    return params
+
+
+def read_index(index_path, mmap=False):
+    """
+    Lee un índice FAISS. Con `mmap=True` los datos del índice quedan mapeados
+    desde el fichero (solo lectura), así que varios procesos comparten las páginas.
+    """
+    return apply_default_search_params(_read_index_file(index_path, mmap))
+
+
+def _read_index_file(index_path, mmap):
+    if not mmap:
+        return faiss.read_index(index_path)
+
+    # IO_FLAG_MMAP_IFC (FAISS >= 1.8) mapea sin copia cualquier tipo de índice;
+    # IO_FLAG_MMAP solo mapea las listas invertidas de los IVF
+    flag_sets = []
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        flag_sets.append(faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    flag_sets.append(faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+    for flags in flag_sets:
+        try:
+            return faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            print(f"⚠️ No se pudo mapear el index con flags={flags}: {str(e)[:80]}")
+    return faiss.read_index(index_path)
+
+
+def marker_path(index_path):
+    return index_path + ".meta.json"
+
+
+def write_index_marker(index_path, index_type, **params):
+    marker = {"index_type": index_type}
+    marker.update({k: v for k, v in params.items() if v is not None})
+    with open(marker_path(index_path), "w", encoding="utf-8") as f:
+        json.dump(marker, f, indent=2)
+
+
+def read_index_marker(index_path):
+    path = marker_path(index_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ---------- Reducción de dimensión (PCA) ----------
+
+def pca_path_for(index_path):
+    """La transformación PCA vive junto al índice: `<index sin extensión>.pca`"""
+    return os.path.splitext(index_path)[0] + ".pca"
+
+
+def fit_pca(embeddings, d_out, max_train_points=100000, seed=1234):
+    """Entrena un faiss.PCAMatrix (d -> d_out) sobre una muestra de los embeddings"""
+    x = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if len(x) > max_train_points:
+        rng = np.random.default_rng(seed)
+        x = x[np.sort(rng.choice(len(x), max_train_points, replace=False))]
+    pca = faiss.PCAMatrix(x.shape[1], d_out)
+    pca.train(x)
+    return pca
+
+
+def apply_pca(pca, vectors):
+    """Proyecta y re-normaliza (la similitud sigue siendo producto escalar / coseno)"""
+    x = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, pca.d_in)
+    out = pca.apply(x)
+    faiss.normalize_L2(out)
+    return out
+
+
+def write_pca(pca, path):
+    faiss.write_VectorTransform(pca, path)
+
+
+def read_pca(path):
+    if not os.path.exists(path):
+        return None
+    return faiss.read_VectorTransform(path)
@@ -1,27 +1,163 @@
+import os
+import time
+import threading
+from io import BytesIO
 import numpy as np
 from PIL import Image
-from keras.applications import ResNet50
-from keras.applications.resnet import preprocess_input
 
-class ResNet50TFExtractor:
+# Medias de ImageNet en orden BGR (preprocess_input de ResNet50, modo "caffe")
+IMAGENET_MEAN_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+BACKENDS = ("keras", "onnx")
+
+
+def decode_image(fp, size=(224, 224)):
+    """
+    Decodifica una imagen (ruta, bytes o fichero abierto) directamente a `size` en RGB.
+
+    En JPEG, `Image.draft` hace que libjpeg decodifique a escala reducida (1/2, 1/4
+    o 1/8) lo más cerca posible de `size`, así una foto de 12MP nunca llega a existir
+    a resolución completa. El resto de formatos se reducen con `reducing_gap`.
+    """
+    if isinstance(fp, (bytes, bytearray)):
+        fp = BytesIO(fp)
+    img = Image.open(fp)
+    img.draft("RGB", size)
+    if img.mode not in ("RGB", "L", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    if img.size != tuple(size):
+        img = img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def preprocess_input(batch):
+    """
+    Equivalente NumPy de keras.applications.resnet.preprocess_input (en sitio):
+    RGB -> BGR y resta de la media de ImageNet. No necesita TensorFlow.
+    """
+    batch[...] = batch[..., ::-1]
+    batch -= IMAGENET_MEAN_BGR
+    return batch
+
+
+class BaseExtractor:
+    """
+    Interfaz común de los backends de embeddings. Cada backend solo implementa
+    `_forward(batch)` sobre un tensor (N, 224, 224, 3) ya preprocesado.
+    """
+
+    name = "base"
+    input_size = (224, 224)
+
     def __init__(self):
-        self.model = ResNet50(weights="imagenet", include_top=False, pooling="avg")
-    
+        # Buffer (N, 224, 224, 3) float32 reutilizado entre llamadas; crece solo si llega un lote mayor
+        self._buffer = None
+        self._buffer_lock = threading.Lock()
+        # callable(stage, seconds) opcional para métricas: "preprocess" y "forward"
+        self.stage_observer = None
+
+    def _fill(self, out, pil_image: Image.Image):
+        """Escribe la imagen en `out` (224, 224, 3) sin copias intermedias en float32"""
+        img = pil_image
+        if img.size != self.input_size:
+            img = img.resize(self.input_size)
+        # Gris o PNG transparente -> RGB (ya a 224x224, la conversión es barata)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        out[...] = np.asarray(img)
+
+    def _batch_buffer(self, n):
+        if self._buffer is None or len(self._buffer) < n:
+            self._buffer = np.empty((n, *self.input_size, 3), dtype=np.float32)
+        return self._buffer[:n]
+
+    def _forward(self, batch):
+        raise NotImplementedError
+
     def image_to_embedding(self, pil_image: Image.Image):
-        img = pil_image.resize((224, 224))
-        arr = np.array(img).astype(np.float32)
-        if arr.ndim == 2:
-            arr = np.stack([arr]*3, axis=-1)
-        # Convertir a RGB si tiene 4 canales (PNG transparente)
-        if arr.shape[-1] == 4:
-            arr = arr[..., :3]
-            
-        arr = np.expand_dims(arr, axis=0)
-        arr = preprocess_input(arr)
-        
-        emb = self.model.predict(arr, verbose=0)
-        emb = emb.reshape(-1).astype(np.float32)
-        
-        norm = np.linalg.norm(emb) + 1e-10
-        emb = emb / norm
-        return emb
\ No newline at end of file
+        return self.images_to_embeddings([pil_image])[0]
+
+    def images_to_embeddings(self, pil_images):
+        # Todas las imágenes van en un único tensor (N, 224, 224, 3) -> un solo forward
+        with self._buffer_lock:
+            start = time.perf_counter()
+            batch = self._batch_buffer(len(pil_images))
+            for i, img in enumerate(pil_images):
+                self._fill(batch[i], img)
+            batch = preprocess_input(batch)
+            preprocessed = time.perf_counter()
+
+            embs = self._forward(batch)
+            embs = np.asarray(embs).reshape(len(pil_images), -1).astype(np.float32)
+
+        if self.stage_observer is not None:
+            self.stage_observer("preprocess", preprocessed - start)
+            self.stage_observer("forward", time.perf_counter() - preprocessed)
+
+        norms = np.linalg.norm(embs, axis=1, keepdims=True) + 1e-10
+        embs = embs / norms
+        return embs
+
+
+class ResNet50TFExtractor(BaseExtractor):
+    """Backend de referencia: ResNet50 de Keras en float32 (importa TensorFlow al crearse)"""
+
+    name = "resnet50-keras"
+
+    def __init__(self, intra_op_threads=None, inter_op_threads=None):
+        super().__init__()
+        import tensorflow as tf
+        # Debe fijarse antes de que TensorFlow cree su runtime (primer modelo / op)
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(int(intra_op_threads))
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(int(inter_op_threads))
+        from keras.applications import ResNet50
+        self.model = ResNet50(weights="imagenet", include_top=False, pooling="avg")
+
+    def _forward(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class ResNet50OnnxExtractor(BaseExtractor):
+    """
+    Backend ONNX Runtime (CPU). Acepta el grafo float32 o el cuantizado
+    dinámicamente a int8 que genera export_onnx.py. No importa TensorFlow.
+    """
+
+    def __init__(self, model_path, intra_op_threads=None, inter_op_threads=None):
+        super().__init__()
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = int(intra_op_threads)
+        if inter_op_threads:
+            options.inter_op_num_threads = int(inter_op_threads)
+
+        self.model_path = model_path
+        self.name = "resnet50-onnx-" + os.path.splitext(os.path.basename(model_path))[0]
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def _forward(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+def create_extractor(backend="keras", model_path=None, intra_op_threads=None, inter_op_threads=None):
+    """
+    Crea el extractor de embeddings del backend pedido ('keras' u 'onnx').
+    Los hilos del backend se configuran aparte de los de FAISS (set_faiss_threads).
+    """
+    if backend == "keras":
+        return ResNet50TFExtractor(intra_op_threads=intra_op_threads, inter_op_threads=inter_op_threads)
+    if backend == "onnx":
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"Modelo ONNX no encontrado: {model_path} (genéralo con models.visual_search.export_onnx)")
+        return ResNet50OnnxExtractor(model_path, intra_op_threads=intra_op_threads,
+                                     inter_op_threads=inter_op_threads)
+    raise ValueError(f"Backend '{backend}' no válido. Opciones: {list(BACKENDS)}")
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+
+from .utils import load_metadata_json
+
+# Alias de campos del JSON original -> columna del store (se resuelven al construir)
+FIELD_ALIASES = {
+    "id": ("id",),
+    "name": ("productDisplayName", "name"),
+    "image_url": ("image_path", "image_url", "link"),
+    "category": ("articleType",),
+    "price": ("price",),
+}
+
+STRING_COLUMNS = ("name", "image_url")
+
+SCHEMA_FILE = "schema.json"
+
+
+def _resolve(item, aliases):
+    # Equivale a item.get(a) or item.get(b) or ... (como hacía el motor por cada resultado)
+    value = None
+    for key in aliases:
+        value = item.get(key)
+        if value:
+            break
+    return value
+
+
+def _encode_strings(values):
+    """Columna de strings como un único buffer UTF-8 + offsets (sin objetos Python por fila)"""
+    encoded = [str(v).encode("utf-8") if v is not None else b"" for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    valid = np.array([v is not None for v in values], dtype=bool)
+    return data, offsets, valid
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def store_path_for(json_path):
+    return os.path.splitext(json_path)[0] + ".cols"
+
+
+def store_pointer_for(json_path):
+    return store_path_for(json_path) + ".current"
+
+
+def current_store_path(json_path):
+    """Directorio del store vigente: el que indica el puntero (tras compactar) o <json>.cols"""
+    pointer = store_pointer_for(json_path)
+    try:
+        with open(pointer, "r", encoding="utf-8") as f:
+            path = os.path.join(os.path.dirname(pointer), f.read().strip())
+        if os.path.isdir(path):
+            return path
+    except OSError:
+        pass
+    return store_path_for(json_path)
+
+
+class MetadataStore:
+    """
+    Metadatos del catálogo en formato columnar (arrays NumPy).
+
+    Cada fila se identifica por su posición, que es el id de FAISS, así que
+    `row(i)` es O(1). Las columnas se guardan como .npy en un directorio y se
+    pueden abrir con memoria mapeada.
+    """
+
+    def __init__(self, arrays, schema):
+        self.arrays = arrays
+        self.schema = schema
+        self.categories = schema["categories"]
+        self.ids_as_int = schema["id_kind"] == "int"
+        self._n = int(schema["rows"])
+
+    # ---------- Construcción ----------
+
+    @classmethod
+    def from_records(cls, records, source=None):
+        resolved = {col: [_resolve(item, aliases) for item in records]
+                    for col, aliases in FIELD_ALIASES.items()}
+        arrays = {}
+
+        ids = resolved["id"]
+        if ids and all(isinstance(v, int) and not isinstance(v, bool) for v in ids):
+            id_kind = "int"
+            arrays["id"] = np.array(ids, dtype=np.int64)
+        else:
+            id_kind = "str"
+            arrays["id.data"], arrays["id.offsets"], arrays["id.valid"] = _encode_strings(ids)
+
+        for col in STRING_COLUMNS:
+            arrays[f"{col}.data"], arrays[f"{col}.offsets"], arrays[f"{col}.valid"] = \
+                _encode_strings(resolved[col])
+
+        # Categoría codificada como diccionario: códigos int32 + lista de valores (-1 = sin categoría)
+        categories = sorted({c for c in resolved["category"] if c is not None})
+        lookup = {c: i for i, c in enumerate(categories)}
+        arrays["category"] = np.array([lookup.get(c, -1) for c in resolved["category"]], dtype=np.int32)
+
+        arrays["price"] = np.array([_to_float(p) for p in resolved["price"]], dtype=np.float64)
+
+        schema = {
+            "rows": len(records),
+            "id_kind": id_kind,
+            "categories": categories,
+            "source": source or {},
+        }
+        return cls(arrays, schema)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        arrays = {}
+        for name in schema["arrays"]:
+            arrays[name] = np.load(os.path.join(path, name + ".npy"), mmap_mode="r" if mmap else None)
+        return cls(arrays, schema)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name, arr in self.arrays.items():
+            np.save(os.path.join(path, name + ".npy"), arr)
+        schema = dict(self.schema, arrays=sorted(self.arrays))
+        # El schema se escribe al final: un directorio sin schema.json está incompleto
+        with open(os.path.join(path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+            json.dump(schema, f, ensure_ascii=False, indent=2)
+
+    # ---------- Acceso ----------
+
+    def __len__(self):
+        return self._n
+
+    def _string(self, col, i):
+        if not self.arrays[f"{col}.valid"][i]:
+            return None
+        offsets = self.arrays[f"{col}.offsets"]
+        return bytes(self.arrays[f"{col}.data"][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def product_id(self, i):
+        if self.ids_as_int:
+            return int(self.arrays["id"][i])
+        return self._string("id", i)
+
+    def category(self, i):
+        code = self.arrays["category"][i]
+        return self.categories[code] if code >= 0 else None
+
+    def price(self, i):
+        value = self.arrays["price"][i]
+        return None if np.isnan(value) else float(value)
+
+    def row(self, i):
+        return {
+            "id": self.product_id(i),
+            "name": self._string("name", i),
+            "image_url": self._string("image_url", i),
+            "category": self.category(i),
+            "price": self.price(i),
+        }
+
+    def nbytes(self):
+        return int(sum(arr.nbytes for arr in self.arrays.values()))
+
+
+def _source_signature(json_path):
+    st = os.stat(json_path)
+    return {"path": os.path.basename(json_path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def build_metadata_store(json_path, store_path=None):
+    """Construye el store columnar a partir del JSON de metadatos y lo guarda en disco"""
+    store_path = store_path or store_path_for(json_path)
+    store = MetadataStore.from_records(load_metadata_json(json_path), source=_source_signature(json_path))
+    store.save(store_path)
+    return store
+
+
+def publish_metadata_store(json_path):
+    """
+    Construye el store en un directorio versionado nuevo (<json>.cols.<n>) y lo
+    publica cambiando el fichero puntero con os.replace, que es atómico: un corte
+    deja el store anterior o el nuevo, nunca ninguno. Después borra las versiones
+    anteriores que pueda (en Windows, las que siguen mapeadas se borran la próxima vez).
+    Devuelve la ruta del store nuevo.
+    """
+    base = store_path_for(json_path)
+    path = f"{base}.{time.time_ns()}"
+    build_metadata_store(json_path, path)
+
+    pointer = store_pointer_for(json_path)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path))
+    os.replace(pointer + ".tmp", pointer)
+
+    folder, prefix = os.path.dirname(base), os.path.basename(base)
+    for name in os.listdir(folder or "."):
+        old = os.path.join(folder, name)
+        if old != path and (name == prefix or name.startswith(prefix + ".")) and os.path.isdir(old):
+            shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def load_or_build_metadata_store(json_path, store_path=None, mmap=False):
+    """
+    Abre el store columnar si está al día con el JSON; si no existe o el JSON
+    cambió, lo (re)construye una vez y lo guarda junto al JSON.
+    """
+    store_path = store_path or current_store_path(json_path)
+    schema_path = os.path.join(store_path, SCHEMA_FILE)
+
+    if os.path.exists(schema_path):
+        store = MetadataStore.load(store_path, mmap=mmap)
+        if not os.path.exists(json_path) or store.schema.get("source") == _source_signature(json_path):
+            return store
+        print("Metadatos JSON modificados, reconstruyendo store columnar...")
+
+    try:
+        store = build_metadata_store(json_path, store_path)
+        print(f"Store columnar de metadatos creado en {store_path}")
+        return MetadataStore.load(store_path, mmap=mmap) if mmap else store
+    except OSError as e:
+        print("No se pudo guardar el store de metadatos, se usa en memoria:", e)
+        return MetadataStore.from_records(load_metadata_json(json_path))
@@ -0,0 +1,47 @@
+"""
+Prepara el .npy de embeddings para carga con memoria mapeada (mmap)
+
+Guarda los vectores L2-normalizados y C-contiguos, y escribe el marcador
+`<nombre>.meta.json` con `normalized: true` para que `load_embeddings_npy`
+no vuelva a normalizar al arrancar. Con `--storage` se guardan en float16
+(4 KB por producto en 2048 dims) o int8 con ScalarQuantizer de FAISS (2 KB).
+
+Uso (desde backend/):
+    python -m models.visual_search.prepare_embeddings data/embeddings_resnet50.npy
+    python -m models.visual_search.prepare_embeddings data/embeddings_resnet50.npy --storage float16
+"""
+
+import sys
+import os
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.utils import load_embeddings_npy, save_embeddings, STORAGE_TYPES
+
+
+def prepare_embeddings(npy_path, out_path=None, storage="float32"):
+    out_path = out_path or npy_path
+    emb = np.ascontiguousarray(load_embeddings_npy(npy_path), dtype=np.float32)
+
+    # Escritura atómica: los workers que ya tienen el fichero mapeado no ven un .npy a medias
+    save_embeddings(out_path, emb, storage=storage)
+    return emb.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normaliza y marca un .npy de embeddings para mmap")
+    parser.add_argument("npy_path")
+    parser.add_argument("--out", help="Ruta de salida (por defecto sobrescribe la entrada)")
+    parser.add_argument("--storage", default="float32", choices=STORAGE_TYPES,
+                        help="Formato de la matriz: float32, float16 o int8 (ScalarQuantizer)")
+    args = parser.parse_args()
+
+    shape = prepare_embeddings(args.npy_path, args.out, storage=args.storage)
+    print(f"✅ Embeddings preparados: {shape[0]:,} x {shape[1]} ({args.storage}, normalizados)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Reduce los embeddings de ResNet50 (2048 dims) con PCA y deja listo el catálogo reducido
+
+Entrena un faiss.PCAMatrix sobre el .npy, guarda los vectores proyectados y
+normalizados, construye su índice FAISS y escribe la transformación junto a él
+(`<índice>.pca`). VisualSearchEngine la detecta al cargar y proyecta las
+consultas de 2048 dims del extractor. Reporta varianza retenida, recall@k
+frente a la búsqueda exacta en 2048 dims y la aceleración de la búsqueda.
+
+Uso (desde backend/):
+    python -m models.visual_search.reduce_pca data/embeddings_resnet50.npy --dim 256
+    -> data/embeddings_resnet50_pca256.npy, .faiss y .pca  (VISUAL_PCA_DIM=256)
+"""
+
+import sys
+import os
+import time
+import argparse
+
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.utils import load_embeddings_npy, read_embeddings_meta, save_embeddings
+from models.visual_search.index_factory import (
+    INDEX_TYPES, DEFAULT_INDEX_TYPE, build_index, write_index_marker,
+    fit_pca, apply_pca, write_pca, pca_path_for
+)
+from models.visual_search.benchmark_index import recall_at_k, timed_search
+
+
+def reduced_paths(npy_path, dim):
+    """Rutas del catálogo reducido: `<npy>_pca<dim>.npy` y su .faiss"""
+    stem = os.path.splitext(npy_path)[0] + f"_pca{dim}"
+    return stem + ".npy", stem + ".faiss"
+
+
+def reduce_embeddings(npy_path, dim, index_type=DEFAULT_INDEX_TYPE, out_path=None, max_train_points=100000):
+    emb = np.ascontiguousarray(load_embeddings_npy(npy_path), dtype=np.float32)
+    if dim >= emb.shape[1]:
+        raise ValueError(f"--dim ({dim}) debe ser menor que la dimensión original ({emb.shape[1]})")
+
+    out_path = out_path or reduced_paths(npy_path, dim)[0]
+    index_path = os.path.splitext(out_path)[0] + ".faiss"
+
+    pca = fit_pca(emb, dim, max_train_points=max_train_points)
+    reduced = apply_pca(pca, emb)
+
+    # Mismo formato de almacenamiento que el .npy original
+    save_embeddings(out_path, reduced, storage=read_embeddings_meta(npy_path).get("storage", "float32"))
+    index = build_index(index_type, reduced, ids=np.arange(len(reduced)))
+    faiss.write_index(index, index_path)
+    write_index_marker(index_path, index_type)
+    write_pca(pca, pca_path_for(index_path))
+    return emb, reduced, pca, out_path, index_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reducción PCA de los embeddings de ResNet50")
+    parser.add_argument("npy_path")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--out", help="Ruta del .npy reducido (por defecto <npy>_pca<dim>.npy)")
+    parser.add_argument("--index-type", default=DEFAULT_INDEX_TYPE, choices=INDEX_TYPES)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    emb, reduced, pca, out_path, index_path = reduce_embeddings(
+        args.npy_path, args.dim, index_type=args.index_type, out_path=args.out)
+
+    eigenvalues = faiss.vector_to_array(pca.eigenvalues)
+    retained = eigenvalues[:args.dim].sum() / eigenvalues.sum()
+
+    # Recall y velocidad: Flat en la dimensión original (exacto) vs Flat en la reducida
+    rng = np.random.default_rng(1)
+    q_idx = rng.choice(len(emb), min(args.queries, len(emb)), replace=False)
+    queries = emb[q_idx] + 0.05 * rng.standard_normal((len(q_idx), emb.shape[1])).astype(np.float32)
+    faiss.normalize_L2(queries)
+
+    full = build_index("Flat", emb)
+    ground_truth, full_s, _ = timed_search(full, queries, args.k)
+    small = build_index("Flat", reduced)
+    start = time.perf_counter()
+    q_reduced = apply_pca(pca, queries)
+    project_s = time.perf_counter() - start
+    found, small_s, _ = timed_search(small, q_reduced, args.k)
+
+    print("=" * 70)
+    print(f"PCA {emb.shape[1]} -> {args.dim} dims ({len(emb):,} vectores)")
+    print("=" * 70)
+    print(f"Varianza retenida:        {100 * retained:.1f}%")
+    print(f"Recall@{args.k} (vs exacto):   {recall_at_k(ground_truth, found):.3f}")
+    print(f"ms/consulta {emb.shape[1]:>4} dims:    {1000 * full_s / len(queries):.3f}")
+    print(f"ms/consulta {args.dim:>4} dims:    {1000 * (small_s + project_s) / len(queries):.3f}"
+          f"  (proyección incluida)")
+    print(f"Aceleración:              x{full_s / max(small_s + project_s, 1e-9):.1f}")
+    print(f"Memoria embeddings:       {emb.nbytes / 1e6:.1f} MB -> {reduced.nbytes / 1e6:.1f} MB")
+    print("-" * 70)
+    print(f"✅ {out_path}\n✅ {index_path} ({args.index_type})\n✅ {pca_path_for(index_path)}")
+    print(f"👉 Actívalo en el servidor con VISUAL_PCA_DIM={args.dim}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
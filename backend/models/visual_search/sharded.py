@@ -0,0 +1,337 @@
+"""
+Índice visual particionado en shards, cada uno servido por su propio proceso
+
+El catálogo se reparte por product_id (`shard_of`) en N shards con el mismo
+formato que el catálogo completo (.npy + JSON + .faiss). `ShardedSearchEngine`
+levanta un proceso por shard con un `VisualSearchEngine` dentro, reparte cada
+consulta a todos los shards y mezcla los top-k con un heap.
+
+Uso (desde backend/):
+    python -m models.visual_search.sharded data/embeddings_resnet50.npy \\
+        data/metadata_resnet50_cloudinary.json --out data/shards --num-shards 4
+"""
+
+import sys
+import os
+import json
+import time
+import zlib
+import heapq
+import shutil
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from models.visual_search.utils import (
+    load_embeddings_npy, load_metadata_json, read_embeddings_meta, save_embeddings
+)
+from models.visual_search.index_factory import pca_path_for
+
+MANIFEST_NAME = "shards.json"
+SHARD_EMBEDDINGS = "embeddings.npy"
+SHARD_METADATA = "metadata.json"
+SHARD_INDEX = "embeddings.faiss"
+
+# Marca el entorno de los procesos de shard: con 'spawn' el hijo vuelve a importar
+# el módulo principal (p. ej. server.py) y este no debe levantar otra vez los shards
+SHARD_WORKER_ENV = "VISUAL_SHARD_WORKER"
+
+
+def is_shard_worker():
+    return os.getenv(SHARD_WORKER_ENV) == "1"
+
+
+def shard_of(product_id, num_shards):
+    """Shard dueño de un producto (estable entre procesos y reinicios)"""
+    if isinstance(product_id, str) and product_id.isdigit():
+        product_id = int(product_id)
+    if isinstance(product_id, (int, np.integer)):
+        return int(product_id) % num_shards
+    return zlib.crc32(str(product_id).encode("utf-8")) % num_shards
+
+
+def shard_catalog(embeddings_path, metadata_path, out_dir, num_shards, index_type=None, index_path=None):
+    """
+    Reparte el catálogo en `num_shards` carpetas y escribe el manifiesto `shards.json`.
+    Si el índice del catálogo (`index_path`, por defecto `<npy>.faiss`) tiene una PCA
+    al lado, se copia a cada shard.
+    """
+    index_path = index_path or os.path.splitext(embeddings_path)[0] + ".faiss"
+    pca_path = pca_path_for(index_path)
+    if not os.path.exists(pca_path):
+        pca_path = None
+    emb = np.ascontiguousarray(load_embeddings_npy(embeddings_path), dtype=np.float32)
+    meta = load_metadata_json(metadata_path)
+    storage = read_embeddings_meta(embeddings_path).get("storage", "float32")
+    if len(meta) != len(emb):
+        raise ValueError(f"Metadatos ({len(meta)}) y embeddings ({len(emb)}) no están alineados")
+
+    owners = np.array([shard_of(item.get("id"), num_shards) for item in meta], dtype=np.int64)
+    shard_dirs = []
+    for shard in range(num_shards):
+        name = f"shard_{shard:02d}"
+        shard_dir = os.path.join(out_dir, name)
+        os.makedirs(shard_dir, exist_ok=True)
+        rows = np.flatnonzero(owners == shard)
+
+        # Cada shard conserva el formato de almacenamiento del catálogo (float32, float16 o int8)
+        save_embeddings(os.path.join(shard_dir, SHARD_EMBEDDINGS), emb[rows], storage=storage)
+        with open(os.path.join(shard_dir, SHARD_METADATA), "w", encoding="utf-8") as f:
+            json.dump([meta[i] for i in rows], f, ensure_ascii=False)
+        # Un índice viejo de otra partición no sirve
+        shard_pca = pca_path_for(os.path.join(shard_dir, SHARD_INDEX))
+        for stale in (SHARD_INDEX, SHARD_INDEX + ".meta.json", "embeddings.delta.jsonl", shard_pca):
+            if os.path.exists(os.path.join(shard_dir, stale)):
+                os.remove(os.path.join(shard_dir, stale))
+        if pca_path:
+            shutil.copyfile(pca_path, shard_pca)
+        shard_dirs.append(name)
+
+    manifest = {"num_shards": num_shards, "shards": shard_dirs, "index_type": index_type,
+                "total_products": len(meta), "dim": int(emb.shape[1])}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# ---------- Lado del worker (un proceso por shard) ----------
+
+_ENGINE = None
+
+
+def _init_shard(shard_dir, engine_kwargs, omp_threads):
+    global _ENGINE
+    import faiss
+    from models.visual_search.engine import VisualSearchEngine
+
+    # Sin límite, N shards x todos los núcleos de OpenMP se pisan entre sí
+    if omp_threads:
+        faiss.omp_set_num_threads(omp_threads)
+    _ENGINE = VisualSearchEngine(
+        os.path.join(shard_dir, SHARD_EMBEDDINGS),
+        os.path.join(shard_dir, SHARD_METADATA),
+        index_path=os.path.join(shard_dir, SHARD_INDEX),
+        **engine_kwargs
+    )
+
+
+def _shard_info():
+    return {"d": _ENGINE.d, "input_dim": _ENGINE.input_dim, "index_type": _ENGINE.index_type,
+            "pid": os.getpid()}
+
+
+def _shard_search_batch(queries, top_k, nprobe, ef_search, filters, rerank):
+    return _ENGINE.search_batch(queries, top_k=top_k, nprobe=nprobe, ef_search=ef_search,
+                                filters=filters, rerank=rerank)
+
+
+def _shard_existing(product_ids):
+    with _ENGINE._lock.read():
+        _ENGINE._ensure_pid_index()
+        return [pid for pid in product_ids if _ENGINE._normalize_pid(pid) in _ENGINE._row_by_pid]
+
+
+def _shard_call(method, *args):
+    return getattr(_ENGINE, method)(*args)
+
+
+# ---------- Coordinador (proceso de la API) ----------
+
+class ShardedSearchEngine:
+    """
+    Misma interfaz que `VisualSearchEngine` (search, search_batch, upsert,
+    remove_products, compact_async, catalog_stats, index_version) sobre un
+    catálogo repartido en shards, cada uno en su propio proceso.
+    """
+
+    def __init__(self, shards_dir, index_type=None, index_params=None, nprobe=None, ef_search=None,
+                 mmap=False, compact_threshold=10000, rerank=None, omp_threads=None, mp_context="spawn"):
+        with open(os.path.join(shards_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.shards_dir = shards_dir
+        self.num_shards = self.manifest["num_shards"]
+
+        engine_kwargs = {
+            "index_type": index_type or self.manifest.get("index_type"),
+            "index_params": index_params, "nprobe": nprobe, "ef_search": ef_search,
+            "mmap": mmap, "compact_threshold": compact_threshold, "rerank": rerank,
+        }
+        if omp_threads is None:
+            omp_threads = max(1, (os.cpu_count() or 1) // self.num_shards)
+
+        # Un executor de un solo proceso por shard: cada proceso conserva su índice entre llamadas
+        # ('spawn' por defecto: hacer fork de un proceso con hilos de OpenMP/TF no es seguro)
+        ctx = mp.get_context(mp_context)
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1, mp_context=ctx, initializer=_init_shard,
+                initargs=(os.path.join(shards_dir, name), engine_kwargs, omp_threads)
+            )
+            for name in self.manifest["shards"]
+        ]
+        # Carga todos los shards en paralelo y espera a que estén listos
+        # (los procesos se crean aquí y heredan el entorno en ese momento)
+        previous = os.environ.get(SHARD_WORKER_ENV)
+        os.environ[SHARD_WORKER_ENV] = "1"
+        try:
+            infos = self._broadcast(_shard_info)
+        finally:
+            if previous is None:
+                os.environ.pop(SHARD_WORKER_ENV, None)
+            else:
+                os.environ[SHARD_WORKER_ENV] = previous
+        self.d = infos[0]["d"]
+        self.input_dim = infos[0]["input_dim"]
+        self.index_type = infos[0]["index_type"]
+        self.worker_pids = [info["pid"] for info in infos]
+
+        self.version = 0
+        # callable(stage, seconds) opcional para métricas: "shards" (búsqueda en paralelo) y "merge"
+        self.stage_observer = None
+        st = os.stat(os.path.join(shards_dir, MANIFEST_NAME))
+        self._base_signature = f"shards{self.num_shards}-{int(st.st_mtime_ns):x}"
+
+    def _broadcast(self, fn, *args):
+        futures = [ex.submit(fn, *args) for ex in self._executors]
+        return [f.result() for f in futures]
+
+    def _route(self, product_ids):
+        """Posiciones de `product_ids` agrupadas por shard dueño"""
+        groups = {}
+        for pos, pid in enumerate(product_ids):
+            groups.setdefault(shard_of(pid, self.num_shards), []).append(pos)
+        return groups
+
+    # ---------- Búsqueda (scatter-gather) ----------
+
+    def search(self, query_embedding, top_k=5, nprobe=None, ef_search=None, filters=None, rerank=None):
+        return self.search_batch([query_embedding], top_k=top_k, nprobe=nprobe,
+                                 ef_search=ef_search, filters=filters, rerank=rerank)[0]
+
+    def search_batch(self, query_embeddings, top_k=5, nprobe=None, ef_search=None, filters=None, rerank=None):
+        # Cada shard normaliza y aplica su PCA (si la hay)
+        q = np.array(query_embeddings, dtype=np.float32).reshape(-1, self.input_dim)
+        # El re-ranking exacto se hace dentro de cada shard, antes de mezclar
+        start = time.perf_counter()
+        per_shard = self._broadcast(_shard_search_batch, q, top_k, nprobe, ef_search, filters, rerank)
+        searched = time.perf_counter()
+
+        # Cada shard devuelve su top-k: el top-k global está en la unión
+        results = [
+            heapq.nlargest(top_k, (r for shard in per_shard for r in shard[i]),
+                           key=lambda r: r["similarity"])
+            for i in range(len(q))
+        ]
+        if self.stage_observer is not None:
+            self.stage_observer("shards", searched - start)
+            self.stage_observer("merge", time.perf_counter() - searched)
+        return results
+
+    # ---------- Actualizaciones (se enrutan al shard dueño de cada producto) ----------
+
+    def add_products(self, products, embeddings):
+        """Añade productos nuevos. Falla (sin aplicar nada) si algún product_id ya existe."""
+        groups = self._route([p.get("id") for p in products])
+        futures = [
+            self._executors[shard].submit(_shard_existing, [products[i].get("id") for i in positions])
+            for shard, positions in groups.items()
+        ]
+        existing = [pid for f in futures for pid in f.result()]
+        if existing:
+            raise ValueError(f"Productos ya existentes: {existing[:10]}")
+        return self.upsert(products, embeddings)
+
+    def upsert(self, products, embeddings):
+        """Añade o reemplaza productos. Devuelve (shard, fila) de cada producto."""
+        vectors = np.array(embeddings, dtype=np.float32).reshape(-1, self.input_dim)
+        if len(vectors) != len(products):
+            raise ValueError("Se necesita un embedding por producto")
+        if any(p.get("id") is None for p in products):
+            raise ValueError("Cada producto necesita un 'id'")
+
+        groups = self._route([p["id"] for p in products])
+        futures = {
+            shard: self._executors[shard].submit(
+                _shard_call, "upsert", [products[i] for i in positions], vectors[positions])
+            for shard, positions in groups.items()
+        }
+        rows = [None] * len(products)
+        for shard, positions in groups.items():
+            for pos, row in zip(positions, futures[shard].result()):
+                rows[pos] = (shard, row)
+        self.version += 1
+        # Si un id venía repetido en el lote, solo su última aparición tiene fila
+        return [r for r in rows if r is not None]
+
+    def remove_products(self, product_ids):
+        groups = self._route(product_ids)
+        futures = [
+            self._executors[shard].submit(_shard_call, "remove_products", [product_ids[i] for i in positions])
+            for shard, positions in groups.items()
+        ]
+        removed = sum(f.result() for f in futures)
+        if removed:
+            self.version += 1
+        return removed
+
+    # ---------- Estado y compactación ----------
+
+    @property
+    def index_version(self):
+        # Lo mantiene el coordinador: no hace falta preguntar a los shards en cada consulta
+        return f"{self._base_signature}:{self.version}"
+
+    def catalog_stats(self):
+        shards = self._broadcast(_shard_call, "catalog_stats")
+        summed = ("base_products", "added_products", "removed_rows", "total_products", "pending_delta",
+                  "embeddings_mb")
+        stats = {key: sum(s[key] for s in shards) for key in summed}
+        stats["embeddings_storage"] = shards[0]["embeddings_storage"]
+        stats.update({
+            "version": self.version,
+            "index_version": self.index_version,
+            "index_type": self.index_type,
+            "compacting": any(s["compacting"] for s in shards),
+            "num_shards": self.num_shards,
+            "shards": shards,
+        })
+        return stats
+
+    def stage_timings(self):
+        shards = self._broadcast(_shard_call, "stage_timings")
+        return {"rerank": shards[0]["rerank"], "shards": shards}
+
+    def is_compacting(self):
+        return any(self._broadcast(_shard_call, "is_compacting"))
+
+    def compact_async(self):
+        return any(self._broadcast(_shard_call, "compact_async"))
+
+    def compact(self):
+        return sum(self._broadcast(_shard_call, "compact"))
+
+    def close(self):
+        for ex in self._executors:
+            ex.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reparte el catálogo visual en N shards")
+    parser.add_argument("embeddings_path")
+    parser.add_argument("metadata_path")
+    parser.add_argument("--out", required=True, help="Carpeta de salida (se crea shards.json)")
+    parser.add_argument("--num-shards", type=int, default=4)
+    parser.add_argument("--index-type", default=None, help="Tipo de índice de cada shard (Flat, IVFFlat...)")
+    args = parser.parse_args()
+
+    manifest = shard_catalog(args.embeddings_path, args.metadata_path, args.out,
+                             args.num_shards, index_type=args.index_type)
+    print(f"✅ {manifest['total_products']:,} productos repartidos en {manifest['num_shards']} shards -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,169 @@
+import os
+import threading
 import numpy as np
 import json
+from contextlib import contextmanager
+
+def embeddings_meta_path(npy_path):
+    return os.path.splitext(npy_path)[0] + ".meta.json"
+
+def read_embeddings_meta(npy_path):
+    path = embeddings_meta_path(npy_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_embeddings_meta(npy_path, **meta):
+    with open(embeddings_meta_path(npy_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+# Formatos de almacenamiento de la matriz de embeddings (float32 = 8 KB por producto en 2048 dims)
+STORAGE_TYPES = ("float32", "float16", "int8")
+
+def sq_params_path(npy_path):
+    return os.path.splitext(npy_path)[0] + ".sq.npy"
+
+
+class SQEmbeddings:
+    """
+    Matriz de embeddings guardada como códigos int8 (ScalarQuantizer QT_8bit de FAISS,
+    min/max por dimensión). Se indexa como un array y devuelve float32 decodificado
+    solo para las filas pedidas; los códigos pueden estar mapeados (mmap).
+    """
+
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, codes, trained):
+        import faiss
+        self.codes = codes
+        self.shape = codes.shape
+        self.ndim = 2
+        self._sq = faiss.ScalarQuantizer(codes.shape[1], faiss.ScalarQuantizer.QT_8bit)
+        faiss.copy_array_to_vector(np.ascontiguousarray(trained, dtype=np.float32), self._sq.trained)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+    def __getitem__(self, key):
+        codes = self.codes[key]
+        if codes.ndim == 1:
+            return self._sq.decode(np.ascontiguousarray(codes).reshape(1, -1))[0]
+        return self._sq.decode(np.ascontiguousarray(codes))
+
+    def __array__(self, dtype=None, copy=None):
+        out = self._sq.decode(np.ascontiguousarray(self.codes))
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+
+def save_embeddings(npy_path, emb, storage="float32"):
+    """
+    Guarda embeddings ya normalizados en el formato pedido (escritura atómica) y
+    su marcador `.meta.json`. En int8 se entrena el cuantizador sobre `emb`.
+    """
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Almacenamiento '{storage}' no válido. Opciones: {list(STORAGE_TYPES)}")
+    emb = np.ascontiguousarray(emb, dtype=np.float32)
+
+    if storage == "int8":
+        import faiss
+        sq = faiss.ScalarQuantizer(emb.shape[1], faiss.ScalarQuantizer.QT_8bit)
+        sq.train(emb)
+        data = sq.compute_codes(emb)
+        np.save(sq_params_path(npy_path), faiss.vector_to_array(sq.trained))
+    else:
+        data = emb.astype(storage, copy=False)
+
+    tmp_path = npy_path + ".tmp.npy"
+    np.save(tmp_path, data)
+    os.replace(tmp_path, npy_path)
+    write_embeddings_meta(npy_path, normalized=True, dtype=storage, storage=storage, shape=list(emb.shape))
+    return data.nbytes
+
+
+def load_embeddings_npy(npy_path, mmap=False):
+    """
+    Carga la matriz de embeddings normalizada. Los .npy preparados como float16
+    o int8 (prepare_embeddings --storage) se devuelven en ese formato; el resto
+    se convierte a float32.
+    """
+    meta = read_embeddings_meta(npy_path)
+    normalized = bool(meta.get("normalized"))
+    storage = meta.get("storage", "float32")
+
+    if storage == "int8":
+        codes = np.load(npy_path, mmap_mode="r" if mmap else None)
+        return SQEmbeddings(codes, np.load(sq_params_path(npy_path)))
+    if storage == "float16":
+        return np.load(npy_path, mmap_mode="r" if mmap else None)
+
+    if mmap:
+        # Mapeo de solo lectura: los workers comparten las páginas del fichero
+        emb = np.load(npy_path, mmap_mode="r")
+        if emb.dtype == np.float32 and normalized:
+            return emb
+        print("⚠️ El .npy no está guardado como float32 normalizado, se carga en memoria "
+              "(ejecuta prepare_embeddings.py para habilitar mmap)")
 
-def load_embeddings_npy(npy_path):
     emb = np.load(npy_path)
     if emb.dtype != np.float32:
         emb = emb.astype(np.float32)
-    # Normalizar
+    if normalized:
+        return emb
+    # Normalizar (en sitio, sin copia extra)
+    if not emb.flags.writeable:
+        emb = emb.copy()
     norms = np.linalg.norm(emb, axis=1, keepdims=True) + 1e-10
-    emb = emb / norms
+    emb /= norms
     return emb
 
 def load_metadata_json(json_path):
     with open(json_path, "r", encoding="utf-8") as f:
         meta = json.load(f)
-    return meta
\ No newline at end of file
+    return meta
+
+
+class RWLock:
+    """
+    Lock lectores/escritor: muchas búsquedas concurrentes, una sola
+    actualización del catálogo a la vez. Los escritores tienen prioridad.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
@@ -0,0 +1,84 @@
+"""
+ComprIAssist - Instrumentación ligera de peticiones por módulo
+
+Cada petición a un módulo (chatbot, sentimiento, visión, generativo) registra su
+latencia en una ventana deslizante, las peticiones en curso y el último error.
+Todo ocurre en el event loop, así que basta con contadores y un deque por módulo.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class ModuleStats:
+    """Latencias recientes, peticiones en curso y errores de un módulo"""
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self._latencies = deque(maxlen=window)
+        self.in_flight = 0
+        self.total = 0
+        self.errors = 0
+        self.last_error_at = None
+        self.last_error = None
+
+    def start(self):
+        self.in_flight += 1
+        return time.perf_counter()
+
+    def finish(self, started, error=None):
+        elapsed = time.perf_counter() - started
+        self.in_flight -= 1
+        self.total += 1
+        self._latencies.append(elapsed)
+        if error is not None:
+            self.errors += 1
+            self.last_error_at = time.time()
+            self.last_error = error
+        return elapsed
+
+    def stats(self):
+        latencies_ms = np.array(self._latencies, dtype=np.float64) * 1000.0
+        if len(latencies_ms):
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            latency = {
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(latencies_ms.max()), 3),
+            }
+        else:
+            latency = {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+        return {
+            "in_flight": self.in_flight,
+            "total_requests": self.total,
+            "errors": self.errors,
+            "window": len(latencies_ms),
+            "latency": latency,
+            "last_error_at": self.last_error_at,
+            "last_error": self.last_error,
+        }
+
+
+class RequestMonitor:
+    """Registro de ModuleStats por nombre de módulo"""
+
+    def __init__(self, names, window=1000):
+        self.modules = {name: ModuleStats(name, window=window) for name in names}
+
+    def __getitem__(self, name):
+        return self.modules[name]
+
+    def snapshot(self):
+        return {name: stats.stats() for name, stats in self.modules.items()}
+
+
+def executor_queue_depth(executor):
+    """Tareas enviadas a un ThreadPoolExecutor que aún esperan hilo libre"""
+    if not isinstance(executor, ThreadPoolExecutor):
+        return 0
+    return executor._work_queue.qsize()
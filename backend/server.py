@@ -7,29 +7,43 @@ gestión inteligente de catálogos de productos de tiendas online.
 """
 
 import os
+import hmac
+import json
+import time
+import queue
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from io import BytesIO
+import threading
+from contextlib import asynccontextmanager
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Query, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 import uvicorn
-from PIL import Image
 
 # ============================================
 # IMPORTACIONES DE MÓDULOS PROPIOS
 # ============================================
 
+# Orquestador de arranque (carga concurrente y estado por módulo)
+from startup import StartupOrchestrator, READY, FAILED
+from monitoring import RequestMonitor, executor_queue_depth
+from inference_pool import InferencePool, PoolSaturated
+import metrics
+from metrics import stage_timer, count_fallback, count_rejection
+
 # Módulo Chatbot
 from models.chatbot import create_chatbot
 
 # Módulo Sentiment (con sus dependencias)
-from models.sentiment import SentimentModel, FraudDetector
+from models.sentiment import SentimentModel, FraudDetector, FakeReviewModel, ResultCache
+from models.sentiment.bulk import iter_records, score_stream
 try:
     from pysentimiento import create_analyzer 
     PYSENTIMIENTO_AVAILABLE = True
@@ -38,8 +52,15 @@ except ImportError:
 
 # Módulo Visual Search (CNN)
 try:
-    from models.visual_search.loader import ResNet50TFExtractor
-    from models.visual_search.engine import VisualSearchEngine
+    from PIL import Image
+    from models.visual_search.loader import create_extractor, decode_image
+    from models.visual_search.engine import VisualSearchEngine, coalesced_search
+    from models.visual_search.index_factory import set_faiss_threads, pca_path_for
+    from models.visual_search.metadata_store import current_store_path
+    from models.visual_search.sharded import (ShardedSearchEngine, MANIFEST_NAME, SHARD_EMBEDDINGS,
+                                              SHARD_METADATA, SHARD_INDEX, is_shard_worker)
+    from models.visual_search.batcher import MicroBatcher
+    from models.visual_search.cache import EmbeddingCache, image_hash
     VISUAL_SEARCH_AVAILABLE = True
 except ImportError as e:
     print(f"⚠️ Módulo de Visión no disponible: {e}")
@@ -59,12 +80,21 @@ except ImportError as e:
 # CONFIGURACIÓN DE LA APLICACIÓN
 # ============================================
 
+@asynccontextmanager
+async def lifespan(app):
+    # Los modelos se cargan en hilos de fondo: el servidor acepta peticiones desde el inicio
+    startup.start()
+    if STARTUP_WAIT:
+        await asyncio.get_running_loop().run_in_executor(None, startup.wait)
+    yield
+
 app = FastAPI(
     title="ComprIAssist API",
     description="API para Asistente Inteligente de Compras de Productos E-commerce con 5 Módulos de IA",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS
@@ -83,53 +113,397 @@ app.add_middleware(
 # Executor para no bloquear el loop principal con tareas pesadas (CPU/GPU)
 thread_pool = ThreadPoolExecutor(max_workers=1)
 
-# Variables globales para los modelos
+# Límite de imágenes por petición en /api/visual/search-batch
+MAX_BATCH_IMAGES = int(os.getenv("VISUAL_MAX_BATCH_IMAGES", "64"))
+
+# Límite de reseñas por petición en /api/sentiment/analyze-batch (el tamaño de lote del modelo es SENTIMENT_BATCH_SIZE)
+MAX_SENTIMENT_BATCH_TEXTS = int(os.getenv("SENTIMENT_MAX_BATCH_TEXTS", "1000"))
+
+# Pool de inferencia de sentimiento: hilos, peticiones en cola antes de responder 429,
+# espera máxima (s) antes de responder 503 e hilos intra-op de PyTorch (0 = por defecto)
+SENTIMENT_POOL_WORKERS = int(os.getenv("SENTIMENT_POOL_WORKERS", "1"))
+SENTIMENT_MAX_QUEUE = int(os.getenv("SENTIMENT_MAX_QUEUE", "16"))
+SENTIMENT_QUEUE_TIMEOUT = float(os.getenv("SENTIMENT_QUEUE_TIMEOUT", "0")) or None
+SENTIMENT_TORCH_THREADS = int(os.getenv("SENTIMENT_TORCH_THREADS", "0")) or None
+
+# Caché de resultados de sentimiento y fraude por texto normalizado (0 desactiva),
+# caducidad en segundos y fichero sqlite opcional compartido entre workers
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", "86400"))
+SENTIMENT_CACHE_DB = os.getenv("SENTIMENT_CACHE_DB") or None
+
+# /api/sentiment/analyze-stream: reseñas por lote y streams simultáneos (429 si se supera)
+SENTIMENT_STREAM_BATCH = int(os.getenv("SENTIMENT_STREAM_BATCH", "256"))
+SENTIMENT_MAX_STREAMS = int(os.getenv("SENTIMENT_MAX_STREAMS", "2"))
+
+# Fichero de patrones de spam adicional para el detector de fraude (ver models/sentiment/README.md)
+FRAUD_PATTERNS_PATH = os.getenv("FRAUD_PATTERNS_PATH") or None
+
+# Modelo estadístico de reseñas falsas (relativo a data/; sin él, solo reglas) y nº de
+# reseñas recientes contra las que se buscan casi duplicados
+FRAUD_MODEL_PATH = os.getenv("FRAUD_MODEL_PATH") or None
+FRAUD_MODEL_RECENT = int(os.getenv("FRAUD_MODEL_RECENT", "20000"))
+
+# El forward de pysentimiento corre aquí, nunca en el event loop
+sentiment_pool = InferencePool(
+    "sentiment",
+    workers=SENTIMENT_POOL_WORKERS,
+    max_queue=SENTIMENT_MAX_QUEUE,
+    timeout=SENTIMENT_QUEUE_TIMEOUT
+)
+
+# Micro-batching de /api/visual/search: ventana (ms) y tamaño máximo de batch
+VISUAL_BATCH_WINDOW_MS = float(os.getenv("VISUAL_BATCH_WINDOW_MS", "10"))
+VISUAL_BATCH_MAX_SIZE = int(os.getenv("VISUAL_BATCH_MAX_SIZE", "16"))
+
+# Tipo de índice FAISS (Flat, IVFFlat, IVFPQ, HNSWFlat) y parámetros de búsqueda por defecto
+VISUAL_INDEX_TYPE = os.getenv("VISUAL_INDEX_TYPE") or None
+VISUAL_NPROBE = int(os.getenv("VISUAL_NPROBE", "0")) or None
+VISUAL_EF_SEARCH = int(os.getenv("VISUAL_EF_SEARCH", "0")) or None
+
+# Catálogo reducido con PCA (reduce_pca.py --dim N): usa embeddings_resnet50_pcaN.npy/.faiss/.pca
+VISUAL_PCA_DIM = int(os.getenv("VISUAL_PCA_DIM", "0")) or None
+
+# Re-ranking exacto: se piden top_k * VISUAL_RERANK candidatos al índice comprimido (0 = desactivado)
+VISUAL_RERANK = int(os.getenv("VISUAL_RERANK", "0")) or None
+
+# Cargar .npy e índice con memoria mapeada (compartida entre workers de uvicorn)
+VISUAL_MMAP = os.getenv("VISUAL_MMAP", "False").lower() in ("1", "true", "yes")
+
+# Procesos que sirven la API (launcher.py fija COMPRIASSIST_WORKERS; uvicorn --workers lee
+# WEB_CONCURRENCY): con más de uno, las altas/bajas del catálogo visual se rechazan
+SERVER_WORKERS = int(os.getenv("COMPRIASSIST_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1")
+
+# Actualizaciones del catálogo: token de administración (sin él, /api/visual/admin/* queda
+# deshabilitado) y nº de cambios que dispara la compactación
+VISUAL_ADMIN_TOKEN = os.getenv("VISUAL_ADMIN_TOKEN") or None
+VISUAL_COMPACT_THRESHOLD = int(os.getenv("VISUAL_COMPACT_THRESHOLD", "10000"))
+
+# Caché de embeddings / resultados por hash de imagen (0 desactiva; directorio opcional en disco)
+VISUAL_CACHE_SIZE = int(os.getenv("VISUAL_CACHE_SIZE", "4096"))
+VISUAL_CACHE_DIR = os.getenv("VISUAL_CACHE_DIR") or None
+
+# Backend de embeddings: 'keras' (referencia, TensorFlow) u 'onnx' (ONNX Runtime, admite int8)
+VISUAL_BACKEND = os.getenv("VISUAL_BACKEND", "keras")
+VISUAL_ONNX_MODEL = os.getenv("VISUAL_ONNX_MODEL", "resnet50_int8.onnx")
+VISUAL_ONNX_THREADS = int(os.getenv("VISUAL_ONNX_THREADS", "0")) or None
+
+# Hilos de cada librería por separado (0 = valor por defecto: todos los núcleos, y compiten entre sí)
+VISUAL_TF_INTRA_THREADS = int(os.getenv("VISUAL_TF_INTRA_THREADS", "0")) or None
+VISUAL_TF_INTER_THREADS = int(os.getenv("VISUAL_TF_INTER_THREADS", "0")) or None
+VISUAL_FAISS_THREADS = int(os.getenv("VISUAL_FAISS_THREADS", "0")) or None
+
+# Búsqueda FAISS fuera del event loop: hilos del executor y agrupación de consultas concurrentes
+VISUAL_SEARCH_WORKERS = int(os.getenv("VISUAL_SEARCH_WORKERS", "2"))
+VISUAL_SEARCH_WINDOW_MS = float(os.getenv("VISUAL_SEARCH_WINDOW_MS", "2"))
+VISUAL_SEARCH_BATCH_MAX_SIZE = int(os.getenv("VISUAL_SEARCH_BATCH_MAX_SIZE", "32"))
+
+# Catálogo repartido en shards (carpeta con shards.json, relativa a data/): un proceso por shard
+VISUAL_SHARDS_DIR = os.getenv("VISUAL_SHARDS_DIR") or None
+
+# Variables globales para los modelos (las asigna el orquestador de arranque)
+chatbot = None
+sentiment_model = None
+fraud_detector = None
+# Etapa de /metrics del detector de fraude: 'fraud_regex' (reglas) o 'fraud_model'
+fraud_stage = "fraud_regex"
 extractor = None
 search_engine = None
+embedding_batcher = None
+embedding_cache = None
+search_pool = None
+search_batcher = None
 generative_model = None
 
-# Inicializar Chatbot
 HF_API_KEY = os.getenv("HUGGINGFACE_API_KEY", None)
-chatbot = create_chatbot(hf_api_key=HF_API_KEY)
 
-print("✅ Chatbot inicializado correctamente")
-if HF_API_KEY:
-    print("   → Usando HuggingFace API para respuestas avanzadas")
-else:
-    print("   → Usando respuestas predefinidas (configura HUGGINGFACE_API_KEY para mejores respuestas)")
+# Carga en segundo plano: las peticiones a un módulo que aún no está listo reciben 503
+STARTUP_WAIT = os.getenv("STARTUP_WAIT", "False").lower() in ("1", "true", "yes")
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "True").lower() in ("1", "true", "yes")
 
-# Inicializar Sentiment Analysis
-sentiment_model = SentimentModel()
-fraud_detector = FraudDetector()
-print("✅ Módulo de análisis de sentimientos inicializado")
+# /health/*: nº de peticiones de la ventana de latencias y cola máxima antes de marcar "saturated"
+HEALTH_WINDOW = int(os.getenv("HEALTH_WINDOW", "1000"))
+HEALTH_MAX_QUEUE_DEPTH = int(os.getenv("HEALTH_MAX_QUEUE_DEPTH", "64"))
 
-# Inicializar Visual Search
-if VISUAL_SEARCH_AVAILABLE:
-    print("--- Cargando modelos de Visión Artificial... ---")
-    
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    DATA_DIR = os.path.join(BASE_DIR, "data")
-    
+def load_chatbot():
+    global chatbot
+    chatbot = create_chatbot(hf_api_key=HF_API_KEY)
+    chatbot.stage_observer = chatbot.intent_classifier.stage_observer = metrics.stage_observer("chatbot")
+    chatbot.fallback_observer = metrics.fallback_observer("chatbot")
+    print("✅ Chatbot inicializado correctamente")
+    if HF_API_KEY:
+        print("   → Usando HuggingFace API para respuestas avanzadas")
+    else:
+        print("   → Usando respuestas predefinidas (configura HUGGINGFACE_API_KEY para mejores respuestas)")
+    return chatbot
+
+def warmup_chatbot(bot):
+    # Un saludo no llama al LLM: solo clasificador de intenciones y extracción de entidades
+    bot.process_message("hola, busco una camiseta azul talla M")
+
+def load_sentiment():
+    global sentiment_model, fraud_detector, fraud_stage
+    sentiment_model = SentimentModel(num_threads=SENTIMENT_TORCH_THREADS)
+    fraud_detector = FraudDetector(patterns_path=FRAUD_PATTERNS_PATH)
+    print(f"   → Detector de fraude: {len(fraud_detector.matcher)} frases, {len(fraud_detector.regexes)} regex")
+    if FRAUD_MODEL_PATH:
+        model_path = os.path.join(DATA_DIR, FRAUD_MODEL_PATH)
+        try:
+            fraud_detector = FakeReviewModel.load(model_path, detector=fraud_detector, lsh_capacity=FRAUD_MODEL_RECENT)
+            fraud_stage = "fraud_model"
+            print(f"   → Modelo de reseñas falsas: {model_path}")
+        except OSError as e:
+            print(f"⚠️ Modelo de reseñas falsas no disponible ({e}); se usan solo las reglas")
+    if SENTIMENT_CACHE_SIZE > 0:
+        # El modelo de reseñas falsas no se cachea: la caché va por texto, y una copia exacta
+        # de otra reseña debe pasar por el índice de casi duplicados (que sube su puntuación).
+        # Repetir el análisis de una misma reseña ya es idempotente si trae review_id
+        cached = [("sentiment", sentiment_model)]
+        if isinstance(fraud_detector, FraudDetector):
+            cached.append(("fraud", fraud_detector))
+        for name, model in cached:
+            model.cache = ResultCache(
+                model.version,
+                max_entries=SENTIMENT_CACHE_SIZE,
+                ttl=SENTIMENT_CACHE_TTL,
+                disk_path=SENTIMENT_CACHE_DB,
+                name=name
+            )
+            model.cache.observer = metrics.cache_observer(name)
+    print("✅ Módulo de análisis de sentimientos inicializado")
+    return sentiment_model, fraud_detector
+
+def warmup_sentiment(models):
+    model, detector = models
+    text = "El producto llegó a tiempo y la calidad es muy buena."
+    model.analyze(text)
+    detector.analyze(text)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+def visual_catalog_paths():
+    """Rutas de embeddings, metadatos, índice FAISS y carpeta de shards (o None) según la configuración."""
     # Definir las 3 rutas explícitamente
     EMB_PATH = os.path.join(DATA_DIR, "embeddings_resnet50.npy")
     META_PATH = os.path.join(DATA_DIR, "metadata_resnet50_cloudinary.json")
     FAISS_PATH = os.path.join(DATA_DIR, "embeddings_resnet50.faiss")
+    if VISUAL_PCA_DIM:
+        # Las consultas de 2048 dims se proyectan con la PCA guardada junto al índice
+        EMB_PATH = os.path.join(DATA_DIR, f"embeddings_resnet50_pca{VISUAL_PCA_DIM}.npy")
+        FAISS_PATH = os.path.join(DATA_DIR, f"embeddings_resnet50_pca{VISUAL_PCA_DIM}.faiss")
     
+    SHARDS_DIR = os.path.join(DATA_DIR, VISUAL_SHARDS_DIR) if VISUAL_SHARDS_DIR else None
+    return EMB_PATH, META_PATH, FAISS_PATH, SHARDS_DIR
+
+def load_visual_catalog():
+    """Carga el índice FAISS, los embeddings y los metadatos (solo lectura)."""
+    if not VISUAL_SEARCH_AVAILABLE:
+        raise RuntimeError("Dependencias de visión no instaladas")
+    EMB_PATH, META_PATH, FAISS_PATH, SHARDS_DIR = visual_catalog_paths()
+
     # Comprobar que existan
-    if os.path.exists(EMB_PATH) and os.path.exists(META_PATH) and os.path.exists(FAISS_PATH):
-        try:
-            extractor = ResNet50TFExtractor()
-            search_engine = VisualSearchEngine(EMB_PATH, META_PATH, index_path=FAISS_PATH)
-            print(f"✅ Modelos de visión cargados. Index usado: {FAISS_PATH}")
-        except Exception as e:
-            print(f"❌ ERROR cargando modelos de visión: {e}")
+    if SHARDS_DIR and not os.path.exists(os.path.join(SHARDS_DIR, MANIFEST_NAME)):
+        raise FileNotFoundError(f"FALTA {MANIFEST_NAME} en {SHARDS_DIR}. Genéralo con models.visual_search.sharded")
+    if not SHARDS_DIR and not (os.path.exists(EMB_PATH) and os.path.exists(META_PATH) and os.path.exists(FAISS_PATH)):
+        raise FileNotFoundError(f"FALTAN ARCHIVOS en {DATA_DIR}. Verifica .npy, .json y .faiss")
+
+    faiss_threads = set_faiss_threads(VISUAL_FAISS_THREADS)
+    engine_kwargs = dict(
+        index_type=VISUAL_INDEX_TYPE,
+        nprobe=VISUAL_NPROBE,
+        ef_search=VISUAL_EF_SEARCH,
+        mmap=VISUAL_MMAP,
+        compact_threshold=VISUAL_COMPACT_THRESHOLD,
+        rerank=VISUAL_RERANK
+    )
+    if SHARDS_DIR:
+        engine = ShardedSearchEngine(SHARDS_DIR, **engine_kwargs)
+        source = f"{SHARDS_DIR} ({engine.num_shards} shards)"
     else:
-        print(f"⚠️ FALTAN ARCHIVOS en {DATA_DIR}. Verifica .npy, .json y .faiss")
+        engine = VisualSearchEngine(EMB_PATH, META_PATH, index_path=FAISS_PATH, **engine_kwargs)
+        source = FAISS_PATH
+    engine.stage_observer = metrics.stage_observer("visual_search")
+    print(f"✅ Catálogo visual cargado: {source} ({engine.index_type}) | hilos FAISS: {faiss_threads}")
+    return engine
+
+def load_visual():
+    """Carga extractor, índice y batchers de búsqueda visual (no dentro de un proceso de shard)."""
+    global extractor, search_engine, embedding_batcher, embedding_cache, search_pool, search_batcher
+    print("--- Cargando modelos de Visión Artificial... ---")
+    engine = load_visual_catalog()
 
-# Inicializar modelo generativo
-if GENERATIVE_AVAILABLE:
+    extractor = create_extractor(
+        VISUAL_BACKEND,
+        model_path=os.path.join(DATA_DIR, VISUAL_ONNX_MODEL),
+        intra_op_threads=VISUAL_ONNX_THREADS if VISUAL_BACKEND == "onnx" else VISUAL_TF_INTRA_THREADS,
+        inter_op_threads=VISUAL_TF_INTER_THREADS
+    )
+    extractor.stage_observer = metrics.stage_observer("visual_search")
+    print(f"   → Backend de embeddings: {extractor.name}")
+    embedding_batcher = MicroBatcher(
+        extractor.images_to_embeddings,
+        max_batch_size=VISUAL_BATCH_MAX_SIZE,
+        max_wait_ms=VISUAL_BATCH_WINDOW_MS,
+        executor=thread_pool,
+        name="resnet50"
+    )
+    # Búsquedas en su propio pool (FAISS libera el GIL) y agrupadas en una sola index.search
+    search_pool = ThreadPoolExecutor(max_workers=VISUAL_SEARCH_WORKERS, thread_name_prefix="visual-search")
+    search_batcher = MicroBatcher(
+        partial(coalesced_search, engine),
+        max_batch_size=VISUAL_SEARCH_BATCH_MAX_SIZE,
+        max_wait_ms=VISUAL_SEARCH_WINDOW_MS,
+        executor=search_pool,
+        name="faiss-search"
+    )
+    if VISUAL_CACHE_SIZE > 0:
+        embedding_cache = EmbeddingCache(
+            max_embeddings=VISUAL_CACHE_SIZE,
+            max_results=VISUAL_CACHE_SIZE,
+            disk_dir=VISUAL_CACHE_DIR,
+            namespace=extractor.name
+        )
+    # El motor se publica el último: los endpoints comprueban `search_engine` antes de usar el resto
+    search_engine = engine
+    print("✅ Modelos de visión cargados")
+    return extractor, search_engine
+
+def warmup_visual(models):
+    # Primer forward (inicializa kernels / sesión ONNX) y primera búsqueda (páginas del índice)
+    model, engine = models
+    blank = Image.new("RGB", model.input_size, (255, 255, 255))
+    emb = model.images_to_embeddings([blank])
+    engine.search(emb[0], top_k=1)
+
+def load_generative():
+    global generative_model
+    if not GENERATIVE_AVAILABLE:
+        raise RuntimeError("Módulo generativo no disponible")
     generative_model = GenerativeModel()
     print("✅ Módulo generativo inicializado exitosamente")
+    return generative_model
+
+startup = StartupOrchestrator()
+startup.register("chatbot", load_chatbot, warmup_chatbot if STARTUP_WARMUP else None)
+startup.register("sentiment", load_sentiment, warmup_sentiment if STARTUP_WARMUP else None)
+startup.register("generative", load_generative)
+# Un proceso de shard importa este módulo al arrancar (spawn): solo sirve su parte del índice
+if not (VISUAL_SEARCH_AVAILABLE and is_shard_worker()):
+    startup.register("visual_search", load_visual, warmup_visual if STARTUP_WARMUP else None)
+
+# Módulos que no crean hilos ni runtimes nativos al cargarse: se pueden cargar antes de un fork
+FORK_SAFE_MODULES = ("chatbot", "generative")
+
+def warm_page_cache(paths, chunk_size=1 << 22):
+    """
+    Lee los ficheros para dejarlos en la caché de páginas del sistema, compartida
+    entre procesos. Las carpetas (store columnar, shards) se recorren enteras.
+    Devuelve los MB leídos (los que no existen se ignoran).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+
+    total = 0
+    for path in files:
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while True:
+                    read = len(f.read(chunk_size))
+                    if not read:
+                        break
+                    total += read
+        except OSError:
+            continue
+    return total / (1024 * 1024)
+
+def visual_catalog_files(emb_path, meta_path, faiss_path):
+    """Ficheros que abre VisualSearchEngine para un catálogo, incluido el store columnar vigente"""
+    return [emb_path, meta_path, faiss_path, pca_path_for(faiss_path), current_store_path(meta_path)]
+
+def preload_shared():
+    """
+    Carga en este proceso lo que los workers comparten por copy-on-write (launcher.py):
+    reglas del chatbot y plantillas generativas, Python puro. FAISS (OpenMP),
+    TensorFlow/ONNX y pysentimiento crean hilos, y hacer fork de un proceso con hilos
+    no es seguro: cada worker los carga después del fork. Del catálogo visual el
+    padre solo calienta los ficheros en la caché de páginas, así que la carga de cada
+    worker (con VISUAL_MMAP, incluso las páginas) no repite la lectura del disco.
+    Se vuelve a llamar para recargar los datos.
+    """
+    startup.preload(FORK_SAFE_MODULES)
+    warmed = 0.0
+    if VISUAL_SEARCH_AVAILABLE and startup.status("visual_search") is not None:
+        emb_path, meta_path, faiss_path, shards_dir = visual_catalog_paths()
+        paths = visual_catalog_files(emb_path, meta_path, faiss_path)
+        if shards_dir and os.path.isdir(shards_dir):
+            paths = []
+            for name in sorted(os.listdir(shards_dir)):
+                shard_dir = os.path.join(shards_dir, name)
+                if os.path.isdir(shard_dir):
+                    paths += visual_catalog_files(os.path.join(shard_dir, SHARD_EMBEDDINGS),
+                                                  os.path.join(shard_dir, SHARD_METADATA),
+                                                  os.path.join(shard_dir, SHARD_INDEX))
+        warmed = warm_page_cache(paths)
+    return startup.snapshot(), warmed
+
+# Prefijo de ruta -> módulo del que depende
+MODULE_PREFIXES = {
+    "/api/chatbot": "chatbot",
+    "/api/sentiment": "sentiment",
+    "/api/visual": "visual_search",
+    "/api/generative": "generative",
+}
+
+# Latencias, peticiones en curso y últimos errores por módulo (/health/details)
+monitor = RequestMonitor(MODULE_PREFIXES.values(), window=HEALTH_WINDOW)
+
+def module_for_path(path):
+    for prefix, name in MODULE_PREFIXES.items():
+        if path.startswith(prefix):
+            return name
+    return None
+
+@app.middleware("http")
+async def module_gate(request: Request, call_next):
+    """
+    Responde 503 a las rutas de un módulo que todavía está cargando o que falló al cargar,
+    y mide la latencia y los errores de las que sí se atienden.
+    """
+    name = module_for_path(request.url.path)
+    if name is None:
+        return await call_next(request)
+
+    status = startup.status(name)
+    if status is not None and status != READY:
+        state = startup.snapshot()[name]
+        headers = {} if status == FAILED else {"Retry-After": "5"}
+        return JSONResponse(
+            status_code=503,
+            headers=headers,
+            content={
+                "detail": f"El módulo '{name}' no está disponible ({status})",
+                "module": name,
+                "status": status,
+                "error": state["error"]
+            }
+        )
+
+    stats = monitor[name]
+    started = stats.start()
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        metrics.observe_request(name, stats.finish(started, error=f"{type(e).__name__}: {e}"))
+        raise
+    elapsed = stats.finish(started, error=f"HTTP {response.status_code}" if response.status_code >= 500 else None)
+    metrics.observe_request(name, elapsed)
+    return response
 
 # ============================================
 # MODELOS DE DATOS (Pydantic)
@@ -141,12 +515,20 @@ class ChatMessage(BaseModel):
 
 class SentimentRequest(BaseModel):
     text: str
+    review_id: Optional[str] = Field(None, description="Id de la reseña: repetir el análisis da el mismo resultado")
+
+class SentimentBatchRequest(BaseModel):
+    texts: List[str] = Field(..., description="Reseñas a analizar", min_length=1)
+    review_ids: Optional[List[Optional[str]]] = Field(None, description="Id de cada reseña (mismo orden que texts)")
 
 class RecommendationRequest(BaseModel):
     user_id: str
     context: Optional[str] = None
     limit: int = 10
 
+class RemoveProductsRequest(BaseModel):
+    product_ids: List[Any] = Field(..., description="Ids de los productos a dar de baja", min_length=1)
+
 # Modelos para IA Generativa
 class CategoriaProducto(str, Enum):
     """Categorías de productos disponibles."""
@@ -240,10 +622,35 @@ def get_generative_model():
         )
     return generative_model
 
+# modelo_usado -> etiqueta de la etapa en /metrics
+GENERATIVE_PATHS = {
+    "huggingface-api": "api",
+    "templates-inteligentes": "template",
+    "reglas-inteligentes": "rules",
+    "optimizacion-seo": "seo",
+}
+
+def observe_generation(model, resultado, started):
+    """Registra la duración según el camino usado (API o templates) y si la API falló"""
+    path = GENERATIVE_PATHS.get(resultado.get("modelo_usado"), "other")
+    metrics.observe_stage("generative", path, time.perf_counter() - started)
+    if path == "template" and model.client is not None and not model.use_templates_only:
+        count_fallback("generative", "api_failed")
+
 # ============================================
 # ENDPOINTS DE SALUD
 # ============================================
 
+def module_label(name):
+    status = startup.status(name)
+    if status is None:
+        return "not available ⚠️"
+    if status == READY:
+        return "ready ✅"
+    if status == FAILED:
+        return "failed ⚠️ (check logs)"
+    return f"{status} ⏳"
+
 @app.get("/")
 async def root():
     """Endpoint raíz - Información de la API"""
@@ -251,20 +658,24 @@ async def root():
         "name": "ComprIAssist API",
         "version": "1.0.0",
         "description": "Asistente Inteligente de Compras de Productos E-commerce basado en IA",
-        "status": "operational",
+        "status": "operational" if startup.all_settled() else "starting",
         "modules": {
-            "chatbot": "ready ✅",
-            "generative": "ready ✅" if GENERATIVE_AVAILABLE else "not available ⚠️",
-            "sentiment": "ready ✅",
-            "visual_search": "active ✅" if search_engine else "inactive ⚠️ (check logs)",
+            "chatbot": module_label("chatbot"),
+            "generative": module_label("generative"),
+            "sentiment": module_label("sentiment"),
+            "visual_search": module_label("visual_search"),
             "recommendation": "in development 🚧"
         },
         "endpoints": {
             "docs": "/docs",
             "health": "/health",
+            "health_details": "/health/details",
             "chatbot": "/api/chatbot/message",
             "sentiment": "/api/sentiment/analyze",
+            "sentiment_batch": "/api/sentiment/analyze-batch",
+            "sentiment_stream": "/api/sentiment/analyze-stream",
             "visual_search": "/api/visual/search",
+            "visual_search_batch": "/api/visual/search-batch",
             "generative": "/api/generative/",
             "recommendation": "/api/recommend/products"
         }
@@ -274,14 +685,86 @@ async def root():
 async def health_check():
     """Health check para monitoreo"""
     return {
-        "status": "healthy",
+        "status": "healthy" if startup.all_settled() else "starting",
         "timestamp": datetime.now().isoformat(),
         "modules": {
-            "chatbot": True,
-            "generative": GENERATIVE_AVAILABLE,
-            "sentiment": True,
-            "visual_search": search_engine is not None,
+            "chatbot": startup.is_ready("chatbot"),
+            "generative": startup.is_ready("generative"),
+            "sentiment": startup.is_ready("sentiment"),
+            "visual_search": startup.is_ready("visual_search"),
             "recommendation": False  # En desarrollo
+        },
+        # Estado de carga por módulo: pending/loading/warming/ready/failed y duraciones
+        "startup": startup.snapshot()
+    }
+
+def queue_depths():
+    """Tareas esperando en cada executor y en cada micro-batcher"""
+    default_executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    queues = {
+        "inference_pool": executor_queue_depth(thread_pool),
+        "sentiment_pool": sentiment_pool.queue_depth(),
+        "visual_search_pool": executor_queue_depth(search_pool),
+        "default_pool": executor_queue_depth(default_executor),
+    }
+    for batcher in (embedding_batcher, search_batcher):
+        if batcher is not None:
+            queues[f"{batcher.name}_batcher"] = batcher.stats()["queue_depth"]
+    return queues
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas en formato Prometheus (agregadas entre workers si PROMETHEUS_MULTIPROC_DIR está definido)"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: el proceso responde (no depende de que los modelos estén cargados)"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Readiness para el balanceador: 503 mientras algún módulo carga o si alguna cola
+    supera HEALTH_MAX_QUEUE_DEPTH. Los módulos que fallaron se listan pero no bloquean.
+    """
+    modules = {name: state["status"] for name, state in startup.snapshot().items()}
+    queues = queue_depths()
+    saturated = {name: depth for name, depth in queues.items() if depth > HEALTH_MAX_QUEUE_DEPTH}
+
+    if not startup.all_settled():
+        status = "starting"
+    elif saturated:
+        status = "saturated"
+    else:
+        status = "ready"
+    return JSONResponse(
+        status_code=200 if status == "ready" else 503,
+        content={
+            "status": status,
+            "modules": modules,
+            "failed_modules": [name for name, s in modules.items() if s == FAILED],
+            "saturated_queues": saturated
+        }
+    )
+
+@app.get("/health/details")
+async def health_details():
+    """Estado de carga, latencias p50/p95/p99 recientes, peticiones en curso, colas y últimos errores"""
+    startup_state = startup.snapshot()
+    requests_state = monitor.snapshot()
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "modules": {
+            name: {"startup": startup_state.get(name), "requests": requests_state[name]}
+            for name in requests_state
+        },
+        "queues": queue_depths(),
+        "max_queue_depth": HEALTH_MAX_QUEUE_DEPTH,
+        "sentiment_pool": sentiment_pool.stats(),
+        "sentiment_cache": {
+            name: model.cache.stats() if model is not None and model.cache is not None else None
+            for name, model in (("sentiment", sentiment_model), ("fraud", fraud_detector))
         }
     }
 
@@ -328,17 +811,47 @@ async def chatbot_message(chat: ChatMessage):
 # MÓDULO 2: ANÁLISIS DE SENTIMIENTOS
 # ============================================
 
-@app.post("/api/sentiment/analyze")
-async def analyze_sentiment(request: SentimentRequest):
+async def run_sentiment(fn, *args):
     """
-    Analiza el sentimiento de una reseña y detecta si es potencialmente falsa.
+    Ejecuta fn en el pool de sentimiento: 429 si ya hay SENTIMENT_MAX_QUEUE peticiones
+    esperando y 503 si no termina en SENTIMENT_QUEUE_TIMEOUT segundos.
     """
-    
+    try:
+        return await sentiment_pool.run(fn, *args)
+    except PoolSaturated:
+        count_rejection("sentiment", "queue_full")
+        raise HTTPException(
+            status_code=429,
+            detail="Análisis de sentimiento saturado, reintenta en unos segundos.",
+            headers={"Retry-After": "1"}
+        )
+    except asyncio.TimeoutError:
+        count_rejection("sentiment", "timeout")
+        raise HTTPException(
+            status_code=503,
+            detail=f"El análisis de sentimiento no terminó en {SENTIMENT_QUEUE_TIMEOUT:g}s.",
+            headers={"Retry-After": "5"}
+        )
+
+def analyze_sentiment_sync(text, review_id=None):
     # 1. Análisis de Sentimiento (pysentimiento o respaldo)
-    sentiment_result = sentiment_model.analyze(request.text)
+    with stage_timer("sentiment", "predict"):
+        sentiment_result = sentiment_model.analyze(text)
+    if sentiment_model.model is None:
+        count_fallback("sentiment", "no_model")
 
     # 2. Detección de Reseña Falsa (basado en patrones)
-    fraud_result = fraud_detector.analyze(request.text)
+    with stage_timer("sentiment", fraud_stage):
+        fraud_result = fraud_detector.analyze_batch([text], [review_id])[0]
+    return sentiment_result, fraud_result
+
+@app.post("/api/sentiment/analyze")
+async def analyze_sentiment(request: SentimentRequest):
+    """
+    Analiza el sentimiento de una reseña y detecta si es potencialmente falsa.
+    La inferencia corre en el pool de sentimiento, fuera del event loop.
+    """
+    sentiment_result, fraud_result = await run_sentiment(analyze_sentiment_sync, request.text, request.review_id)
     
     # 3. Combinar y devolver los resultados
     return {
@@ -350,15 +863,240 @@ async def analyze_sentiment(request: SentimentRequest):
         "fake_probability": fraud_result["fake_probability"]
     }
 
+def analyze_sentiment_batch_sync(texts, review_ids=None):
+    """Sentimiento por lotes (ordenados por longitud) + detector de fraude de cada reseña"""
+    with stage_timer("sentiment", "predict_batch"):
+        sentiment_results = sentiment_model.analyze_batch(texts)
+    if sentiment_model.model is None:
+        count_fallback("sentiment", "no_model")
+    with stage_timer("sentiment", fraud_stage):
+        fraud_results = fraud_detector.analyze_batch(texts, review_ids)
+
+    return [
+        {
+            "text": text,
+            "sentiment": s["sentiment"],
+            "confidence": s["confidence"],
+            "probabilities": s["probabilities"],
+            "is_fake": f["is_fake"],
+            "fake_probability": f["fake_probability"]
+        }
+        for text, s, f in zip(texts, sentiment_results, fraud_results)
+    ]
+
+@app.post("/api/sentiment/analyze-batch")
+async def analyze_sentiment_batch(request: SentimentBatchRequest):
+    """
+    Analiza varias reseñas en una sola petición: el modelo procesa lotes de
+    SENTIMENT_BATCH_SIZE textos de longitud parecida en vez de uno por uno.
+    Devuelve el mismo resultado que /api/sentiment/analyze para cada reseña, en orden.
+    """
+    if len(request.texts) > MAX_SENTIMENT_BATCH_TEXTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {MAX_SENTIMENT_BATCH_TEXTS} reseñas por petición."
+        )
+    if request.review_ids is not None and len(request.review_ids) != len(request.texts):
+        raise HTTPException(status_code=400, detail="review_ids debe tener un id por reseña.")
+
+    results = await run_sentiment(analyze_sentiment_batch_sync, request.texts, request.review_ids)
+    return {
+        "total": len(results),
+        "results": results
+    }
+
+# Streams en curso de /api/sentiment/analyze-stream
+stream_slots = threading.BoundedSemaphore(SENTIMENT_MAX_STREAMS)
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que no escucha receive() para detectar desconexiones (lo hace
+    con ASGI < 2.4 y se comería el cuerpo): aquí el endpoint sigue leyendo el cuerpo
+    de la petición mientras responde, y es esa lectura la que ve la desconexión.
+    La tarea de fondo se ejecuta siempre, también si el envío falla o se cancela.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+def put_until_stopped(q, item, stop, poll=0.5):
+    """q.put que se rinde si `stop` se activa (el consumidor ya no lee); True si se encoló"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=poll)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+async def feed_body_lines(request, lines_q, stop, done):
+    """Pasa el cuerpo de la petición a `lines_q` en listas de líneas; None al terminar"""
+    loop = asyncio.get_running_loop()
+    pending = b""
+    try:
+        async for chunk in request.stream():
+            if stop.is_set():
+                return
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            # Cola acotada: si el modelo va por detrás, se deja de leer el cuerpo
+            if lines and not await loop.run_in_executor(
+                    None, put_until_stopped, lines_q, [l.decode("utf-8", "replace") + "\n" for l in lines], stop):
+                return
+        if pending:
+            await loop.run_in_executor(None, put_until_stopped, lines_q, [pending.decode("utf-8", "replace")], stop)
+        await loop.run_in_executor(None, put_until_stopped, lines_q, None, stop)
+    finally:
+        # Aunque la tarea se cancele o falle, el consumidor deja de esperar líneas
+        done.set()
+
+def log_task_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Error leyendo el cuerpo de analyze-stream: {task.exception()}")
+
+@app.post("/api/sentiment/analyze-stream")
+async def analyze_sentiment_stream(
+    request: Request,
+    format: Optional[str] = Query(None, description="jsonl o csv (por defecto según Content-Type)"),
+    text_field: str = Query("text"),
+    id_field: str = Query("id")
+):
+    """
+    Puntúa un volcado de reseñas enviado como cuerpo JSONL o CSV y devuelve JSONL
+    (application/x-ndjson) a medida que termina cada lote de SENTIMENT_STREAM_BATCH.
+    Solo hay unos pocos lotes en memoria: el cuerpo se lee al ritmo del modelo, así que
+    el cliente debe leer la respuesta mientras envía (curl -N -T reseñas.jsonl); para
+    ficheros locales está `python -m models.sentiment.bulk`.
+    Cada línea: {"row", "id"?, sentiment..., is_fake, fake_probability} o {"row", "error"}.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    if fmt not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="Formato no soportado: usa jsonl o csv.")
+    if sentiment_pool.saturated():
+        count_rejection("sentiment", "queue_full")
+        raise HTTPException(
+            status_code=429,
+            detail="Análisis de sentimiento saturado, reintenta en unos segundos.",
+            headers={"Retry-After": "1"}
+        )
+    if not stream_slots.acquire(blocking=False):
+        count_rejection("sentiment", "streams")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Máximo {SENTIMENT_MAX_STREAMS} análisis en streaming simultáneos.",
+            headers={"Retry-After": "10"}
+        )
+
+    lines_q = queue.Queue(maxsize=8)
+    stop = threading.Event()
+    body_done = threading.Event()
+    feeder = asyncio.create_task(feed_body_lines(request, lines_q, stop, body_done))
+    feeder.add_done_callback(log_task_error)
+
+    def body_lines():
+        while not stop.is_set():
+            try:
+                lines = lines_q.get(timeout=0.5)
+            except queue.Empty:
+                if body_done.is_set() and lines_q.empty():
+                    return
+                continue
+            if lines is None:
+                return
+            yield from lines
+
+    def results():
+        # Starlette recorre este generador en su pool de hilos: un salto por lote, no por línea
+        out = []
+        error = None
+        try:
+            records = iter_records(body_lines(), fmt, text_field, id_field)
+            # El forward de cada lote pasa por la admisión del pool de sentimiento (espera
+            # hasta SENTIMENT_QUEUE_TIMEOUT a tener sitio) mientras el fraude se calcula aquí
+            for result in score_stream(records, sentiment_model, fraud_detector,
+                                       batch_size=SENTIMENT_STREAM_BATCH,
+                                       submit=partial(sentiment_pool.submit, wait=SENTIMENT_QUEUE_TIMEOUT),
+                                       timeout=SENTIMENT_QUEUE_TIMEOUT):
+                out.append(json.dumps(result, ensure_ascii=False))
+                if len(out) >= SENTIMENT_STREAM_BATCH:
+                    yield "\n".join(out) + "\n"
+                    out = []
+        except PoolSaturated:
+            count_rejection("sentiment", "queue_full")
+            error = "Análisis de sentimiento saturado: el resto del cuerpo no se procesó."
+        except FutureTimeout:
+            sentiment_pool.record_timeout()
+            count_rejection("sentiment", "timeout")
+            error = f"Un lote no terminó en {SENTIMENT_QUEUE_TIMEOUT:g}s: el resto del cuerpo no se procesó."
+        except Exception as e:
+            print(f"Error en analyze-stream: {e}")
+            error = str(e)
+        finally:
+            # feed_body_lines y body_lines dejan de esperar en cuanto ven `stop`
+            stop.set()
+        if error is not None:
+            out.append(json.dumps({"error": error}, ensure_ascii=False))
+        if out:
+            yield "\n".join(out) + "\n"
+
+    async def close_stream():
+        # Siempre, aunque la respuesta falle antes de empezar el generador
+        stop.set()
+        feeder.cancel()
+        stream_slots.release()
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson",
+                                   background=BackgroundTask(close_stream))
+
 # ============================================
 # MÓDULO 3: BÚSQUEDA VISUAL
 # ============================================
 
+def build_visual_filters(category, min_price, max_price):
+    """Filtros de búsqueda visual a partir de los query params (None si no hay ninguno)."""
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="min_price no puede ser mayor que max_price.")
+    filters = {}
+    if category:
+        filters["category"] = category
+    if min_price is not None:
+        filters["min_price"] = min_price
+    if max_price is not None:
+        filters["max_price"] = max_price
+    return filters or None
+
+async def read_upload_image(file: UploadFile):
+    """
+    Decodifica la subida directamente a 224x224 (draft JPEG) en el pool por defecto:
+    ni la decodificación ni el reescalado bloquean el event loop, y la imagen se lee
+    del fichero temporal de la subida sin copiarla entera a memoria.
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, timed_decode, file.file, extractor.input_size)
+
+def timed_decode(fp, size):
+    with stage_timer("visual_search", "decode"):
+        return decode_image(fp, size)
+
 @app.post("/api/visual/search")
-async def visual_search(file: UploadFile = File(...), top_k: int = 5):
+async def visual_search(
+    file: UploadFile = File(...),
+    top_k: int = 5,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    category: Optional[List[str]] = Query(None, description="Categoría(s) (articleType) permitidas"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0)
+):
     """
-    Búsqueda de productos similares por imagen utilizando ResNet50 + FAISS
+    Búsqueda de productos similares por imagen utilizando ResNet50 + FAISS.
+    Los filtros de categoría y precio se aplican dentro de la búsqueda del índice.
     """
+    filters = build_visual_filters(category, min_price, max_price)
     if not search_engine or not extractor:
         raise HTTPException(
             status_code=503, 
@@ -370,25 +1108,45 @@ async def visual_search(file: UploadFile = File(...), top_k: int = 5):
         raise HTTPException(status_code=400, detail="El archivo debe ser una imagen.")
 
     try:
-        content = await file.read()
-        pil_image = Image.open(BytesIO(content)).convert("RGB")
+        pil_image = await read_upload_image(file)
     except Exception:
         raise HTTPException(status_code=400, detail="Archivo de imagen corrupto o inválido.")
 
-    # 2. Generar embedding (CPU/GPU intensivo) -> Ejecutar en thread pool
+    # 2. Caché por hash de la imagen: resultados (misma versión del índice) o al menos el embedding
     loop = asyncio.get_event_loop()
-    try:
-        query_emb = await loop.run_in_executor(
-            thread_pool, 
-            extractor.image_to_embedding, 
-            pil_image
-        )
-    except Exception as e:
-        print(f"Error en inferencia: {e}")
-        raise HTTPException(status_code=500, detail="Error procesando la imagen con la IA.")
+    cache_key = None
+    params_key = (top_k, nprobe, ef_search,
+                  tuple(sorted(category)) if category else None, min_price, max_price)
+    if embedding_cache:
+        cache_key = await loop.run_in_executor(None, image_hash, pil_image)
+        results = embedding_cache.get_results(cache_key, search_engine.index_version, params_key)
+        if results is not None:
+            return {
+                "filename": file.filename,
+                "total_found": len(results),
+                "similar_products": results,
+                "cached": True
+            }
+        query_emb = embedding_cache.get_embedding(cache_key)
+    else:
+        query_emb = None
 
-    # 3. Buscar en FAISS
-    results = search_engine.search(query_emb, top_k=top_k)
+    # 3. Generar embedding (CPU/GPU intensivo) -> micro-batcher sobre el thread pool
+    if query_emb is None:
+        try:
+            query_emb = await embedding_batcher.submit(pil_image)
+        except Exception as e:
+            print(f"Error en inferencia: {e}")
+            raise HTTPException(status_code=500, detail="Error procesando la imagen con la IA.")
+        if embedding_cache:
+            embedding_cache.put_embedding(cache_key, query_emb)
+
+    # 4. Buscar en FAISS fuera del event loop, agrupada con las consultas concurrentes
+    #    (la versión se lee antes: si el índice cambia durante la búsqueda no se cachea)
+    index_version = search_engine.index_version
+    results = await search_batcher.submit((query_emb, top_k, nprobe, ef_search, filters))
+    if embedding_cache:
+        embedding_cache.put_results(cache_key, index_version, results, params_key)
 
     return {
         "filename": file.filename,
@@ -396,6 +1154,209 @@ async def visual_search(file: UploadFile = File(...), top_k: int = 5):
         "similar_products": results
     }
 
+@app.post("/api/visual/search-batch")
+async def visual_search_batch(
+    files: List[UploadFile] = File(...),
+    top_k: int = 5,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    category: Optional[List[str]] = Query(None, description="Categoría(s) (articleType) permitidas"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0)
+):
+    """
+    Búsqueda visual para varias imágenes a la vez (ingesta de catálogo, "shop the look").
+    Todas las imágenes válidas pasan por un único forward de ResNet50 y una única
+    búsqueda FAISS sobre la matriz (N, d) de consultas.
+    """
+    if not search_engine or not extractor:
+        raise HTTPException(
+            status_code=503, 
+            detail="El servicio de búsqueda visual no está disponible (modelos no cargados)."
+        )
+
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {MAX_BATCH_IMAGES} imágenes por petición."
+        )
+
+    # 1. Validar y decodificar cada imagen (las inválidas se reportan sin abortar el lote)
+    items = []
+    pil_images = []
+    for file in files:
+        item = {"filename": file.filename}
+        items.append(item)
+        if not file.content_type or not file.content_type.startswith("image/"):
+            item["error"] = "El archivo debe ser una imagen."
+            continue
+        try:
+            pil_images.append(await read_upload_image(file))
+            item["_batch_pos"] = len(pil_images) - 1
+        except Exception:
+            item["error"] = "Archivo de imagen corrupto o inválido."
+
+    # 2. Embeddings de todo el lote en un solo predict -> thread pool
+    #    (las imágenes ya vistas salen de la caché y no entran en el forward)
+    all_results = []
+    if pil_images:
+        loop = asyncio.get_event_loop()
+        query_embs = [None] * len(pil_images)
+        keys = [None] * len(pil_images)
+        if embedding_cache:
+            for pos, img in enumerate(pil_images):
+                keys[pos] = await loop.run_in_executor(None, image_hash, img)
+                query_embs[pos] = embedding_cache.get_embedding(keys[pos])
+        missing = [pos for pos, emb in enumerate(query_embs) if emb is None]
+
+        if missing:
+            try:
+                new_embs = await loop.run_in_executor(
+                    thread_pool,
+                    extractor.images_to_embeddings,
+                    [pil_images[pos] for pos in missing]
+                )
+            except Exception as e:
+                print(f"Error en inferencia batch: {e}")
+                raise HTTPException(status_code=500, detail="Error procesando las imágenes con la IA.")
+            for pos, emb in zip(missing, new_embs):
+                query_embs[pos] = emb
+                if embedding_cache:
+                    embedding_cache.put_embedding(keys[pos], emb)
+
+        # 3. Una sola búsqueda FAISS para las N consultas, en el pool de búsqueda
+        all_results = await loop.run_in_executor(search_pool, partial(
+            search_engine.search_batch,
+            query_embs, top_k=top_k, nprobe=nprobe, ef_search=ef_search,
+            filters=build_visual_filters(category, min_price, max_price)
+        ))
+
+    for item in items:
+        pos = item.pop("_batch_pos", None)
+        if pos is not None:
+            item["total_found"] = len(all_results[pos])
+            item["similar_products"] = all_results[pos]
+
+    return {
+        "total_images": len(items),
+        "results": items
+    }
+
+@app.get("/api/visual/cache/stats")
+async def visual_cache_stats():
+    """Aciertos/fallos de la caché de embeddings y de resultados top-k."""
+    if not embedding_cache:
+        raise HTTPException(status_code=503, detail="La caché de búsqueda visual está desactivada.")
+    return embedding_cache.stats()
+
+@app.get("/api/visual/batcher/stats")
+async def visual_batcher_stats():
+    """
+    Métricas del micro-batcher de embeddings: profundidad de cola,
+    histograma de tamaños de batch y tiempos de espera.
+    """
+    if not embedding_batcher:
+        raise HTTPException(status_code=503, detail="El servicio de búsqueda visual no está disponible.")
+    return embedding_batcher.stats()
+
+@app.get("/api/visual/search-batcher/stats")
+async def visual_search_batcher_stats():
+    """Métricas de la agrupación de búsquedas FAISS: consultas por index.search y tiempos de espera."""
+    if not search_batcher:
+        raise HTTPException(status_code=503, detail="El servicio de búsqueda visual no está disponible.")
+    return search_batcher.stats()
+
+@app.get("/api/visual/search-stages/stats")
+async def visual_search_stage_stats():
+    """Tiempo por etapa de la búsqueda: índice FAISS, re-ranking exacto y búsqueda exacta filtrada."""
+    if not search_engine:
+        raise HTTPException(status_code=503, detail="El servicio de búsqueda visual no está disponible.")
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, search_engine.stage_timings)
+
+# --- Administración del catálogo visual (altas, bajas y compactación sin reiniciar) ---
+
+def require_visual_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency: token de administración válido y motor visual cargado."""
+    if not VISUAL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Administración deshabilitada: configura VISUAL_ADMIN_TOKEN.")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode("utf-8"), VISUAL_ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Token de administración inválido.")
+    if not search_engine or not extractor:
+        raise HTTPException(status_code=503, detail="El servicio de búsqueda visual no está disponible.")
+    return search_engine
+
+def require_visual_writer(engine=Depends(require_visual_admin)):
+    """
+    Dependency de las rutas que modifican el catálogo: cada worker tiene su propio motor,
+    así que con varios un cambio solo llegaría a uno y una compactación pisaría los
+    ficheros compartidos con su vista del catálogo.
+    """
+    if SERVER_WORKERS > 1:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Altas, bajas y compactación requieren un solo worker (hay {SERVER_WORKERS}).")
+    return engine
+
+@app.post("/api/visual/admin/products")
+async def visual_admin_upsert_products(
+    files: List[UploadFile] = File(...),
+    products: str = Form(..., description="Lista JSON de productos, alineada con las imágenes"),
+    mode: str = Form("upsert", description="'add' (falla si el id existe) o 'upsert'"),
+    engine=Depends(require_visual_writer)
+):
+    """
+    Añade o reemplaza productos en el índice visual sin reconstruirlo.
+    Cada producto: {"id", "name", "image_url", "category", "price"}.
+    """
+    try:
+        product_list = json.loads(products)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="'products' debe ser JSON válido.")
+    if not isinstance(product_list, list) or len(product_list) != len(files):
+        raise HTTPException(status_code=400, detail="Se necesita un producto por imagen.")
+    if mode not in ("add", "upsert"):
+        raise HTTPException(status_code=400, detail="'mode' debe ser 'add' o 'upsert'.")
+
+    pil_images = []
+    for file in files:
+        try:
+            pil_images.append(await read_upload_image(file))
+        except Exception:
+            raise HTTPException(status_code=400, detail=f"Imagen inválida: {file.filename}")
+
+    loop = asyncio.get_event_loop()
+    embeddings = await loop.run_in_executor(thread_pool, extractor.images_to_embeddings, pil_images)
+
+    update = engine.add_products if mode == "add" else engine.upsert
+    try:
+        rows = await loop.run_in_executor(None, update, product_list, embeddings)
+    except ValueError as e:
+        raise HTTPException(status_code=409 if mode == "add" else 400, detail=str(e))
+
+    return {"success": True, "updated": len(rows), "catalog": engine.catalog_stats()}
+
+@app.delete("/api/visual/admin/products")
+async def visual_admin_remove_products(
+    request: RemoveProductsRequest,
+    engine=Depends(require_visual_writer)
+):
+    """Da de baja productos del índice visual (efectivo inmediatamente)."""
+    loop = asyncio.get_event_loop()
+    removed = await loop.run_in_executor(None, engine.remove_products, request.product_ids)
+    return {"success": True, "removed": removed, "catalog": engine.catalog_stats()}
+
+@app.post("/api/visual/admin/compact")
+async def visual_admin_compact(engine=Depends(require_visual_writer)):
+    """Lanza en segundo plano la compactación del delta log en los ficheros base."""
+    started = engine.compact_async()
+    return {"success": True, "started": started, "catalog": engine.catalog_stats()}
+
+@app.get("/api/visual/admin/status")
+async def visual_admin_status(engine=Depends(require_visual_admin)):
+    """Estado del catálogo visual: productos base, altas, bajas y delta pendiente."""
+    return engine.catalog_stats()
+
 # ============================================
 # MÓDULO 4: IA GENERATIVA (INTEGRADO)
 # ============================================
@@ -441,6 +1402,7 @@ async def generar_descripcion(
     - Metadatos del proceso
     """
     try:
+        started = time.perf_counter()
         resultado = model.generar_descripcion_producto(
             nombre_producto=request.nombre_producto,
             caracteristicas=request.caracteristicas,
@@ -449,6 +1411,7 @@ async def generar_descripcion(
             max_tokens=request.max_tokens,
             temperatura=request.temperatura
         )
+        observe_generation(model, resultado, started)
         
         return {
             "success": True,
@@ -476,11 +1439,13 @@ async def chatbot_respuesta(
     - Metadatos del proceso
     """
     try:
+        started = time.perf_counter()
         resultado = model.generar_respuesta_chatbot(
             pregunta_usuario=request.pregunta,
             contexto=request.contexto,
             max_tokens=request.max_tokens
         )
+        observe_generation(model, resultado, started)
         
         return {
             "success": True,
@@ -507,10 +1472,12 @@ async def generar_titulo_seo(
     - Título SEO (máximo 60 caracteres)
     """
     try:
+        started = time.perf_counter()
         resultado = model.generar_titulo_producto(
             nombre_base=request.nombre_base,
             caracteristicas=request.caracteristicas
         )
+        observe_generation(model, resultado, started)
         
         return {
             "success": True,
@@ -539,12 +1506,14 @@ async def generar_batch(
         resultados = []
         
         for producto in request.productos:
+            started = time.perf_counter()
             resultado = model.generar_descripcion_producto(
                 nombre_producto=producto.get("nombre_producto", "Producto"),
                 caracteristicas=producto.get("caracteristicas"),
                 categoria=producto.get("categoria"),
                 precio=producto.get("precio")
             )
+            observe_generation(model, resultado, started)
             resultados.append(resultado)
         
         return {
@@ -627,13 +1596,14 @@ if __name__ == "__main__":
     print("\n" + "="*70)
     print("🚀 COMPRIASSIST - SERVIDOR BACKEND")
     print("="*70)
-    print(f"\n✅ Módulos cargados:")
-    print(f"   • Chatbot: ✅")
+    print(f"\n⏳ Módulos (se cargan en segundo plano al arrancar; estado en /health):")
+    print(f"   • Chatbot")
     print(f"   • IA Generativa: {'✅' if GENERATIVE_AVAILABLE else '⚠️ No disponible'}")
-    print(f"   • Análisis de Sentimientos: ✅")
-    print(f"   • Búsqueda Visual: {'✅' if search_engine else '⚠️ No disponible (faltan datos)'}")
+    print(f"   • Análisis de Sentimientos")
+    print(f"   • Búsqueda Visual: {'✅' if VISUAL_SEARCH_AVAILABLE else '⚠️ No disponible'}")
     print(f"\n📖 Documentación: http://localhost:8000/docs")
     print(f"🔗 API Root: http://localhost:8000/")
+    print(f"🏭 Producción (varios workers, datos precargados): python launcher.py --workers N")
     print("="*70 + "\n")
 
     data_dir = os.path.join(os.path.dirname(__file__), "data")
@@ -0,0 +1,144 @@
+"""
+ComprIAssist - Orquestador de arranque
+
+Carga los subsistemas independientes (chatbot, sentimiento, visión, generativo)
+en hilos de fondo, ejecuta una inferencia de calentamiento para cada uno y
+expone su estado: pending -> loading -> warming -> ready | failed.
+Así el servidor acepta tráfico desde el primer momento y los módulos rápidos
+responden mientras los pesados (transformers, ResNet50, FAISS) siguen cargando.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class ModuleState:
+    """Estado de carga de un módulo y sus tiempos"""
+
+    def __init__(self, name):
+        self.name = name
+        self.status = PENDING
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.ready_at = None
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "ready_at": self.ready_at,
+            "error": self.error,
+        }
+
+
+class StartupOrchestrator:
+    """
+    Registro de módulos con su función de carga y de calentamiento.
+
+    `load_fn()` construye el módulo (puede asignar globales) y devuelve un objeto
+    que se pasa a `warmup_fn(obj)`. Si la carga o el calentamiento lanzan una
+    excepción el módulo queda en `failed` y el resto sigue cargando.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._modules = {}
+        self._states = {}
+        self._lock = threading.Lock()
+        self._done = {}
+        self._executor = None
+        self.started_at = None
+
+    def register(self, name, load_fn, warmup_fn=None):
+        self._modules[name] = (load_fn, warmup_fn)
+        self._states[name] = ModuleState(name)
+        self._done[name] = threading.Event()
+
+    def preload(self, names):
+        """
+        Carga ya, en el hilo actual, los módulos indicados (o los vuelve a cargar).
+        start() no repite los que ya terminaron: así un proceso padre puede cargar
+        lo compartible antes de hacer fork de los workers (launcher.py).
+        """
+        for name in names:
+            if name in self._modules:
+                self._done[name].clear()
+                self._load(name)
+
+    def start(self):
+        """Lanza la carga de los módulos pendientes en segundo plano (no bloquea)"""
+        if self._executor is not None:
+            return
+        self.started_at = time.time()
+        pending = [name for name in self._modules if not self._done[name].is_set()]
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers or max(1, len(pending)),
+            thread_name_prefix="startup"
+        )
+        for name in pending:
+            self._executor.submit(self._load, name)
+        # Los hilos terminan al acabar la carga; no hace falta esperar al executor
+        self._executor.shutdown(wait=False)
+
+    def _set(self, name, **fields):
+        with self._lock:
+            state = self._states[name]
+            for key, value in fields.items():
+                setattr(state, key, value)
+
+    def _load(self, name):
+        load_fn, warmup_fn = self._modules[name]
+        try:
+            self._set(name, status=LOADING)
+            start = time.perf_counter()
+            obj = load_fn()
+            self._set(name, load_seconds=time.perf_counter() - start)
+
+            if warmup_fn is not None:
+                self._set(name, status=WARMING)
+                start = time.perf_counter()
+                warmup_fn(obj)
+                self._set(name, warmup_seconds=time.perf_counter() - start)
+
+            self._set(name, status=READY, ready_at=time.time())
+            state = self._states[name]
+            print(f"✅ [{name}] listo (carga {state.load_seconds:.2f}s"
+                  f"{f', calentamiento {state.warmup_seconds:.2f}s' if state.warmup_seconds is not None else ''})")
+        except Exception as e:
+            self._set(name, status=FAILED, error=f"{type(e).__name__}: {e}")
+            print(f"❌ [{name}] falló al cargar: {e}")
+        finally:
+            self._done[name].set()
+
+    def status(self, name):
+        state = self._states.get(name)
+        return state.status if state else None
+
+    def is_ready(self, name):
+        return self.status(name) == READY
+
+    def all_settled(self):
+        """True cuando ningún módulo sigue cargando (todos ready o failed)"""
+        return all(event.is_set() for event in self._done.values())
+
+    def wait(self, names=None, timeout=None):
+        """Espera a que terminen (ready o failed) los módulos indicados; útil en scripts y pruebas"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names or list(self._done):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self._done[name].wait(remaining):
+                return False
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return {name: state.to_dict() for name, state in self._states.items()}
@@ -0,0 +1,500 @@
+"""
+Pruebas del módulo de Sentimiento y del detector de reseñas falsas
+No necesitan pysentimiento: el analizador se sustituye por uno determinista
+"""
+
+import sys
+import os
+import re
+import json
+import asyncio
+import tempfile
+import threading
+from types import SimpleNamespace
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.sentiment import SentimentModel, FraudDetector, ResultCache, normalize_text
+from models.sentiment.fraud_detector import PhraseMatcher, load_rules
+from models.sentiment import bulk
+from models.sentiment.fake_review_model import FakeReviewModel, evaluate
+from inference_pool import InferencePool, PoolSaturated
+
+
+class AnalizadorFalso:
+    """Imita create_analyzer(): predict(str) -> salida, predict([str]) -> [salidas]"""
+
+    def __init__(self):
+        self.lotes = []
+        self.batch_sizes = []
+
+    def _uno(self, text):
+        pos = 0.9 if "bueno" in text else 0.1
+        probas = {"POS": pos, "NEU": 0.05, "NEG": 0.95 - pos}
+        return SimpleNamespace(output=max(probas, key=probas.get), probas=probas)
+
+    def predict(self, inputs, batch_size=None):
+        if isinstance(inputs, str):
+            return self._uno(inputs)
+        self.lotes.append([len(t) for t in inputs])
+        self.batch_sizes.append(batch_size)
+        return [self._uno(t) for t in inputs]
+
+
+def crear_modelo(batch_size=2):
+    modelo = SentimentModel(batch_size=batch_size)
+    modelo.model = AnalizadorFalso()
+    return modelo
+
+
+def test_analyze_batch_agrupa_por_longitud_y_conserva_el_orden():
+    modelo = crear_modelo(batch_size=2)
+    textos = ["bueno " * 20, "malo", "muy bueno", "malo " * 10, "ok"]
+
+    resultados = modelo.analyze_batch(textos)
+
+    assert resultados == [modelo.analyze(t) for t in textos]
+    # Lotes de 2 con textos de longitud parecida: cada lote solo rellena hasta su más largo
+    assert modelo.model.lotes == [[2, 4], [9, 50], [120]]
+    assert modelo.model.batch_sizes == [2, 2, 2]
+
+    sin_agrupar = crear_modelo(batch_size=2)
+    assert sin_agrupar.analyze_batch(textos, bucket_by_length=False) == resultados
+    assert sin_agrupar.model.lotes == [[120, 4], [9, 50], [2]]
+
+
+def test_analyze_batch_en_modo_respaldo():
+    modelo = SentimentModel()
+    modelo.model = None
+    resultados = modelo.analyze_batch(["uno", "dos"])
+    assert len(resultados) == 2 and all(r["sentiment"] == "neutral" for r in resultados)
+    # Cada resultado es un dict independiente
+    resultados[0]["probabilities"]["positive"] = 1.0
+    assert resultados[1]["probabilities"]["positive"] == 0.33
+    assert modelo.analyze_batch([]) == []
+
+
+def test_endpoint_analyze_batch():
+    from fastapi.testclient import TestClient
+    import server
+
+    with TestClient(server.app) as client:
+        assert server.startup.wait(["sentiment"], timeout=10)
+        textos = ["Producto gratis, compra ya", "Llegó roto"]
+        r = client.post("/api/sentiment/analyze-batch", json={"texts": textos})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["total"] == 2 and [x["text"] for x in data["results"]] == textos
+        assert data["results"][0]["is_fake"] and not data["results"][1]["is_fake"]
+        individual = client.post("/api/sentiment/analyze", json={"text": textos[0]}).json()
+        assert data["results"][0] == individual
+
+        assert client.post("/api/sentiment/analyze-batch", json={"texts": []}).status_code == 422
+        con_ids = client.post("/api/sentiment/analyze-batch", json={"texts": textos, "review_ids": ["a", None]})
+        assert con_ids.status_code == 200 and con_ids.json()["results"] == data["results"]
+        assert client.post("/api/sentiment/analyze-batch",
+                           json={"texts": textos, "review_ids": ["a"]}).status_code == 400
+
+
+def test_result_cache_normaliza_lru_ttl_y_version():
+    assert normalize_text("  Muy\tBUENO\n producto ") == "muy bueno producto"
+    # "é" compuesta (NFC) y "e" + acento combinante (NFD) son la misma clave
+    cache = ResultCache("v1", max_entries=2, ttl=60)
+    assert cache.key("Café") == cache.key("Cafe\u0301") == cache.key("  CAFÉ ")
+    assert ResultCache("v2").key("café") != cache.key("café")
+
+    eventos = []
+    cache.observer = eventos.append
+    cache.put(cache.key("a"), {"x": 1})
+    cache.put(cache.key("b"), {"x": 2})
+    assert cache.get(cache.key("a")) == {"x": 1}
+    cache.put(cache.key("c"), {"x": 3})  # desaloja "b", la menos usada
+    assert cache.get(cache.key("b")) is None
+    # Cada get devuelve una copia
+    cache.get(cache.key("a"))["x"] = 99
+    assert cache.get(cache.key("a")) == {"x": 1}
+
+    caducada = ResultCache("v1", ttl=-1)
+    caducada.put(caducada.key("a"), {"x": 1})
+    assert caducada.get(caducada.key("a")) is None and caducada.stats()["expired"] == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 1 and stats["evictions"] == 1
+    assert eventos == ["hit", "miss", "hit", "hit"]
+
+
+def test_result_cache_en_disco_compartida_entre_instancias():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite")
+        una = ResultCache("v1", disk_path=path, name="sentiment")
+        una.put(una.key("Llegó roto"), {"sentiment": "NEG"})
+
+        otra = ResultCache("v1", disk_path=path, name="sentiment")
+        assert otra.get(otra.key("llegó  ROTO")) == {"sentiment": "NEG"}
+        assert otra.stats()["disk_hits"] == 1
+        # Otra caché (u otra versión del modelo) no ve esas entradas
+        assert ResultCache("v1", disk_path=path, name="fraud").get(una.key("Llegó roto")) is None
+        nueva_version = ResultCache("v2", disk_path=path, name="sentiment")
+        assert nueva_version.get(nueva_version.key("Llegó roto")) is None
+
+
+def test_modelos_usan_la_cache_y_solo_predicen_textos_nuevos():
+    modelo = crear_modelo(batch_size=8)
+    modelo.cache = ResultCache("prueba")
+    esperado = modelo.analyze_batch(["bueno", "malo"])
+
+    modelo.model.lotes.clear()
+    resultados = modelo.analyze_batch(["BUENO ", "muy bueno", "malo", "Muy  bueno"])
+    # Solo "muy bueno" pasa por el modelo (una vez); el resto sale de la caché
+    assert modelo.model.lotes == [[9]]
+    assert resultados[0] == esperado[0] and resultados[2] == esperado[1]
+    assert resultados[1] == resultados[3] and resultados[1] is not resultados[3]
+    assert modelo.analyze("muy BUENO") == resultados[1] and modelo.model.lotes == [[9]]
+
+    detector = FraudDetector()
+    detector.cache = ResultCache(detector.version, name="fraud")
+    assert detector.analyze("Producto GRATIS") == detector.analyze("producto gratis") == {
+        "is_fake": True, "fake_probability": 0.35
+    }
+    assert detector.cache.stats()["hits"] == 1
+    assert detector.analyze("gratis \ud800") == detector.analyze("GRATIS \ud800")
+
+
+def test_fraud_detector_cacheado_da_el_mismo_veredicto_para_variantes():
+    # Espacios y mayúsculas distintos comparten clave: el primero que llegue no decide el resultado
+    variantes = ["compra  ya", "COMPRA ya", "compra\nya", "compra ya"]
+    esperado = FraudDetector().analyze("compra ya")
+    assert esperado["is_fake"] is True
+    for primero in variantes:
+        detector = FraudDetector()
+        detector.cache = ResultCache(detector.version, name="fraud")
+        detector.analyze(primero)
+        assert [detector.analyze(v) for v in variantes] == [esperado] * len(variantes)
+        assert [FraudDetector().analyze(v) for v in variantes] == [esperado] * len(variantes)
+
+
+def test_fraud_detector_compilado_equivale_a_las_regex_originales():
+    originales = [
+        r"(gratis|regalo|oferta especial)",
+        r"(5 estrellas|increíble|perfecto|maravilloso){2,}",
+        r"(compra ya|últimas unidades)"
+    ]
+    detector = FraudDetector()
+    textos = [
+        "Producto GRATIS, compra ya", "perfectoperfecto", "Perfecto, increíble", "Llegó roto",
+        "Regalo con OFERTA ESPECIAL y últimas unidades 5 estrellas5 estrellas", "",
+    ]
+    for texto in textos:
+        score = sum(1 for p in originales if re.search(p, texto.lower()))
+        assert detector.analyze(texto) == {"is_fake": score > 0, "fake_probability": min(0.1 + score * 0.25, 0.98)}
+
+
+def test_phrase_matcher_frases_solapadas_y_fichero_externo():
+    matcher = PhraseMatcher({"a": ["oferta"], "b": ["oferta especial"], "c": ["especial hoy"], "d": ["hoy"]})
+    # Todas empiezan o terminan dentro de otra coincidencia y ninguna se pierde
+    assert matcher.match("oferta especial hoy") == {"a", "b", "c", "d"}
+    assert matcher.match("ofert") == set()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "patrones.txt")
+        frases = [f"spam numero {i}" for i in range(5000)]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# lista externa\n" + "\n".join(frases) + "\n\n[links]\nre:https?://\\S+\n")
+        assert load_rules(path) == {"spam": frases, "links": [r"re:https?://\S+"]}
+
+        detector = FraudDetector(patterns_path=path)
+        assert len(detector.matcher) == 5000 + 5 and len(detector.regexes) == 2
+        assert detector.matched_rules("Es SPAM NUMERO 4321 gratis en http://x.co") == {"spam", "promocion", "links"}
+        assert detector.analyze("Llegó bien")["is_fake"] is False
+        assert detector.version != FraudDetector().version
+
+
+def test_bulk_puntua_en_streaming_y_reanuda_desde_el_checkpoint():
+    with tempfile.TemporaryDirectory() as tmp:
+        entrada = os.path.join(tmp, "reseñas.jsonl")
+        with open(entrada, "w", encoding="utf-8") as f:
+            for i in range(10):
+                f.write(json.dumps({"id": f"r{i}", "text": "muy bueno, gratis" if i % 2 else "malo"}) + "\n")
+            f.write("\nesto no es json\n" + json.dumps({"id": "sin texto"}) + "\n")
+
+        salida = os.path.join(tmp, "completa.jsonl")
+        resumen = bulk.run(entrada, salida, batch_size=4, checkpoint_every=4,
+                           sentiment_model=crear_modelo(), fraud_detector=FraudDetector())
+        assert resumen["rows"] == 12 and resumen["errors"] == 2
+        with open(salida, encoding="utf-8") as f:
+            completa = [json.loads(line) for line in f]
+        assert [r["row"] for r in completa] == list(range(12))
+        assert completa[1]["id"] == "r1" and completa[1]["sentiment"] == "POS" and completa[1]["is_fake"]
+        assert "error" in completa[10] and "error" in completa[11]
+
+        # Corte tras el checkpoint de la fila 4: lo escrito después (incompleto) se descarta
+        parcial = os.path.join(tmp, "parcial.jsonl")
+        lineas = [json.dumps(r, ensure_ascii=False) + "\n" for r in completa[:4]]
+        with open(parcial, "w", encoding="utf-8") as f:
+            f.write("".join(lineas) + '{"row": 4, "sent')
+        with open(bulk.checkpoint_path(parcial), "w", encoding="utf-8") as f:
+            json.dump({"input": os.path.abspath(entrada), "rows": 4,
+                       "output_bytes": len("".join(lineas).encode("utf-8")), "completed": False}, f)
+        modelo = crear_modelo()
+        resumen = bulk.run(entrada, parcial, batch_size=4, resume=True,
+                           sentiment_model=modelo, fraud_detector=FraudDetector())
+        assert resumen["resumed_from"] == 4 and resumen["rows"] == 8
+        assert sum(len(lote) for lote in modelo.model.lotes) == 6  # solo las filas válidas pendientes
+        with open(parcial, encoding="utf-8") as f:
+            assert [json.loads(line) for line in f] == completa
+        assert bulk.run(entrada, parcial, resume=True)["rows"] == 0
+
+
+def test_bulk_se_importa_sin_el_modulo_resource():
+    # Windows no tiene `resource`: server.py importa bulk y no debe fallar al arrancar
+    import subprocess
+    codigo = ("import sys; sys.modules['resource'] = None; "
+              "from models.sentiment import bulk; "
+              "from models.visual_search import benchmark_decode; "
+              "print(bulk.peak_memory_mb())")
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    assert salida.strip().endswith("(None, None)")
+
+
+def test_endpoint_analyze_stream_jsonl_y_csv():
+    from fastapi.testclient import TestClient
+    import server
+
+    with TestClient(server.app) as client:
+        assert server.startup.wait(["sentiment"], timeout=10)
+        cuerpo = "".join(json.dumps({"id": i, "text": "Compra ya" if i % 2 else "Llegó bien"}) + "\n"
+                         for i in range(600))
+        r = client.post("/api/sentiment/analyze-stream", content=cuerpo.encode("utf-8"))
+        assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+        filas = [json.loads(line) for line in r.text.splitlines()]
+        assert [f["id"] for f in filas] == list(range(600))
+        assert filas[1]["is_fake"] and not filas[0]["is_fake"]
+        individual = client.post("/api/sentiment/analyze", json={"text": "Compra ya"}).json()
+        assert filas[1]["fake_probability"] == individual["fake_probability"]
+
+        # CSV con un campo de varias líneas entre comillas
+        csv_cuerpo = 'sku,review\nA1,"Llegó bien\npero tarde, gratis"\nA2,\n'
+        r = client.post("/api/sentiment/analyze-stream?text_field=review&id_field=sku",
+                        content=csv_cuerpo.encode("utf-8"), headers={"content-type": "text/csv"})
+        filas = [json.loads(line) for line in r.text.splitlines()]
+        assert filas[0]["id"] == "A1" and filas[0]["is_fake"] and "error" in filas[1]
+
+        assert client.post("/api/sentiment/analyze-stream?format=xml", content=b"").status_code == 400
+        # Los lotes pasan por el pool de sentimiento y cada stream devuelve su hueco
+        assert server.sentiment_pool.stats()["completed"] >= 3
+        assert server.stream_slots._value == server.SENTIMENT_MAX_STREAMS
+
+    # La tarea de cierre corre aunque el envío falle antes de empezar a generar
+    cerrado = []
+
+    async def cerrar():
+        cerrado.append(True)
+
+    async def send_roto(message):
+        raise OSError("cliente desconectado")
+
+    def nunca_empieza():
+        raise AssertionError("no debería empezar")
+        yield
+
+    respuesta = server.DuplexStreamingResponse(nunca_empieza(), background=server.BackgroundTask(cerrar))
+    try:
+        asyncio.run(respuesta({"type": "http"}, None, send_roto))
+    except OSError:
+        pass
+    assert cerrado == [True]
+
+    # Si el consumidor se va, el productor no se queda bloqueado en una cola llena
+    llena = __import__("queue").Queue(maxsize=1)
+    llena.put("x")
+    parar = threading.Event()
+    threading.Timer(0.2, parar.set).start()
+    assert server.put_until_stopped(llena, "y", parar, poll=0.05) is False
+
+
+def test_inference_pool_admision_y_timeout():
+    liberar = threading.Event()
+    pool = InferencePool("prueba", workers=1, max_queue=1, timeout=0.2)
+
+    async def escenario():
+        ocupado = pool.submit(liberar.wait)
+        # Hay sitio para una tarea en cola; no termina en 0.2s porque el hilo está ocupado
+        try:
+            await pool.run(lambda: "nunca")
+            raise AssertionError("se esperaba TimeoutError")
+        except asyncio.TimeoutError:
+            pass
+        pool.submit(lambda: None)
+        try:
+            pool.submit(lambda: None)
+            raise AssertionError("se esperaba PoolSaturated")
+        except PoolSaturated:
+            pass
+        # Con `wait`, submit espera a que se libere un hueco en lugar de rechazar
+        threading.Timer(0.1, liberar.set).start()
+        esperada = pool.submit(lambda: "dentro", wait=5)
+        await asyncio.wrap_future(ocupado)
+        assert await asyncio.wrap_future(esperada) == "dentro"
+        return await pool.run(lambda x: x * 2, 21)
+
+    assert asyncio.run(escenario()) == 42
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["timeouts"] == 1 and stats["pending"] == 0
+    pool.shutdown()
+
+
+def test_sentimiento_saturado_responde_429_y_no_bloquea_al_chatbot():
+    from fastapi.testclient import TestClient
+    import server
+
+    original = server.sentiment_pool
+    server.sentiment_pool = InferencePool("sentiment", workers=1, max_queue=0)
+    liberar = threading.Event()
+    try:
+        with TestClient(server.app) as client:
+            assert server.startup.wait(["sentiment", "chatbot"], timeout=10)
+            ocupado = server.sentiment_pool.submit(liberar.wait)
+
+            r = client.post("/api/sentiment/analyze", json={"text": "Llegó roto"})
+            assert r.status_code == 429 and r.headers["Retry-After"] == "1"
+            assert client.post("/api/sentiment/analyze-batch", json={"texts": ["a"]}).status_code == 429
+            r = client.post("/api/sentiment/analyze-stream", content=b'{"text": "a"}\n')
+            assert r.status_code == 429 and server.stream_slots._value == server.SENTIMENT_MAX_STREAMS
+            # El event loop sigue libre: el chatbot y health responden con el pool ocupado
+            assert client.post("/api/chatbot/message", json={"message": "hola"}).status_code == 200
+            pool = client.get("/health/details").json()["sentiment_pool"]
+            assert pool["pending"] == 1 and pool["rejected"] == 2
+
+            liberar.set()
+            ocupado.result(timeout=5)
+            assert client.post("/api/sentiment/analyze", json={"text": "Llegó roto"}).status_code == 200
+    finally:
+        liberar.set()
+        server.sentiment_pool.shutdown()
+        server.sentiment_pool = original
+
+
+def reseñas_etiquetadas(n=200):
+    reales = ["El pedido llegó el martes, la talla {} es algo justa pero la tela es buena",
+              "Tardó {} días en llegar y la caja venía algo golpeada, el producto bien",
+              "Lo devolví porque el color no era el de la foto, me abonaron en {} días"]
+    falsas = ["INCREÍBLE!!! {} ESTRELLAS compra ya!!!",
+              "Perfecto perfecto perfecto, el mejor producto del mundo {}!!!",
+              "Oferta especial gratis, regalo asegurado {} compra ya"]
+    textos, etiquetas = [], []
+    for i in range(n):
+        falsa = i % 2 == 1
+        plantillas = falsas if falsa else reales
+        textos.append(plantillas[i % 3].format(i))
+        etiquetas.append(falsa)
+    return textos, etiquetas
+
+
+def test_fake_review_model_entrena_guarda_y_carga():
+    textos, etiquetas = reseñas_etiquetadas()
+    modelo = FakeReviewModel().fit(textos, etiquetas, epochs=100)
+    metricas = evaluate(modelo.predict_proba(textos), etiquetas)
+    assert metricas["accuracy"] >= 0.95 and metricas["roc_auc"] >= 0.95
+
+    resultado = modelo.analyze("Oferta especial GRATIS!!! compra ya!!!")
+    assert set(resultado) == {"is_fake", "fake_probability"}
+    assert resultado["is_fake"] is True
+    assert modelo.analyze("La chaqueta abriga bien, la manga es un poco larga")["is_fake"] is False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "modelo.npz")
+        modelo.save(ruta)
+        cargado = FakeReviewModel.load(ruta)
+    assert cargado.version == modelo.version
+    prueba = ["Tardó 3 días en llegar, todo correcto", "GRATIS GRATIS regalo!!!"]
+    modelo.lsh.clear()
+    assert [r["fake_probability"] for r in cargado.analyze_batch(prueba)] == \
+        [r["fake_probability"] for r in modelo.analyze_batch(prueba)]
+
+    # La versión depende también de las reglas del detector
+    otras_reglas = FraudDetector(rules={"spam": ["gratis"]})
+    modelo.detector = otras_reglas
+    assert modelo._weights_version() != cargado.version
+
+
+def test_minhash_lsh_detecta_casi_duplicados():
+    modelo = FakeReviewModel()
+    original = "Me encantó la camiseta, el algodón es suave y el envío fue rapidísimo, lo recomiendo"
+    editada = "Me encantó la camiseta, el algodón es suave y el envio fue rapidísimo, lo recomiendo!"
+    distinta = "Las zapatillas rozan en el talón y la suela se despegó a las dos semanas de uso"
+
+    _, densas = modelo.features([original, editada, distinta])
+    duplicado = densas[:, -1]
+    assert duplicado[0] == 0.0
+    assert duplicado[1] > 0.7
+    assert duplicado[2] < 0.2
+
+    # Sin recordar, el índice no cambia; clear() lo vacía
+    _, densas = modelo.features([original], remember=False)
+    assert densas[0, -1] == 0.0
+    modelo.lsh.clear()
+    _, densas = modelo.features([editada])
+    assert densas[0, -1] == 0.0
+
+
+def test_fake_review_model_idempotente_y_robusto():
+    textos, etiquetas = reseñas_etiquetadas()
+    modelo = FakeReviewModel().fit(textos, etiquetas, epochs=100)
+
+    # Volver a analizar la misma reseña (mismo id) no la convierte en casi duplicado de sí
+    # misma, aunque después lleguen copias suyas
+    texto = "Me encantó la camiseta, el algodón es suave y el envío fue rapidísimo, lo recomiendo"
+    primera = modelo.analyze(texto, review_id="r1")
+    assert [modelo.analyze(texto, review_id="r1") for _ in range(3)] == [primera] * 3
+    _, densas = modelo.features([texto, texto], review_ids=["r1", None])
+    assert list(densas[:, -1]) == [0.0, 1.0]
+    assert modelo.analyze(texto, review_id="r1") == primera
+
+    # Copias exactas sin id (también en el mismo lote) sí cuentan como duplicados
+    copia = "Producto excelente, llegó rápido y la calidad es muy buena, cinco estrellas sin duda"
+    _, densas = modelo.features([copia] * 3, remember=False)
+    assert list(densas[:, -1]) == [0.0, 0.0, 0.0]
+    # (peso positivo fijo en la característica de duplicado: en estos datos sintéticos
+    # reales y falsas son plantillas, así que el peso aprendido no tiene signo fijo)
+    solo_duplicados = FakeReviewModel()
+    solo_duplicados.dense_weights[-1] = 3.0
+    solo_duplicados.trained = True
+    probabilidades = [r["fake_probability"] for r in solo_duplicados.analyze_batch([copia] * 3)]
+    assert probabilidades[0] == 0.5 and probabilidades[1] > 0.9 and probabilidades[2] == probabilidades[1]
+    assert solo_duplicados.analyze(copia)["fake_probability"] == probabilidades[1]
+
+    # Surrogates sueltos (válidos en JSON) no tumban el lote
+    resultados = modelo.analyze_batch(["\ud800", "GRATIS\udfff compra ya!!!", texto], [None, None, "r1"])
+    assert len(resultados) == 3 and resultados[2] == primera
+
+    # Sin pesos entrenados manda el detector de reglas, no p = 0.5 para todo
+    sin_entrenar = FakeReviewModel()
+    assert sin_entrenar.analyze("La tela es buena") == FraudDetector().analyze("La tela es buena")
+    assert sin_entrenar.analyze("compra ya")["is_fake"] is True
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "vacio.npz")
+        sin_entrenar.save(ruta)
+        assert FakeReviewModel.load(ruta).trained is False
+
+
+if __name__ == "__main__":
+    test_analyze_batch_agrupa_por_longitud_y_conserva_el_orden()
+    test_analyze_batch_en_modo_respaldo()
+    test_endpoint_analyze_batch()
+    test_result_cache_normaliza_lru_ttl_y_version()
+    test_result_cache_en_disco_compartida_entre_instancias()
+    test_modelos_usan_la_cache_y_solo_predicen_textos_nuevos()
+    test_fraud_detector_cacheado_da_el_mismo_veredicto_para_variantes()
+    test_fraud_detector_compilado_equivale_a_las_regex_originales()
+    test_phrase_matcher_frases_solapadas_y_fichero_externo()
+    test_bulk_puntua_en_streaming_y_reanuda_desde_el_checkpoint()
+    test_bulk_se_importa_sin_el_modulo_resource()
+    test_endpoint_analyze_stream_jsonl_y_csv()
+    test_inference_pool_admision_y_timeout()
+    test_sentimiento_saturado_responde_429_y_no_bloquea_al_chatbot()
+    test_fake_review_model_entrena_guarda_y_carga()
+    test_minhash_lsh_detecta_casi_duplicados()
+    test_fake_review_model_idempotente_y_robusto()
+    print("✅ Pruebas de sentimiento completadas")
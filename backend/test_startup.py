@@ -0,0 +1,200 @@
+"""
+Pruebas del orquestador de arranque y de los endpoints de salud del servidor
+"""
+
+import sys
+import os
+import re
+import time
+import queue
+import signal
+import socket
+import threading
+import subprocess
+import urllib.request
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from startup import StartupOrchestrator, READY, FAILED, LOADING, WARMING
+from monitoring import ModuleStats
+
+
+def test_orquestador_carga_en_paralelo_y_reporta_estados():
+    liberar = threading.Event()
+    calentado = []
+
+    def carga_lenta():
+        liberar.wait(5)
+        return "lento"
+
+    def carga_rota():
+        raise RuntimeError("sin datos")
+
+    orq = StartupOrchestrator()
+    orq.register("rapido", lambda: "rapido", calentado.append)
+    orq.register("lento", carga_lenta, calentado.append)
+    orq.register("roto", carga_rota)
+    orq.start()
+
+    # El módulo rápido está listo aunque el lento siga cargando
+    assert orq.wait(["rapido", "roto"], timeout=5)
+    assert orq.is_ready("rapido")
+    assert orq.status("lento") in (LOADING, WARMING)
+    assert not orq.all_settled()
+
+    liberar.set()
+    assert orq.wait(timeout=5)
+    snap = orq.snapshot()
+    assert snap["lento"]["status"] == READY and snap["lento"]["load_seconds"] is not None
+    assert snap["rapido"]["warmup_seconds"] is not None
+    assert snap["roto"]["status"] == FAILED and "sin datos" in snap["roto"]["error"]
+    assert sorted(calentado) == ["lento", "rapido"]
+
+
+def test_servidor_responde_503_mientras_el_modulo_carga():
+    from fastapi.testclient import TestClient
+    import server
+
+    liberar = threading.Event()
+    original = server.startup
+    orq = StartupOrchestrator()
+    orq.register("chatbot", lambda: liberar.wait(5) and server.load_chatbot())
+    orq.register("sentiment", server.load_sentiment, server.warmup_sentiment)
+    server.startup = orq
+    try:
+        with TestClient(server.app) as client:
+            assert orq.wait(["sentiment"], timeout=5)
+            r = client.post("/api/chatbot/message", json={"message": "hola"})
+            assert r.status_code == 503 and r.json()["status"] in (LOADING, WARMING)
+            assert client.post("/api/sentiment/analyze", json={"text": "Muy buena calidad"}).status_code == 200
+            assert client.get("/health").json()["status"] == "starting"
+
+            liberar.set()
+            assert orq.wait(timeout=5)
+            assert client.post("/api/chatbot/message", json={"message": "hola"}).status_code == 200
+            assert client.get("/health").json()["startup"]["chatbot"]["status"] == READY
+    finally:
+        server.startup = original
+
+
+def test_module_stats_percentiles_y_errores():
+    stats = ModuleStats("sentiment", window=3)
+    for _ in range(5):
+        stats.finish(stats.start())
+    started = stats.start()
+    assert stats.in_flight == 1
+    stats.finish(started, error="HTTP 500")
+
+    snap = stats.stats()
+    assert snap["in_flight"] == 0 and snap["total_requests"] == 6 and snap["errors"] == 1
+    assert snap["window"] == 3 and snap["last_error"] == "HTTP 500" and snap["last_error_at"] is not None
+    assert 0 <= snap["latency"]["p50_ms"] <= snap["latency"]["p99_ms"] <= snap["latency"]["max_ms"]
+
+
+def test_health_live_ready_y_details():
+    from fastapi.testclient import TestClient
+    import server
+
+    liberar = threading.Event()
+    original = server.startup
+    orq = StartupOrchestrator()
+    orq.register("chatbot", server.load_chatbot)
+    orq.register("sentiment", lambda: liberar.wait(5) and server.load_sentiment())
+    server.startup = orq
+    try:
+        with TestClient(server.app) as client:
+            assert client.get("/health/live").status_code == 200
+            r = client.get("/health/ready")
+            assert r.status_code == 503 and r.json()["status"] == "starting"
+
+            liberar.set()
+            assert orq.wait(timeout=5)
+            assert client.get("/health/ready").status_code == 200
+            client.post("/api/sentiment/analyze", json={"text": "Excelente, lo recomiendo"})
+            details = client.get("/health/details").json()
+            sentiment = details["modules"]["sentiment"]
+            assert sentiment["startup"]["status"] == READY
+            assert sentiment["requests"]["total_requests"] >= 1 and sentiment["requests"]["in_flight"] == 0
+            assert "inference_pool" in details["queues"]
+    finally:
+        server.startup = original
+
+
+def test_metrics_expone_etapas_por_modulo():
+    from fastapi.testclient import TestClient
+    import metrics
+    import server
+
+    if not metrics.PROMETHEUS_AVAILABLE:
+        print("⚠️ prometheus_client no instalado, se omite /metrics")
+        return
+
+    with TestClient(server.app) as client:
+        assert server.startup.wait(["chatbot", "sentiment"], timeout=10)
+        client.post("/api/sentiment/analyze", json={"text": "Gratis, compra ya"})
+        client.post("/api/chatbot/message", json={"message": "Busco zapatillas rojas talla 42"})
+        r = client.get("/metrics")
+
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert 'compriassist_stage_seconds_count{module="sentiment",stage="fraud_regex"}' in body
+    assert 'compriassist_stage_seconds_count{module="chatbot",stage="entities"}' in body
+    assert 'compriassist_request_seconds_count{module="sentiment"}' in body
+
+
+def test_launcher_arranca_recarga_y_para_los_workers():
+    """Smoke test de launcher.py: fork del worker, aviso de listo, SIGHUP y SIGTERM"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    backend = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "launcher.py", "--workers", "1", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=backend, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        env={**os.environ, "PYTHONIOENCODING": "utf-8"}
+    )
+    lineas = queue.Queue()
+    threading.Thread(target=lambda: [lineas.put(l) for l in proc.stdout], daemon=True).start()
+
+    def esperar(patron, timeout=60):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            try:
+                linea = lineas.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            m = re.search(patron, linea)
+            if m:
+                return m
+        raise AssertionError(f"launcher.py no escribió {patron!r}")
+
+    def health():
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=5) as r:
+            return r.status
+
+    try:
+        viejo = int(esperar(r"Workers listos: \[(\d+)\]").group(1))
+        assert health() == 200
+
+        proc.send_signal(signal.SIGHUP)
+        nuevo = int(esperar(r"Recarga completa: workers \[(\d+)\]").group(1))
+        assert nuevo != viejo
+        assert health() == 200
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=60) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    test_orquestador_carga_en_paralelo_y_reporta_estados()
+    test_servidor_responde_503_mientras_el_modulo_carga()
+    test_module_stats_percentiles_y_errores()
+    test_health_live_ready_y_details()
+    test_metrics_expone_etapas_por_modulo()
+    test_launcher_arranca_recarga_y_para_los_workers()
+    print("✅ Pruebas del arranque completadas")
@@ -0,0 +1,672 @@
+"""
+Pruebas del motor de Búsqueda Visual (FAISS)
+Usa embeddings sintéticos, no necesita ResNet50 ni los datos reales
+"""
+
+import sys
+import os
+import json
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+
+# Agregar el directorio backend al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.visual_search import engine as engine_module
+from models.visual_search.engine import VisualSearchEngine, coalesced_search
+from models.visual_search.batcher import MicroBatcher
+from models.visual_search.prepare_embeddings import prepare_embeddings
+from models.visual_search.reduce_pca import reduce_embeddings
+from models.visual_search.metadata_store import MetadataStore, load_or_build_metadata_store, current_store_path
+from models.visual_search.cache import EmbeddingCache, image_hash
+from models.visual_search.sharded import ShardedSearchEngine, shard_catalog, shard_of
+from models.visual_search.loader import BaseExtractor, preprocess_input, create_extractor, decode_image
+from models.visual_search.index_factory import unwrap_index, default_nprobe
+
+
+def crear_catalogo(tmp_dir, n=200, d=32, seed=0):
+    """Crea un catálogo sintético (.npy + .json) y devuelve sus rutas"""
+    rng = np.random.default_rng(seed)
+    emb = rng.standard_normal((n, d)).astype(np.float32)
+    categorias = ["Tshirts", "Shoes", "Watches", "Bags"]
+    meta = [
+        {
+            "id": 1000 + i,
+            "productDisplayName": f"Producto {i}",
+            "image_path": f"https://cdn.example.com/{i}.jpg",
+            "articleType": categorias[i % len(categorias)],
+            "price": float(10 + i),
+        }
+        for i in range(n)
+    ]
+    emb_path = os.path.join(tmp_dir, "embeddings.npy")
+    meta_path = os.path.join(tmp_dir, "metadata.json")
+    np.save(emb_path, emb)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return emb_path, meta_path
+
+
+def test_search_devuelve_el_mismo_producto():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path)
+
+        results = engine.search(engine.embeddings[7], top_k=3)
+
+        assert len(results) == 3
+        assert results[0]["product_id"] == 1007
+        assert results[0]["name"] == "Producto 7"
+        assert results[0]["image_url"].endswith("/7.jpg")
+        assert results[0]["similarity"] > 0.99
+
+
+def test_search_batch_equivale_a_busquedas_individuales():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path)
+
+        queries = engine.embeddings[[3, 50, 120]]
+        batch = engine.search_batch(queries, top_k=5)
+
+        assert len(batch) == 3
+        for q, results in zip(queries, batch):
+            individual = engine.search(q, top_k=5)
+            assert [r["product_id"] for r in results] == [r["product_id"] for r in individual]
+
+
+def test_index_aproximado_persiste_su_tipo():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path, index_type="HNSWFlat", ef_search=64)
+        results = engine.search(engine.embeddings[10], top_k=1)
+        assert results[0]["product_id"] == 1010
+
+        # Al recargar sin indicar tipo se respeta el marcador guardado junto al .faiss
+        recargado = VisualSearchEngine(emb_path, meta_path)
+        assert recargado.index_type == "HNSWFlat"
+
+        # Pedir otro tipo reconstruye el índice
+        ivf = VisualSearchEngine(emb_path, meta_path, index_type="IVFFlat")
+        assert ivf.index_type == "IVFFlat"
+        results = ivf.search(ivf.embeddings[10], top_k=1, nprobe=64)
+        assert results[0]["product_id"] == 1010
+
+        # IVF con nprobe por defecto ~sqrt(nlist), no el 1 de FAISS, también al recargar
+        base = unwrap_index(ivf.index)
+        assert base.nlist > 1 and base.nprobe == default_nprobe(base.nlist) > 1
+        assert unwrap_index(VisualSearchEngine(emb_path, meta_path).index).nprobe == base.nprobe
+        assert len(ivf.search(ivf.embeddings[10], top_k=100)) > len(ivf.search(ivf.embeddings[10], top_k=100, nprobe=1))
+
+
+def test_rerank_exacto_sobre_indice_comprimido():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp, n=600)
+        exacto = VisualSearchEngine(emb_path, meta_path, index_path=os.path.join(tmp, "flat.faiss"))
+        engine = VisualSearchEngine(emb_path, meta_path, index_type="IVFPQ", nprobe=64, rerank=10)
+        etapas = []
+        engine.stage_observer = lambda stage, seconds: etapas.append(stage)
+
+        q = exacto.embeddings[42]
+        esperado = exacto.search(q, top_k=5)
+        resultados = engine.search(q, top_k=5)
+
+        # Las similitudes son las exactas (float32), no las aproximadas de PQ
+        for r in resultados:
+            fila = r["product_id"] - 1000
+            assert abs(r["similarity"] - float(exacto.embeddings[fila] @ q)) < 1e-4
+        assert [r["similarity"] for r in resultados] == sorted([r["similarity"] for r in resultados], reverse=True)
+        assert resultados[0]["product_id"] == esperado[0]["product_id"] == 1042
+        assert len(engine.search(q, top_k=5, rerank=1)) == 5
+
+        tiempos = engine.stage_timings()["stages"]
+        assert tiempos["index"]["count"] == 2 and tiempos["rerank"]["count"] == 1
+        assert tiempos["metadata"]["count"] == 2
+        assert etapas == ["index", "rerank", "metadata", "index", "metadata"]
+
+
+def test_carga_con_mmap_tras_preparar_embeddings():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        esperado = VisualSearchEngine(emb_path, meta_path).search_batch(np.load(emb_path)[:4], top_k=3)
+
+        prepare_embeddings(emb_path)
+        engine = VisualSearchEngine(emb_path, meta_path, mmap=True)
+
+        assert isinstance(engine.embeddings, np.memmap)
+        assert np.allclose(np.linalg.norm(engine.embeddings, axis=1), 1.0, atol=1e-5)
+        obtenido = engine.search_batch(np.load(emb_path)[:4], top_k=3)
+        assert [[r["product_id"] for r in res] for res in obtenido] == \
+               [[r["product_id"] for r in res] for res in esperado]
+
+
+def test_almacenamiento_float16_e_int8():
+    for storage, max_bytes in (("float16", 2), ("int8", 1)):
+        with tempfile.TemporaryDirectory() as tmp:
+            emb_path, meta_path = crear_catalogo(tmp)
+            original = np.load(emb_path)
+            original /= np.linalg.norm(original, axis=1, keepdims=True)
+
+            prepare_embeddings(emb_path, storage=storage)
+            engine = VisualSearchEngine(emb_path, meta_path, mmap=True, compact_threshold=0)
+
+            assert engine.embeddings.nbytes <= original.size * max_bytes
+            assert np.abs(engine.embeddings[[3, 4]] - original[[3, 4]]).max() < 0.02
+            assert engine.search(original[7], top_k=1)[0]["product_id"] == 1007
+
+            # La compactación reescribe el catálogo en el mismo formato
+            engine.remove_products([1000])
+            engine.compact()
+            assert engine.catalog_stats()["embeddings_storage"] == storage
+            recargado = VisualSearchEngine(emb_path, meta_path)
+            assert recargado.storage == storage and len(recargado.embeddings) == 199
+            assert recargado.search(original[7], top_k=1)[0]["product_id"] == 1007
+
+
+def test_pca_reduce_catalogo_y_proyecta_consultas():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp, n=400, d=64)
+        original = np.load(emb_path)
+        _, reduced, _, out_path, index_path = reduce_embeddings(emb_path, 16)
+
+        engine = VisualSearchEngine(out_path, meta_path, index_path=index_path)
+        assert engine.d == 16 and engine.input_dim == 64
+        assert np.allclose(np.linalg.norm(engine.embeddings, axis=1), 1.0, atol=1e-5)
+
+        # Las consultas llegan en la dimensión del extractor y se proyectan con la PCA guardada
+        assert engine.search(original[25], top_k=1)[0]["product_id"] == 1025
+        engine.upsert([{"id": 7777, "name": "Nuevo"}], original[30])
+        assert engine.search(original[30], top_k=2)[0]["product_id"] in (1030, 7777)
+
+        # Un .npy que no corresponde a la PCA guardada se rechaza
+        try:
+            VisualSearchEngine(emb_path, meta_path, index_path=index_path)
+            assert False, "Debe fallar si la dimensión no coincide con la PCA"
+        except ValueError:
+            pass
+
+
+def test_metadata_store_resuelve_alias():
+    records = [
+        {"id": "A1", "productDisplayName": "Camiseta", "image_path": "img/a1.jpg", "articleType": "Tshirts", "price": 20},
+        {"id": "B2", "name": "Zapatilla ñandú", "link": "https://x/b2.jpg", "articleType": "Shoes"},
+        {"id": "C3", "name": "Reloj", "image_url": "https://x/c3.jpg", "price": "no disponible"},
+    ]
+    store = MetadataStore.from_records(records)
+
+    assert len(store) == 3
+    assert store.row(0) == {"id": "A1", "name": "Camiseta", "image_url": "img/a1.jpg",
+                            "category": "Tshirts", "price": 20.0}
+    assert store.row(1)["name"] == "Zapatilla ñandú"
+    assert store.row(1)["image_url"] == "https://x/b2.jpg"
+    assert store.row(1)["price"] is None
+    assert store.row(2)["category"] is None
+    assert store.row(2)["image_url"] == "https://x/c3.jpg"
+
+
+def test_metadata_store_se_reconstruye_si_cambia_el_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        _, meta_path = crear_catalogo(tmp, n=10)
+        store = load_or_build_metadata_store(meta_path)
+        assert len(store) == 10 and store.product_id(3) == 1003
+
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump([{"id": 1, "name": "Único producto"}], f)
+        os.utime(meta_path, (0, 0))
+
+        store = load_or_build_metadata_store(meta_path, mmap=True)
+        assert len(store) == 1 and store.row(0)["name"] == "Único producto"
+
+
+def test_actualizaciones_incrementales_y_reaplicado_del_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path, index_type="HNSWFlat")
+        rng = np.random.default_rng(42)
+        nuevo = rng.standard_normal(32).astype(np.float32)
+
+        engine.add_products([{"id": 5000, "name": "Nuevo", "image_url": "n.jpg",
+                              "category": "Shoes", "price": 99}], [nuevo])
+        assert engine.search(nuevo, top_k=1)[0]["product_id"] == 5000
+
+        # Baja: el producto desaparece y top_k sigue devolviendo k resultados
+        engine.remove_products([1007])
+        results = engine.search(engine.embeddings[7], top_k=5)
+        assert 1007 not in [r["product_id"] for r in results]
+        assert len(results) == 5
+
+        # Upsert de un producto existente: nuevo embedding y nuevos metadatos
+        engine.upsert([{"id": 1003, "productDisplayName": "Renovado", "price": 1}], [nuevo * -1])
+        top = engine.search(nuevo * -1, top_k=1)[0]
+        assert top["product_id"] == 1003 and top["name"] == "Renovado"
+
+        try:
+            engine.add_products([{"id": 5000}], [nuevo])
+            assert False, "add_products debe fallar con ids existentes"
+        except ValueError:
+            pass
+
+        # Al reiniciar se reaplica el delta log sobre el índice base
+        reiniciado = VisualSearchEngine(emb_path, meta_path)
+        assert reiniciado.search(nuevo, top_k=1)[0]["product_id"] == 5000
+        assert 1007 not in [r["product_id"] for r in reiniciado.search(reiniciado.embeddings[7], top_k=5)]
+        assert reiniciado.catalog_stats()["total_products"] == 200
+
+
+def test_compactacion_reescribe_el_catalogo():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path, mmap=True)
+        nuevo = np.random.default_rng(7).standard_normal(32).astype(np.float32)
+
+        engine.add_products([{"id": 7777, "name": "Compactado"}], [nuevo])
+        engine.remove_products([1000, 1001])
+        assert engine.compact() == 199
+
+        stats = engine.catalog_stats()
+        assert stats["base_products"] == 199 and stats["pending_delta"] == 0
+        assert engine.search(nuevo, top_k=1)[0]["product_id"] == 7777
+
+        # Tras compactar, un arranque limpio ve el mismo catálogo sin delta
+        reiniciado = VisualSearchEngine(emb_path, meta_path)
+        assert len(reiniciado.metadata) == 199
+
+        # El store se publica en un directorio versionado: solo queda el vigente
+        engine.compact()
+        stores = sorted(n for n in os.listdir(tmp) if n.startswith("metadata.cols") and
+                        os.path.isdir(os.path.join(tmp, n)))
+        with open(os.path.join(tmp, "metadata.cols.current"), encoding="utf-8") as f:
+            assert stores == [f.read().strip()]
+        assert len(VisualSearchEngine(emb_path, meta_path).metadata) == 199
+        assert reiniciado.catalog_stats()["pending_delta"] == 0
+        assert reiniciado.search(nuevo, top_k=1)[0]["name"] == "Compactado"
+
+
+def test_busqueda_filtrada_por_categoria_y_precio():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        for filter_exact_max in (0, 100000):  # selector FAISS y búsqueda exacta sobre las filas
+            engine = VisualSearchEngine(emb_path, meta_path, index_type="HNSWFlat",
+                                        filter_exact_max=filter_exact_max)
+            engine.remove_products([1005])
+            engine.upsert([{"id": 9001, "name": "Bota", "category": "Shoes", "price": 50}],
+                                [engine.embeddings[1]])
+
+            filters = {"category": "Shoes", "min_price": 5, "max_price": 120}
+            results = engine.search(engine.embeddings[1], top_k=10, filters=filters)
+
+            assert len(results) == 10
+            assert all(r["category"] == "Shoes" and 5 <= r["price"] <= 120 for r in results)
+            assert 1005 not in [r["product_id"] for r in results]
+            assert {r["product_id"] for r in results[:2]} == {1001, 9001}
+
+            varias = engine.search(engine.embeddings[2], top_k=4, filters={"category": ["Watches", "Bags"]})
+            assert {r["category"] for r in varias} <= {"Watches", "Bags"}
+
+            assert engine.search(engine.embeddings[1], top_k=5, filters={"category": "Inexistente"}) == []
+
+
+def test_busqueda_filtrada_en_ivf_completa_top_k():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp, n=2000, d=64)
+        engine = VisualSearchEngine(emb_path, meta_path, index_type="IVFPQ", filter_exact_max=10)
+        assert engine.search(engine.embeddings[0], top_k=50, nprobe=1)  # pocas listas visitadas
+
+        results = engine.search(engine.embeddings[1], top_k=50, nprobe=1, filters={"category": "Shoes"})
+
+        assert len(results) == 50
+        assert all(r["category"] == "Shoes" for r in results)
+        assert results[0]["product_id"] == 1001
+        assert engine.stage_timings()["stages"]["exact"]["count"] == 1
+
+
+def test_busqueda_exacta_por_bloques_y_cache_de_filtros_concurrente():
+    import threading
+
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp, n=500)
+        engine = VisualSearchEngine(emb_path, meta_path, filter_exact_max=100000)
+        consultas = engine.embeddings[:8]
+        filtros = {"min_price": 20, "max_price": 400}
+        completo = engine.search_batch(consultas, top_k=7, filters=filtros)
+
+        original = engine_module.EXACT_CHUNK_ROWS
+        engine_module.EXACT_CHUNK_ROWS = 16
+        try:
+            por_bloques = engine.search_batch(consultas, top_k=7, filters=filtros)
+        finally:
+            engine_module.EXACT_CHUNK_ROWS = original
+        assert [[r["product_id"] for r in fila] for fila in por_bloques] == \
+            [[r["product_id"] for r in fila] for fila in completo]
+
+        # Más filtros distintos que entradas de la caché, desde varios hilos a la vez
+        errores = []
+
+        def buscar(offset):
+            try:
+                for i in range(100):
+                    engine.search(consultas[0], top_k=3, filters={"max_price": 100 + (offset * 100 + i) % 150})
+            except Exception as e:
+                errores.append(e)
+
+        hilos = [threading.Thread(target=buscar, args=(n,)) for n in range(4)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        assert errores == []
+        assert len(engine._filter_cache) <= 64
+
+
+def test_cache_de_embeddings_se_invalida_con_el_indice():
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path)
+        cache = EmbeddingCache(max_embeddings=2, disk_dir=os.path.join(tmp, "cache"))
+
+        key = image_hash(Image.new("RGB", (16, 16), (10, 20, 30)))
+        assert key == image_hash(Image.new("RGB", (16, 16), (10, 20, 30)))
+        assert key != image_hash(Image.new("RGB", (16, 16), (10, 20, 31)))
+
+        assert cache.get_embedding(key) is None
+        cache.put_embedding(key, engine.embeddings[0])
+        assert np.allclose(cache.get_embedding(key), engine.embeddings[0])
+
+        # Expulsado del LRU en memoria pero recuperable desde disco
+        cache.put_embedding("b" * 32, engine.embeddings[1])
+        cache.put_embedding("c" * 32, engine.embeddings[2])
+        assert np.allclose(cache.get_embedding(key), engine.embeddings[0])
+
+        version = engine.index_version
+        cache.put_results(key, version, engine.search(engine.embeddings[0]), params_key=5)
+        assert cache.get_results(key, version, params_key=5) is not None
+        assert cache.get_results(key, version, params_key=10) is None
+
+        engine.remove_products([1000])
+        assert engine.index_version != version
+        assert cache.get_results(key, engine.index_version, params_key=5) is None
+
+        stats = cache.stats()
+        assert stats["embedding_disk_hits"] == 1
+        assert stats["results_invalidations"] == 1
+
+
+class ExtractorMedia(BaseExtractor):
+    """Backend de prueba: media por canal del tensor preprocesado"""
+    name = "media"
+
+    def _forward(self, batch):
+        return batch.mean(axis=(1, 2))
+
+
+def test_extractor_base_preprocesa_y_normaliza_en_lote():
+    from PIL import Image
+
+    imagenes = [
+        Image.new("RGB", (640, 480), (255, 0, 0)),
+        Image.new("L", (100, 100), 128),
+        Image.new("RGBA", (50, 80), (0, 0, 255, 10)),
+    ]
+    embs = ExtractorMedia().images_to_embeddings(imagenes)
+
+    assert embs.shape == (3, 3) and embs.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embs, axis=1), 1.0, atol=1e-5)
+    # Rojo puro en BGR: el canal R (último) es el único por encima de la media de ImageNet
+    esperado = np.array([-103.939, -116.779, 255 - 123.68], dtype=np.float32)
+    assert np.allclose(embs[0], esperado / np.linalg.norm(esperado), atol=1e-4)
+    assert np.allclose(ExtractorMedia().image_to_embedding(imagenes[1]), embs[1])
+
+    x = np.full((1, 2, 2, 3), [10.0, 20.0, 30.0], dtype=np.float32)
+    assert np.allclose(preprocess_input(x)[0, 0, 0], [30 - 103.939, 20 - 116.779, 10 - 123.68])
+
+    try:
+        create_extractor("onnx", model_path=os.path.join(tempfile.gettempdir(), "no_existe.onnx"))
+        assert False, "Debe fallar si no existe el modelo ONNX"
+    except FileNotFoundError:
+        pass
+
+
+def test_decode_image_reduce_sin_resolucion_completa():
+    from io import BytesIO
+    from PIL import Image
+
+    jpg = BytesIO()
+    Image.new("RGB", (2000, 1500), (200, 30, 30)).save(jpg, format="JPEG")
+    png = BytesIO()
+    Image.new("P", (300, 300), 3).save(png, format="PNG")
+
+    for data in (jpg.getvalue(), png.getvalue()):
+        img = decode_image(BytesIO(data))
+        assert img.size == (224, 224) and img.mode == "RGB"
+    assert np.abs(np.asarray(decode_image(jpg.getvalue()), dtype=np.int16) - [200, 30, 30]).max() <= 3
+
+    # El buffer del lote se reutiliza entre llamadas y solo crece con lotes mayores
+    ext = ExtractorMedia()
+    ext.images_to_embeddings([decode_image(jpg.getvalue())] * 2)
+    buffer = ext._buffer
+    ext.images_to_embeddings([decode_image(png.getvalue())])
+    assert ext._buffer is buffer
+    ext.images_to_embeddings([decode_image(png.getvalue())] * 3)
+    assert len(ext._buffer) == 3
+
+
+def test_shards_equivalen_al_indice_completo():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        completo = VisualSearchEngine(emb_path, meta_path)
+        shards_dir = os.path.join(tmp, "shards")
+        manifest = shard_catalog(emb_path, meta_path, shards_dir, 3)
+        assert manifest["total_products"] == 200
+
+        engine = ShardedSearchEngine(shards_dir)
+        try:
+            assert len(set(engine.worker_pids)) == 3 and os.getpid() not in engine.worker_pids
+
+            # Scatter-gather: el top-k mezclado coincide con el del índice completo
+            queries = completo.embeddings[[3, 50, 120]]
+            for a, b in zip(completo.search_batch(queries, top_k=10), engine.search_batch(queries, top_k=10)):
+                assert [r["product_id"] for r in a] == [r["product_id"] for r in b]
+            filtrado = engine.search(queries[0], top_k=5, filters={"category": "Watches"})
+            assert filtrado and all(r["category"] == "Watches" for r in filtrado)
+
+            # Altas y bajas van al shard dueño del product_id
+            version = engine.index_version
+            rows = engine.upsert([{"id": 9001, "name": "Nuevo", "category": "Bags", "price": 5.0}], queries[:1])
+            assert rows[0][0] == shard_of(9001, 3)
+            assert engine.index_version != version
+            assert engine.remove_products([1003, 9001]) == 2
+            assert engine.search(queries[0], top_k=1)[0]["product_id"] not in (1003, 9001)
+            try:
+                engine.add_products([{"id": 1050}], queries[1:2])
+                assert False, "Debe fallar con un id existente"
+            except ValueError:
+                pass
+            assert engine.catalog_stats()["total_products"] == 199
+        finally:
+            engine.close()
+
+
+def test_precarga_calienta_los_ficheros_de_los_shards():
+    import server
+
+    class Arranque:
+        def preload(self, names):
+            pass
+
+        def status(self, name):
+            return "pending"
+
+        def snapshot(self):
+            return {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        shards_dir = os.path.join(tmp, "shards")
+        shard_catalog(emb_path, meta_path, shards_dir, 2)
+        esperados = []
+        for name in ("shard_00", "shard_01"):
+            shard = os.path.join(shards_dir, name)
+            VisualSearchEngine(os.path.join(shard, "embeddings.npy"), os.path.join(shard, "metadata.json"))
+            store = current_store_path(os.path.join(shard, "metadata.json"))
+            assert os.path.isdir(store)
+            esperados += [os.path.join(shard, f) for f in ("embeddings.npy", "metadata.json", "embeddings.faiss")]
+            esperados += [os.path.join(store, f) for f in os.listdir(store)]
+
+        leidos = []
+        original = (server.startup, server.visual_catalog_paths, server.warm_page_cache)
+        calentar = server.warm_page_cache
+
+        def warm_page_cache(paths):
+            leidos.extend(paths)
+            return calentar(paths)
+
+        try:
+            server.startup = Arranque()
+            server.visual_catalog_paths = lambda: (emb_path, meta_path, emb_path + ".faiss", shards_dir)
+            server.warm_page_cache = warm_page_cache
+            _, warmed = server.preload_shared()
+        finally:
+            server.startup, server.visual_catalog_paths, server.warm_page_cache = original
+
+        # Las carpetas de los shards y del store columnar no hacen fallar open(): se recorren
+        assert any(os.path.isdir(p) for p in leidos)
+        total = sum(os.path.getsize(p) for p in esperados)
+        assert abs(warmed - total / (1024 * 1024)) < 1e-9
+
+
+def test_micro_batcher_agrupa_peticiones_concurrentes():
+    llamadas = []
+
+    def batch_fn(items):
+        llamadas.append(len(items))
+        time.sleep(0.01)
+        return [x * 2 for x in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(20)])
+
+    resultados = asyncio.run(main())
+
+    assert resultados == [i * 2 for i in range(20)]
+    assert sum(llamadas) == 20
+    assert max(llamadas) <= 8
+    assert len(llamadas) < 20
+
+    stats = batcher.stats()
+    assert stats["total_items"] == 20
+    assert stats["total_batches"] == len(llamadas)
+    assert sum(stats["batch_size_histogram"].values()) == len(llamadas)
+
+
+def test_busquedas_concurrentes_se_agrupan_por_parametros():
+    with tempfile.TemporaryDirectory() as tmp:
+        emb_path, meta_path = crear_catalogo(tmp)
+        engine = VisualSearchEngine(emb_path, meta_path)
+        llamadas = []
+        search_batch = engine.search_batch
+
+        def contar(queries, **kwargs):
+            llamadas.append(len(queries))
+            return search_batch(queries, **kwargs)
+
+        engine.search_batch = contar
+        peticiones = [(engine.embeddings[i], 3 + i % 3, None, None, None) for i in range(10)]
+        peticiones += [(engine.embeddings[i], 5, None, None, {"category": "Shoes"}) for i in range(10, 14)]
+
+        async def main():
+            batcher = MicroBatcher(lambda items: coalesced_search(engine, items),
+                                   max_batch_size=32, max_wait_ms=20)
+            return await asyncio.gather(*(batcher.submit(p) for p in peticiones))
+
+        resultados = asyncio.run(main())
+
+        # Una index.search por combinación de parámetros, no una por consulta
+        assert sorted(llamadas) == [4, 10]
+        for (q, top_k, _, _, filters), found in zip(peticiones, resultados):
+            esperado = search_batch([q], top_k=top_k, filters=filters)[0]
+            assert [r["product_id"] for r in found] == [r["product_id"] for r in esperado]
+
+
+def test_micro_batcher_propaga_errores():
+    def batch_fn(items):
+        raise ValueError("fallo en inferencia")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=5)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    resultados = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in resultados)
+
+
+def test_admin_visual_exige_token_configurado():
+    import server
+    from fastapi import HTTPException
+
+    def estado(token):
+        try:
+            server.require_visual_admin(token)
+        except HTTPException as e:
+            return e.status_code
+        return 200
+
+    original = (server.VISUAL_ADMIN_TOKEN, server.search_engine, server.extractor)
+    workers = server.SERVER_WORKERS
+    try:
+        server.search_engine, server.extractor = object(), object()
+        server.VISUAL_ADMIN_TOKEN = None
+        assert estado(None) == 403
+        assert estado("cualquiera") == 403
+
+        server.VISUAL_ADMIN_TOKEN = "secreto"
+        assert estado(None) == 401
+        assert estado("otro") == 401
+        assert estado("secreto") == 200
+
+        # Con varios workers, las rutas que modifican el catálogo se rechazan
+        motor = server.require_visual_admin("secreto")
+        assert server.require_visual_writer(motor) is motor
+        server.SERVER_WORKERS = 2
+        try:
+            server.require_visual_writer(motor)
+            raise AssertionError("se esperaba 503")
+        except HTTPException as e:
+            assert e.status_code == 503
+    finally:
+        server.VISUAL_ADMIN_TOKEN, server.search_engine, server.extractor = original
+        server.SERVER_WORKERS = workers
+
+
+if __name__ == "__main__":
+    test_search_devuelve_el_mismo_producto()
+    test_search_batch_equivale_a_busquedas_individuales()
+    test_index_aproximado_persiste_su_tipo()
+    test_rerank_exacto_sobre_indice_comprimido()
+    test_carga_con_mmap_tras_preparar_embeddings()
+    test_almacenamiento_float16_e_int8()
+    test_pca_reduce_catalogo_y_proyecta_consultas()
+    test_metadata_store_resuelve_alias()
+    test_metadata_store_se_reconstruye_si_cambia_el_json()
+    test_actualizaciones_incrementales_y_reaplicado_del_log()
+    test_compactacion_reescribe_el_catalogo()
+    test_busqueda_filtrada_por_categoria_y_precio()
+    test_busqueda_filtrada_en_ivf_completa_top_k()
+    test_busqueda_exacta_por_bloques_y_cache_de_filtros_concurrente()
+    test_cache_de_embeddings_se_invalida_con_el_indice()
+    test_extractor_base_preprocesa_y_normaliza_en_lote()
+    test_decode_image_reduce_sin_resolucion_completa()
+    test_shards_equivalen_al_indice_completo()
+    test_precarga_calienta_los_ficheros_de_los_shards()
+    test_micro_batcher_agrupa_peticiones_concurrentes()
+    test_busquedas_concurrentes_se_agrupan_por_parametros()
+    test_micro_batcher_propaga_errores()
+    test_admin_visual_exige_token_configurado()
+    print("✅ Pruebas de búsqueda visual completadas")